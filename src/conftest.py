@@ -0,0 +1,30 @@
+"""Pytest fixtures matching webapp.test.runner.TestRunner."""
+import logging
+import os
+
+import pytest
+from django.conf import settings
+
+from webapp.test.runner import (
+    FAST_PASSWORD_HASHERS,
+    TEST_LOGGING_LEVEL,
+    create_skeletons,
+    use_worker_caches,
+)
+
+
+@pytest.fixture(autouse=True, scope="session")
+def django_test_environment(django_test_environment):
+    """Use a fast password hasher, only log the warnings, prefix the cache keys."""
+    settings.PASSWORD_HASHERS = FAST_PASSWORD_HASHERS
+    logging.getLogger().setLevel(TEST_LOGGING_LEVEL)
+    worker_id = os.environ.get("PYTEST_XDIST_WORKER")
+    if worker_id is not None:
+        use_worker_caches(worker_id)
+
+
+@pytest.fixture(scope="session")
+def django_db_setup(django_db_setup, django_db_blocker):
+    """Create the initial data once, in the database of each xdist worker."""
+    with django_db_blocker.unblock():
+        create_skeletons()
@@ -3,9 +3,12 @@ import django.contrib.auth.admin
 import django.contrib.auth.forms
 from django import forms
 from django.contrib import admin
+from django.contrib.admin.views.main import ORDER_VAR
 from django.contrib.auth import get_user_model, password_validation
 from django.utils.translation import gettext_lazy as _
 
+from webapp.filters import SEARCH_RANK, rank_search_results
+
 
 class UserChangeForm(django.contrib.auth.forms.UserChangeForm):
     """Form for modifying users in admin."""
@@ -31,6 +34,16 @@ class UserCreationForm(django.contrib.auth.forms.UserCreationForm):
         model = get_user_model()
         fields = ["email"]
 
+    def clean_email(self):
+        """Ensure the email is unique ignoring case."""
+        email = self.cleaned_data.get("email")
+        model = self._meta.model
+        if email and model.objects.filter(email__iexact=email).exists():
+            raise forms.ValidationError(
+                self.error_messages["duplicate_email"], code="duplicate_email"
+            )
+        return email
+
     def clean_password2(self):
         """Ensure the passwords match."""
         pass1 = self.cleaned_data.get("password1")
@@ -79,3 +92,16 @@ class UserAdmin(django.contrib.auth.admin.UserAdmin):
     ordering = ["email"]
     filter_horizontal = ["groups", "user_permissions"]
     readonly_fields = ["date_joined"]
+
+    def get_search_results(self, request, queryset, search_term):
+        """Order the search results by rank unless sorted by a column."""
+        queryset, use_distinct = super().get_search_results(
+            request, queryset, search_term
+        )
+        terms = search_term.split()
+        if not terms or ORDER_VAR in request.GET:
+            return queryset, use_distinct
+        fields = self.get_search_fields(request)
+        queryset = rank_search_results(queryset, fields, terms)
+        ordering = [f"-{SEARCH_RANK}", *queryset.query.order_by]
+        return queryset.order_by(*ordering), use_distinct
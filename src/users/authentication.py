@@ -0,0 +1,70 @@
+"""Authentication for the users app."""
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import (
+    BaseAuthentication,
+    TokenAuthentication,
+    get_authorization_header,
+)
+from rest_framework.exceptions import AuthenticationFailed
+
+from users.models import Token
+from users.signed_tokens import ACCESS, SignedToken, StatelessUser, decode
+
+
+# pylint: disable=unused-argument
+def create_token(token_model, user, serializer):
+    """Create a new token for each login."""
+    return token_model.objects.create(user=user)
+
+
+class ExpiringTokenAuthentication(TokenAuthentication):
+    """Authenticate with tokens which expire when unused for `TOKEN_TTL`.
+
+    The expiry slides on use, but `last_used` is only written once per
+    `TOKEN_REFRESH_INTERVAL` so that authenticated requests rarely write.
+    """
+
+    model = Token
+
+    def authenticate_credentials(self, key):
+        """Reject expired tokens and refresh the expiry of used tokens."""
+        user, token = super().authenticate_credentials(key)
+        now = timezone.now()
+        if token.expires <= now:
+            raise AuthenticationFailed(_("Token has expired."))
+        if now - token.last_used >= settings.TOKEN_REFRESH_INTERVAL:
+            Token.objects.filter(pk=token.pk).update(last_used=now)
+            token.last_used = now
+        return user, token
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """Authenticate with stateless signed access tokens, when enabled.
+
+    Clients send "Authorization: Bearer <access token>". The token is verified
+    without any database or cache lookup, see users.signed_tokens.
+    """
+
+    keyword = "Bearer"
+
+    def authenticate(self, request):
+        """Return the stateless user and the token of a valid access token."""
+        auth = get_authorization_header(request).split()
+        if not settings.SIGNED_TOKENS_ENABLED or not auth:
+            return None
+        if auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise AuthenticationFailed(_("Invalid token header."))
+        try:
+            claims = decode(auth[1].decode(), ACCESS)
+        except (signing.BadSignature, UnicodeError) as error:
+            raise AuthenticationFailed(_("Invalid token.")) from error
+        return StatelessUser(claims["uid"]), SignedToken(claims)
+
+    def authenticate_header(self, request):
+        """Return the keyword for the WWW-Authenticate header."""
+        return self.keyword
@@ -0,0 +1,31 @@
+"""Forms for the users app."""
+import django.contrib.auth.forms
+from django.template import loader
+
+from webapp import tasks
+
+
+class PasswordResetForm(django.contrib.auth.forms.PasswordResetForm):
+    """Password reset form queueing the emails instead of sending them."""
+
+    # pylint: disable=too-many-arguments
+    def send_mail(
+        self,
+        subject_template_name,
+        email_template_name,
+        context,
+        from_email,
+        to_email,
+        html_email_template_name=None,
+    ):
+        """Render the email and queue it, the request does not wait on mailgun."""
+        subject = loader.render_to_string(subject_template_name, context)
+        # Email subject *must not* contain newlines
+        subject = "".join(subject.splitlines())
+        body = loader.render_to_string(email_template_name, context)
+        html_message = None
+        if html_email_template_name is not None:
+            html_message = loader.render_to_string(html_email_template_name, context)
+        tasks.send_email.apply_async(
+            [subject, body, from_email, [to_email]], {"html_message": html_message}
+        )
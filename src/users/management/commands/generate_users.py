@@ -0,0 +1,103 @@
+"""Management command to generate users for benchmarks."""
+import random
+from datetime import timedelta
+from time import monotonic
+from typing import List
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Max
+from django.db.models.functions import Length
+from django.utils import timezone
+
+from users.models import User
+from webapp.db import bulk_insert, copy_from, copy_to
+
+
+# The emails of the generated users, the same as the ones of UserFactory
+GENERATED_EMAIL_RE = r"^user_[0-9]+@example\.com$"
+GENERATED_PASSWORD = "pass"
+# A tenth of the generated users are inactive
+INACTIVE_RATE = 0.1
+
+
+def get_next_sequence() -> int:
+    """Return the number following the one of the last generated email."""
+    # the longest, then the greatest, email has the highest number
+    email = (
+        User.objects.filter(email__regex=GENERATED_EMAIL_RE)
+        .order_by(Length("email").desc(), "-email")
+        .values_list("email", flat=True)
+        .first()
+    )
+    if email is None:
+        return 0
+    return int(email.partition("@")[0].rpartition("_")[2]) + 1
+
+
+def build_users(start: int, count: int, password: str) -> List[User]:
+    """Return realistic users, joined in the last year, with the password hash."""
+    now = timezone.now()
+    return [
+        User(
+            email="user_%04d@example.com" % number,
+            password=password,
+            date_joined=now - timedelta(days=random.uniform(0, 365)),
+            is_active=random.random() >= INACTIVE_RATE,
+        )
+        for number in range(start, start + count)
+    ]
+
+
+class Command(BaseCommand):
+    """Management command to generate users for benchmarks."""
+
+    help = (
+        "Generate users, inserted with COPY on PostgreSQL. "
+        "The generated users can be dumped to a file which is loaded in seconds."
+    )
+
+    def add_arguments(self, parser):
+        """Add the count, batch size and dump arguments."""
+        parser.add_argument("count", nargs="?", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=10000)
+        parser.add_argument(
+            "--dump", metavar="PATH", help="Write the generated users to PATH."
+        )
+        parser.add_argument(
+            "--load", metavar="PATH", help="Load the users dumped to PATH."
+        )
+
+    def handle(self, *args, **options):
+        """Generate, dump or load the users."""
+        # pylint: disable=attribute-defined-outside-init
+        self.verbosity = options["verbosity"]
+        if (options["dump"] or options["load"]) and connection.vendor != "postgresql":
+            raise CommandError("Dumps are only supported on PostgreSQL.")
+        started = monotonic()
+        if options["load"]:
+            with open(options["load"]) as file:
+                copy_from(User, file, header=True)
+            self.log(f"Loaded {options['load']}", started)
+        if not options["count"]:
+            return
+        last_pk = User.objects.aggregate(last_pk=Max("pk"))["last_pk"] or 0
+        # NOTE: continue the emails' sequence so generating again adds users
+        sequence = get_next_sequence()
+        # hashing the password dominates the time, it is hashed once
+        password = make_password(GENERATED_PASSWORD)
+        for start in range(0, options["count"], options["batch_size"]):
+            size = min(options["batch_size"], options["count"] - start)
+            bulk_insert(build_users(sequence + start, size, password), size)
+        self.log(f"Generated {options['count']} users", started)
+        if options["dump"]:
+            started = monotonic()
+            with open(options["dump"], "w") as file:
+                copy_to(User.objects.filter(pk__gt=last_pk), file)
+            self.log(f"Dumped the generated users to {options['dump']}", started)
+
+    def log(self, message: str, started: float):
+        """Write the message with the time since started."""
+        if self.verbosity:
+            self.stdout.write(f"{message} in {monotonic() - started:.1f}s")
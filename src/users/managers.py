@@ -1,5 +1,25 @@
 """Override default django user manager to remove username field."""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence
+
+from django.conf import settings
 from django.contrib.auth.base_user import BaseUserManager
+from django.contrib.auth.hashers import make_password
+from django.db import models
+from django.utils import timezone
+
+
+def make_passwords(passwords: Sequence[Optional[str]]) -> List[str]:
+    """Hash the given passwords concurrently.
+
+    hashlib releases the GIL while hashing, so a thread pool spreads the
+    hashing of large batches across all available cores.
+    """
+    if len(passwords) < 2:
+        return [make_password(password) for password in passwords]
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        return list(executor.map(make_password, passwords))
 
 
 class UserManager(BaseUserManager):
@@ -7,6 +27,14 @@ class UserManager(BaseUserManager):
 
     use_in_migrations = True
 
+    def get_by_natural_key(self, username):
+        """Return the user with the given email ignoring case.
+
+        `iexact` lookups compile to `UPPER("email"::text)` on PostgreSQL, which
+        is covered by the unique functional index created in migration 0002.
+        """
+        return self.get(**{f"{self.model.USERNAME_FIELD}__iexact": username})
+
     def _create_user(self, email, password, **extra_fields):
         """Create and save a User with the given email and password."""
         if not email:
@@ -33,3 +61,16 @@ class UserManager(BaseUserManager):
             raise ValueError("Superuser must have is_superuser=True.")
 
         return self._create_user(email, password, **extra_fields)
+
+
+class TokenQuerySet(models.QuerySet):
+    """Queries for expiring auth tokens."""
+
+    def expired(self):
+        """Return the tokens unused for longer than `TOKEN_TTL`."""
+        return self.filter(last_used__lte=timezone.now() - settings.TOKEN_TTL)
+
+    def revoke(self, keep=None):
+        """Delete the tokens in a single query, except the `keep` token."""
+        tokens = self if keep is None else self.exclude(pk=keep.pk)
+        return tokens.delete()[0]
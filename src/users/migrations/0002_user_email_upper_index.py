@@ -0,0 +1,54 @@
+# Generated by Django 2.2.11 on 2026-10-19 00:00
+
+from django.db import IntegrityError, migrations
+
+INDEX_NAME = "users_user_email_upper_uniq"
+DUPLICATES_SQL = """
+SELECT UPPER("email"::text) FROM users_user
+GROUP BY UPPER("email"::text) HAVING COUNT(*) > 1
+LIMIT 10
+"""
+INVALID_INDEX_SQL = """
+SELECT 1 FROM pg_index JOIN pg_class ON pg_class.oid = pg_index.indexrelid
+WHERE pg_class.relname = %s AND NOT pg_index.indisvalid
+"""
+
+
+def create_index(apps, schema_editor):
+    """Create a unique index matching the SQL of `email__iexact` lookups."""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(DUPLICATES_SQL)
+        duplicates = [row[0] for row in cursor.fetchall()]
+        if duplicates:
+            raise IntegrityError(
+                "Merge or delete the users whose emails only differ by case "
+                f"before migrating: {', '.join(duplicates)}"
+            )
+        # A failed CONCURRENTLY build leaves an invalid index which would be
+        # kept by IF NOT EXISTS without enforcing uniqueness
+        cursor.execute(INVALID_INDEX_SQL, [INDEX_NAME])
+        if cursor.fetchone() is not None:
+            schema_editor.execute(f"DROP INDEX CONCURRENTLY {INDEX_NAME}")
+    # CONCURRENTLY avoids locking the table while the index is built
+    schema_editor.execute(
+        f"CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {INDEX_NAME}"
+        ' ON users_user (UPPER("email"::text))'
+    )
+
+
+def drop_index(apps, schema_editor):
+    """Drop the unique index."""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}")
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [("users", "0001_initial")]
+
+    operations = [migrations.RunPython(create_index, drop_index, elidable=False)]
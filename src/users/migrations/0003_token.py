@@ -0,0 +1,69 @@
+# Generated by Django 2.2.11 on 2026-10-19 02:26
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def copy_tokens(apps, schema_editor):
+    """Copy the existing never expiring tokens so that clients stay logged in."""
+    OldToken = apps.get_model("authtoken", "Token")
+    Token = apps.get_model("users", "Token")
+    db_alias = schema_editor.connection.alias
+    old_tokens = OldToken.objects.using(db_alias).order_by("pk")
+    tokens = [Token(key=old.key, user_id=old.user_id) for old in old_tokens.iterator()]
+    Token.objects.using(db_alias).bulk_create(tokens, batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0002_user_email_upper_index"),
+        ("authtoken", "0002_auto_20160226_1747"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Token",
+            fields=[
+                (
+                    "key",
+                    models.CharField(
+                        max_length=40,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="key",
+                    ),
+                ),
+                (
+                    "created",
+                    models.DateTimeField(auto_now_add=True, verbose_name="created"),
+                ),
+                (
+                    "last_used",
+                    models.DateTimeField(
+                        db_index=True,
+                        default=django.utils.timezone.now,
+                        verbose_name="last used",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="auth_tokens",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="user",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "token",
+                "verbose_name_plural": "tokens",
+            },
+        ),
+        migrations.RunPython(copy_tokens, migrations.RunPython.noop),
+    ]
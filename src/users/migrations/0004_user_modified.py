@@ -0,0 +1,18 @@
+# Generated by Django 2.2.11 on 2026-10-19 02:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0003_token"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="modified",
+            field=models.DateTimeField(auto_now=True, verbose_name="modified"),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 2.2.11 on 2026-10-19 00:00
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+INDEX_NAME = "users_user_email_upper_trgm"
+
+
+def create_index(apps, schema_editor):
+    """Create a trigram index matching the SQL of `email__icontains` lookups."""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    # CONCURRENTLY avoids locking the table while the index is built
+    schema_editor.execute(
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {INDEX_NAME}"
+        ' ON users_user USING GIN (UPPER("email"::text) gin_trgm_ops)'
+    )
+
+
+def drop_index(apps, schema_editor):
+    """Drop the trigram index."""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}")
+
+
+class CreateTrigramExtension(TrigramExtension):
+    """Create pg_trgm if missing, and keep it when migrating backwards.
+
+    Creating pg_trgm needs a superuser before PostgreSQL 13, where it became
+    a trusted extension: install it beforehand when the role cannot.
+    """
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        """Keep the extension, it may have been installed by an administrator."""
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [("users", "0004_user_modified")]
+
+    operations = [
+        CreateTrigramExtension(),
+        migrations.RunPython(create_index, drop_index, elidable=False),
+    ]
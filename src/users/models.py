@@ -1,18 +1,24 @@
 """User models."""
+import binascii
+import os
+from datetime import datetime
 from typing import List
 
+from django.conf import settings
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from django.core.mail import send_mail
 from django.db import models
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
-from users.managers import UserManager
+from users.managers import TokenQuerySet, UserManager
 
 
 class User(AbstractBaseUser, PermissionsMixin):
     """Email and password are required. Other fields are optional."""
 
+    # NOTE: emails are also unique ignoring case on PostgreSQL, see the
+    # functional index in migration 0002 and UserManager.get_by_natural_key
     email = models.EmailField(_("email address"), unique=True)
     is_staff = models.BooleanField(
         _("staff status"),
@@ -28,6 +34,9 @@ class User(AbstractBaseUser, PermissionsMixin):
         ),
     )
     date_joined = models.DateTimeField(_("date joined"), default=timezone.now)
+    # NOTE: the version of the user for conditional requests, bulk updates must
+    # set it, see webapp.mixins.ConditionalMixin
+    modified = models.DateTimeField(_("modified"), auto_now=True)
 
     USERNAME_FIELD = "email"
     EMAIL_FIELD = "email"
@@ -58,3 +67,51 @@ class User(AbstractBaseUser, PermissionsMixin):
     def email_user(self, subject, message, from_email=None, **kwargs):
         """Send an email to this User."""
         send_mail(subject, message, from_email, [self.email], **kwargs)
+
+
+class Token(models.Model):
+    """Auth token which expires when unused for `TOKEN_TTL`.
+
+    A user has a token per login, and `last_used` is refreshed at most once per
+    `TOKEN_REFRESH_INTERVAL`, see users.authentication.
+    """
+
+    key = models.CharField(_("key"), max_length=40, primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="auth_tokens",
+        verbose_name=_("user"),
+    )
+    created = models.DateTimeField(_("created"), auto_now_add=True)
+    last_used = models.DateTimeField(
+        _("last used"), default=timezone.now, db_index=True
+    )
+
+    objects = TokenQuerySet.as_manager()
+
+    class Meta:
+        """Model meta options."""
+
+        verbose_name = _("token")
+        verbose_name_plural = _("tokens")
+
+    def __str__(self):
+        """Return the key."""
+        return self.key
+
+    def save(self, *args, **kwargs):
+        """Generate the key of new tokens."""
+        if not self.key:
+            self.key = self.generate_key()
+        return super().save(*args, **kwargs)
+
+    @staticmethod
+    def generate_key() -> str:
+        """Return a new random key."""
+        return binascii.hexlify(os.urandom(20)).decode()
+
+    @property
+    def expires(self) -> datetime:
+        """Return when the token expires unless it is used."""
+        return self.last_used + settings.TOKEN_TTL
@@ -6,12 +6,16 @@ import dj_rest_auth.serializers
 import django.core.exceptions
 from django.conf import settings
 from django.contrib.auth.password_validation import validate_password
+from django.core import signing
 from django.utils.http import urlsafe_base64_encode
 from django.utils.translation import gettext_lazy as _
 from rest_framework.exceptions import ValidationError
+from rest_framework.validators import UniqueValidator
 from rest_framework_json_api import serializers
 
-from users.models import User
+from users import signed_tokens
+from users.forms import PasswordResetForm
+from users.models import Token, User
 
 RESET_TEMPLATES = {
     "email_template_name": "registration/password_reset_email.txt",
@@ -44,11 +48,13 @@ class TokenSerializer(
 
     token = serializers.CharField(read_only=True, source="_backup_key")
     user = serializers.ResourceRelatedField(read_only=True)
+    access = serializers.SerializerMethodField()
+    refresh = serializers.SerializerMethodField()
 
     class Meta(dj_rest_auth.serializers.TokenSerializer.Meta):
         """Serializer meta information."""
 
-        fields = ["token", "user"]
+        fields = ["token", "user", "access", "refresh"]
 
     class JSONAPIMeta:
         """JSONAPI meta information."""
@@ -61,6 +67,24 @@ class TokenSerializer(
         if getattr(self, "instance", None):
             self.instance._backup_key = self.instance.pk
             self.instance.pk = self.context["request"].user.pk
+        if not settings.SIGNED_TOKENS_ENABLED:
+            self.fields.pop("access")
+            self.fields.pop("refresh")
+        self._signed_tokens = None
+
+    def get_signed_tokens(self, instance):
+        """Return the signed tokens issued for the login."""
+        if self._signed_tokens is None:
+            self._signed_tokens = signed_tokens.issue_tokens(instance.user)
+        return self._signed_tokens
+
+    def get_access(self, instance):
+        """Return the signed access token."""
+        return self.get_signed_tokens(instance)[signed_tokens.ACCESS]
+
+    def get_refresh(self, instance):
+        """Return the signed refresh token."""
+        return self.get_signed_tokens(instance)[signed_tokens.REFRESH]
 
 
 class LoginSerializer(
@@ -80,6 +104,32 @@ class LoginSerializer(
         return value.casefold()
 
 
+class TokenRefreshSerializer(serializers.Serializer):
+    """Exchange a signed refresh token for new signed tokens."""
+
+    access = serializers.CharField(read_only=True)
+    refresh = serializers.CharField()
+
+    class JSONAPIMeta:
+        """JSONAPI meta information."""
+
+        resource_name = "token-refreshes"
+
+    def validate_refresh(self, value):  # pylint: disable=no-self-use
+        """Refresh the tokens, the refresh token can only be used once."""
+        try:
+            return signed_tokens.refresh_tokens(value)
+        except signing.BadSignature as error:
+            raise ValidationError(_("The refresh token is invalid.")) from error
+
+    def create(self, validated_data):
+        """Return the new tokens with a pk for the json api renderer."""
+        instance = _UuidPk()
+        instance.access = validated_data["refresh"][signed_tokens.ACCESS]
+        instance.refresh = validated_data["refresh"][signed_tokens.REFRESH]
+        return instance
+
+
 class PasswordResetSerializer(
     serializers.IncludedResourcesValidationMixin,
     serializers.SparseFieldsetsMixin,
@@ -92,6 +142,8 @@ class PasswordResetSerializer(
 
         resource_name = "password-resets"
 
+    password_reset_form_class = PasswordResetForm
+
     def get_email_context(self):
         """Casefold the email address before encoding it."""
         email = self.data["email"].casefold().encode("utf-8")
@@ -135,8 +187,11 @@ class PasswordResetConfirmSerializer(
         resource_name = "password-reset-confirmations"
 
     def save(self):
-        """Add an instance with a pk for the json api renderer."""
+        """Revoke the user's tokens and add an instance for the renderer."""
         to_return = super().save()
+        self.user.auth_tokens.revoke()
+        if settings.SIGNED_TOKENS_ENABLED:
+            signed_tokens.revoke_users([self.user])
         if getattr(self, "instance", None) is None:
             self.instance = _UuidPk()
         return to_return
@@ -153,6 +208,17 @@ class UserSerializer(serializers.ModelSerializer):
 
         model = User
         fields = ["email", "password", "current_password"]
+        extra_kwargs = {
+            "email": {
+                "validators": [
+                    UniqueValidator(
+                        queryset=User.objects.all(),
+                        lookup="iexact",
+                        message=_("user with this email address already exists."),
+                    )
+                ]
+            }
+        }
 
     def create(self, validated_data):
         """Create the user with the given email and password."""
@@ -165,8 +231,21 @@ class UserSerializer(serializers.ModelSerializer):
         """Set the password on the instance."""
         if "password" in validated_data:
             instance.set_password(validated_data.pop("password"))
+            self.revoke_tokens([instance])
         return super().update(instance, validated_data)
 
+    def revoke_tokens(self, users):
+        """Revoke the tokens of the users, except the token of this request.
+
+        Signed refresh tokens are all denied, including the current one.
+        """
+        request = self.context.get("request")
+        keep = getattr(request, "auth", None)
+        tokens = Token.objects.filter(user__in=users)
+        tokens.revoke(keep=keep if isinstance(keep, Token) else None)
+        if settings.SIGNED_TOKENS_ENABLED:
+            signed_tokens.revoke_users(users)
+
     def validate(self, attrs):
         """Validate data."""
         attrs = super().validate(attrs)
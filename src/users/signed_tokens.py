@@ -0,0 +1,152 @@
+"""Stateless signed access and refresh tokens.
+
+Access tokens are short-lived and verified with the signing keys alone, so
+requests authenticated with them need no database or cache lookups. Refresh
+tokens are checked against a small denylist in the cache when they are used
+to get new tokens, which is how sessions, used refresh tokens and all the
+sessions of a user are revoked.
+"""
+from time import time
+from typing import Any, Dict, Iterable, List
+from uuid import uuid4
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+
+from users.models import User
+
+ACCESS = "access"
+REFRESH = "refresh"
+
+
+def get_signing_keys() -> List[str]:
+    """Return the signing keys, new tokens are signed with the first one.
+
+    Signatures use keys derived from these with a salt per kind of token, so
+    access and refresh tokens cannot be swapped.
+    """
+    return settings.SIGNED_TOKEN_KEYS
+
+
+def get_ttl(kind: str) -> int:
+    """Return the lifetime in seconds of the kind of token."""
+    if kind == ACCESS:
+        return int(settings.SIGNED_TOKEN_ACCESS_TTL.total_seconds())
+    return int(settings.SIGNED_TOKEN_REFRESH_TTL.total_seconds())
+
+
+def encode(claims: Dict[str, Any], kind: str) -> str:
+    """Sign the claims with the current key."""
+    return signing.dumps(claims, key=get_signing_keys()[0], salt=f"users.{kind}")
+
+
+def decode(value: str, kind: str) -> Dict[str, Any]:
+    """Return the claims of the token signed with any of the keys.
+
+    :raises signing.BadSignature: if the token is invalid or expired.
+    """
+    for key in get_signing_keys():
+        try:
+            return signing.loads(
+                value, key=key, salt=f"users.{kind}", max_age=get_ttl(kind)
+            )
+        except signing.SignatureExpired:
+            raise
+        except signing.BadSignature:
+            continue
+    raise signing.BadSignature("Token signature does not match")
+
+
+def issue_tokens(user: User, session_id: str = "") -> Dict[str, str]:
+    """Return a new access and refresh token for the user's session."""
+    claims = {"uid": user.pk, "sid": session_id or uuid4().hex}
+    refresh_claims = {**claims, "jti": uuid4().hex, "iat": time()}
+    return {ACCESS: encode(claims, ACCESS), REFRESH: encode(refresh_claims, REFRESH)}
+
+
+def _get_cache():
+    return caches[settings.SIGNED_TOKEN_DENYLIST_CACHE]
+
+
+def _deny(keys: Iterable[str], value: Any):
+    _get_cache().set_many({key: value for key in keys}, get_ttl(REFRESH))
+
+
+def revoke_sessions(session_ids: Iterable[str]):
+    """Deny the refresh tokens of the sessions."""
+    _deny([f"signed_tokens:sid:{sid}" for sid in session_ids], True)
+
+
+def revoke_users(users: Iterable[User]):
+    """Deny the refresh tokens issued to the users until now."""
+    _deny([f"signed_tokens:uid:{user.pk}" for user in users], time())
+
+
+def refresh_tokens(value: str) -> Dict[str, str]:
+    """Return new tokens for the session of the refresh token.
+
+    The refresh token is rotated: it is denied once used.
+
+    :raises signing.BadSignature: if the token is invalid, expired or revoked.
+    """
+    claims = decode(value, REFRESH)
+    sid_key = f"signed_tokens:sid:{claims['sid']}"
+    uid_key = f"signed_tokens:uid:{claims['uid']}"
+    cache = _get_cache()
+    denied = cache.get_many([sid_key, uid_key])
+    if sid_key in denied or denied.get(uid_key, 0) >= claims["iat"]:
+        raise signing.BadSignature("Token has been revoked")
+    user = User.objects.filter(pk=claims["uid"], is_active=True).first()
+    if user is None:
+        raise signing.BadSignature("Token user is inactive")
+    # add is atomic, so a refresh token can only be used once
+    if not cache.add(f"signed_tokens:jti:{claims['jti']}", True, get_ttl(REFRESH)):
+        raise signing.BadSignature("Token has been used")
+    return issue_tokens(user, claims["sid"])
+
+
+class SignedToken:
+    """The claims of the access token used to authenticate a request."""
+
+    def __init__(self, claims: Dict[str, Any]):
+        """Set the claims."""
+        self.claims = claims
+
+    def delete(self):
+        """Revoke the session of the token, i.e. logout."""
+        revoke_sessions([self.claims["sid"]])
+
+
+class StatelessUser:
+    """User of a signed access token, loaded from the database when needed.
+
+    The pk is known from the token, any other attribute loads the user, which
+    fails the authentication if the user was deleted or deactivated since.
+    """
+
+    _meta = User._meta  # pylint: disable=protected-access
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, pk):  # pylint: disable=invalid-name
+        """Set the pk of the user."""
+        self.pk = self.id = pk  # pylint: disable=invalid-name
+        self._user = None
+
+    def __getattr__(self, name):
+        """Return the attribute of the user."""
+        if name == "_user":
+            raise AttributeError(name)
+        if self._user is None:
+            user = User.objects.filter(pk=self.pk, is_active=True).first()
+            if user is None:
+                raise AuthenticationFailed(_("User inactive or deleted."))
+            self._user = user
+        return getattr(self._user, name)
+
+    def __str__(self):
+        """Return the string of the user."""
+        return str(self.email)
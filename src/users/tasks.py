@@ -0,0 +1,12 @@
+"""Tasks for the users app."""
+from celery import shared_task
+from django.conf import settings
+
+from users.models import Token
+from webapp.db import delete_in_batches
+
+
+@shared_task(result_policy="ignore", queue_class="bulk")
+def purge_expired_tokens():
+    """Delete expired auth tokens in batches."""
+    return delete_in_batches(Token.objects.expired(), settings.TOKEN_PURGE_BATCH_SIZE)
@@ -1,10 +1,24 @@
 """Factories for users app."""
+from functools import lru_cache
+
 import factory
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import Permission
 
 from users import models
 
 
+@lru_cache(maxsize=None)
+def _make_password(password: str, hasher: str) -> str:
+    return make_password(password)
+
+
+def make_cached_password(password: str) -> str:
+    """Return the hash of the password, hashed once per password and hasher."""
+    return _make_password(password, settings.PASSWORD_HASHERS[0])
+
+
 class UserFactory(factory.django.DjangoModelFactory):
     """User factory."""
 
@@ -15,7 +29,12 @@ class UserFactory(factory.django.DjangoModelFactory):
         django_get_or_create = ["email"]
 
     email = factory.Sequence(lambda n: "user_%04d@example.com" % n)
-    password = factory.PostGenerationMethodCall("set_password", "pass")
+
+    @factory.post_generation
+    # pylint: disable=unused-argument
+    def password(user, create, extracted, **kwargs):
+        """Set the password, hashing each password once."""
+        user.password = make_cached_password(extracted or "pass")
 
     @factory.post_generation
     # pylint: disable=unused-argument
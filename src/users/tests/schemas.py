@@ -23,3 +23,12 @@ class SessionsSchema(JsonApiSchema):
     attributes = {"token": instance_of(str)}
     relationships = {"user": is_to_one(resource_name="users")}
     includes: List[Union[IsResourceObject, str]] = []
+
+
+class PasswordResetsSchema(JsonApiSchema):
+    """Schema for password resets."""
+
+    resource_name = "password-resets"
+    attributes = {"email": instance_of(str)}
+    relationships: Dict[str, IsJsonApiRelationship] = {}
+    includes: List[Union[IsResourceObject, str]] = []
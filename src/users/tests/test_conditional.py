@@ -0,0 +1,103 @@
+"""Tests for conditional requests on users and sessions."""
+from __future__ import annotations
+
+from rest_framework import status
+
+from users.tests import factories, schemas
+from webapp.test.base import JsonApiTestCase
+
+
+class TestCase(JsonApiTestCase):
+    """Test ETag validation on the users endpoint."""
+
+    schema = schemas.UsersSchema
+
+    def test_user_get_self_not_modified(self):
+        """User gets 304 for their unchanged self."""
+        user = factories.UserFactory()
+        self.auth(user)
+        path = f"/{self.resource_name}/{user.pk}/"
+        response = self.get(path, asserted_status=status.HTTP_200_OK)
+        etag = response["ETag"]
+        self.get(
+            path, HTTP_IF_NONE_MATCH=etag, asserted_status=status.HTTP_304_NOT_MODIFIED
+        )
+        # check a change gives a new representation
+        user.save()
+        self.get(path, HTTP_IF_NONE_MATCH=etag, asserted_status=status.HTTP_200_OK)
+
+    def test_user_get_self_not_modified_since(self):
+        """User gets 304 for their self unchanged since Last-Modified."""
+        user = factories.UserFactory()
+        self.auth(user)
+        path = f"/{self.resource_name}/{user.pk}/"
+        response = self.get(path, asserted_status=status.HTTP_200_OK)
+        self.get(
+            path,
+            HTTP_IF_MODIFIED_SINCE=response["Last-Modified"],
+            asserted_status=status.HTTP_304_NOT_MODIFIED,
+        )
+
+    def test_uwp_list_not_modified(self):
+        """Users with perms get 304 for an unchanged list."""
+        user = factories.UserFactory(permission_codes=["users.view_user"])
+        self.auth(user)
+        path = f"/{self.resource_name}/"
+        etag = self.get(path, asserted_status=status.HTTP_200_OK)["ETag"]
+        self.get(
+            path, HTTP_IF_NONE_MATCH=etag, asserted_status=status.HTTP_304_NOT_MODIFIED
+        )
+        # check a new user gives a new list
+        factories.UserFactory()
+        self.get(path, HTTP_IF_NONE_MATCH=etag, asserted_status=status.HTTP_200_OK)
+
+    def test_user_patch_if_match(self):
+        """User cannot update themself from an outdated version."""
+        password = "pass"
+        user = factories.UserFactory(password=password)
+        self.auth(user)
+        path = f"/{self.resource_name}/{user.pk}/"
+        etag = self.get(path, asserted_status=status.HTTP_200_OK)["ETag"]
+        data = {
+            "data": self.schema.get_data(
+                id=user.pk, current_password=password, password="hellopass123"
+            )
+        }
+        response = self.patch(
+            path, data=data, HTTP_IF_MATCH=etag, asserted_status=status.HTTP_200_OK
+        )
+        # check the ETags are compared weakly
+        self.assertTrue(response["ETag"].startswith("W/"))
+        data = {
+            "data": self.schema.get_data(
+                id=user.pk, current_password="hellopass123", password="hellopass456"
+            )
+        }
+        response = self.patch(
+            path,
+            data=data,
+            HTTP_IF_MATCH=response["ETag"][2:],
+            asserted_status=status.HTTP_200_OK,
+        )
+        # check the old version cannot be updated
+        self.assertNotEqual(response["ETag"], etag)
+        self.patch(
+            path,
+            data=data,
+            HTTP_IF_MATCH=etag,
+            asserted_status=status.HTTP_412_PRECONDITION_FAILED,
+        )
+
+    def test_user_get_session_not_modified(self):
+        """User gets 304 for their unchanged session."""
+        self.auth(factories.UserFactory())
+        path = f"/{schemas.SessionsSchema.resource_name}/"
+        etag = self.get(path, asserted_status=status.HTTP_200_OK)["ETag"]
+        self.get(
+            path, HTTP_IF_NONE_MATCH=etag, asserted_status=status.HTTP_304_NOT_MODIFIED
+        )
+        # check anonymous users are not authenticated by the ETag
+        self.auth(None)
+        self.get(
+            path, HTTP_IF_NONE_MATCH=etag, asserted_status=status.HTTP_401_UNAUTHORIZED
+        )
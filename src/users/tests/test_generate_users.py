@@ -0,0 +1,58 @@
+"""Tests for the generate_users command."""
+import os
+import tempfile
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase as DjangoTestCase
+
+from users.models import User
+
+
+class TestCase(DjangoTestCase):
+    """Test the generate_users command."""
+
+    def test_generate(self):
+        """Users are generated in batches with a usable password."""
+        count = User.objects.count()
+        call_command("generate_users", 25, batch_size=10, verbosity=0)
+        self.assertEqual(User.objects.count(), count + 25)
+        user = User.objects.latest("pk")
+        self.assertTrue(user.check_password("pass"))
+        # check generating again adds users
+        call_command("generate_users", 5, verbosity=0)
+        self.assertEqual(User.objects.count(), count + 30)
+
+    def test_generate_after_deletions(self):
+        """The emails continue from the last generated one, not the count."""
+        call_command("generate_users", 5, verbosity=0)
+        count = User.objects.count()
+        User.objects.filter(email__startswith="user_").earliest("pk").delete()
+        call_command("generate_users", 5, verbosity=0)
+        self.assertEqual(User.objects.count(), count + 4)
+
+    def test_dump_requires_postgresql(self):
+        """Dumps use COPY, which is only available on PostgreSQL."""
+        if connection.vendor == "postgresql":
+            self.skipTest("dumps are supported")
+        with self.assertRaises(CommandError):
+            call_command("generate_users", 5, dump="users.csv", verbosity=0)
+
+    def test_dump_and_load(self):
+        """The dumped users are loaded back as they were."""
+        if connection.vendor != "postgresql":
+            self.skipTest("dumps are only supported on PostgreSQL")
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "users.csv")
+            call_command("generate_users", 5, dump=path, verbosity=0)
+            generated = User.objects.filter(email__startswith="user_")
+            # the dumps leave out the pks, the loaded users get new ones
+            fields = [
+                field.attname
+                for field in User._meta.concrete_fields
+                if not field.primary_key
+            ]
+            expected = list(generated.order_by("email").values(*fields))
+            generated.delete()
+            call_command("generate_users", load=path, verbosity=0)
+        self.assertEqual(list(generated.order_by("email").values(*fields)), expected)
@@ -0,0 +1,105 @@
+"""Tests for the cached lists of users."""
+from __future__ import annotations
+
+from django.contrib.auth.models import Group, Permission, update_last_login
+from rest_framework import status
+
+from users.models import User
+from users.tests import factories, schemas
+from webapp.test.base import JsonApiTestCase
+
+
+class TestCase(JsonApiTestCase):
+    """Test the list cache on the users endpoint."""
+
+    schema = schemas.UsersSchema
+
+    def test_list_cached(self):
+        """Repeated lists are served without queries."""
+        self.auth(factories.UserFactory(permission_codes=["users.view_user"]))
+        path = f"/{self.resource_name}/?sort=-email"
+        response = self.get(path, asserted_status=status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            cached = self.get(path, asserted_status=status.HTTP_200_OK)
+        self.assertEqual(cached.content, response.content)
+        # check the cached ETag is answered
+        with self.assertNumQueries(0):
+            self.get(
+                path,
+                HTTP_IF_NONE_MATCH=response["ETag"],
+                asserted_status=status.HTTP_304_NOT_MODIFIED,
+            )
+
+    def test_list_invalidated(self):
+        """Saving or deleting a user invalidates the cached lists."""
+        self.auth(factories.UserFactory(permission_codes=["users.view_user"]))
+        path = f"/{self.resource_name}/"
+        count = len(self.get(path).json()["data"])
+        other = factories.UserFactory()
+        response = self.get(path, asserted_status=status.HTTP_200_OK)
+        # check the new user is listed
+        self.assertEqual(len(response.json()["data"]), count + 1)
+        other.delete()
+        response = self.get(path, asserted_status=status.HTTP_200_OK)
+        self.assertEqual(len(response.json()["data"]), count)
+
+    def test_list_invalidated_on_permissions_changed(self):
+        """Revoking a permission of a group invalidates the cached lists."""
+        group = Group.objects.create(name="viewers")
+        group.permissions.add(Permission.objects.get(codename="view_user"))
+        user = factories.UserFactory()
+        user.groups.add(group)
+        factories.UserFactory()
+        self.auth(user)
+        path = f"/{self.resource_name}/"
+        self.assertGreater(len(self.get(path).json()["data"]), 1)
+        group.permissions.clear()
+        # check a fresh user without the cached permissions
+        self.auth(User.objects.get(pk=user.pk))
+        response = self.get(path, asserted_status=status.HTTP_200_OK)
+        # check only the user themself is listed
+        self.assertEqual(len(response.json()["data"]), 1)
+
+    def test_login_keeps_list(self):
+        """Logging in does not invalidate the cached lists."""
+        user = factories.UserFactory(permission_codes=["users.view_user"])
+        self.auth(user)
+        path = f"/{self.resource_name}/"
+        self.get(path, asserted_status=status.HTTP_200_OK)
+        update_last_login(None, user)
+        with self.assertNumQueries(0):
+            self.get(path, asserted_status=status.HTTP_200_OK)
+
+    def test_list_scoped(self):
+        """Users do not get the cached lists of other users."""
+        self.auth(factories.UserFactory(permission_codes=["users.view_user"]))
+        path = f"/{self.resource_name}/"
+        self.get(path, asserted_status=status.HTTP_200_OK)
+        self.auth(factories.UserFactory())
+        response = self.get(path, asserted_status=status.HTTP_200_OK)
+        # check only the user themself is listed
+        self.assertEqual(len(response.json()["data"]), 1)
+
+    def test_operations_invalidate(self):
+        """Bulk operations invalidate the cached lists."""
+        self.auth(
+            factories.UserFactory(
+                permission_codes=["users.view_user", "users.add_user"]
+            )
+        )
+        path = f"/{self.resource_name}/"
+        count = len(self.get(path).json()["data"])
+        data = {
+            "atomic:operations": [
+                {
+                    "op": "add",
+                    "data": self.schema.get_data(
+                        email="one@example.com", password="hellopass123"
+                    ),
+                }
+            ]
+        }
+        self.post(f"{path}operations/", data=data, asserted_status=status.HTTP_200_OK)
+        response = self.get(path, asserted_status=status.HTTP_200_OK)
+        # check the new user is listed
+        self.assertEqual(len(response.json()["data"]), count + 1)
@@ -0,0 +1,37 @@
+"""Tests for password reset requests."""
+from __future__ import annotations
+
+from unittest import mock
+
+from django.core import mail
+from rest_framework import status
+
+from users.tests import factories, schemas
+from webapp import tasks
+from webapp.test.base import JsonApiTestCase
+
+
+class TestCase(JsonApiTestCase):
+    """Test password reset requests."""
+
+    schema = schemas.PasswordResetsSchema
+
+    def test_anon_create_queues_email(self):
+        """The reset email is sent by a task, not by the request."""
+        user = factories.UserFactory(email="user@example.com")
+        data = {"data": self.schema.get_data(email=user.email)}
+        with mock.patch.object(tasks.send_email, "apply_async") as apply_async:
+            self.post(
+                f"/{self.resource_name}/",
+                data=data,
+                asserted_status=status.HTTP_201_CREATED,
+            )
+        # check the request did not send the email
+        self.assertEqual(mail.outbox, [])
+        apply_async.assert_called_once()
+        args, kwargs = apply_async.call_args[0]
+        # check the task sends the rendered email
+        tasks.send_email(*args, **kwargs)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, [user.email])
+        self.assertEqual(len(mail.outbox[0].alternatives), 1)
@@ -1,10 +1,16 @@
 """Tests for sessions endpoint."""
 from __future__ import annotations
 
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
 from rest_framework import status
 
 from users.tests import factories, schemas
+from webapp import tasks
 from webapp.test.base import JsonApiTestCase
+from webapp.throttling import TokenBucketThrottle
 
 
 class TestCase(JsonApiTestCase):
@@ -30,6 +36,99 @@ class TestCase(JsonApiTestCase):
         self.assertEqual(
             json["data"]["relationships"]["user"]["data"]["id"], str(user.pk)
         )
+        # check no session was stored for the token authenticated client
+        self.assertFalse(Session.objects.exists())
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+
+    def test_anon_create_token_only(self):
+        """Logging in via the API only issues a token, even with a session cookie."""
+        email = "test@example.com"
+        password = "hellopass123"
+        user = factories.UserFactory(email=email, password=password)
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = "browser"
+        data = {"data": self.schema.get_data(email=email, password=password)}
+        response = self.post(
+            f"/{self.resource_name}/",
+            data=data,
+            asserted_status=status.HTTP_201_CREATED,
+        )
+        # the unknown session is cleared as usual, but no session is issued
+        cookie = response.cookies.get(settings.SESSION_COOKIE_NAME)
+        self.assertEqual(getattr(cookie, "value", ""), "")
+        self.assertFalse(Session.objects.exists())
+        # check the login is still recorded
+        user.refresh_from_db()
+        self.assertIsNotNone(user.last_login)
+
+    def test_anon_create_ignores_case(self):
+        """Unauthenticated user can create session using any email case."""
+        password = "hellopass123"
+        user = factories.UserFactory(email="Test@Example.com", password=password)
+        data = {
+            "data": self.schema.get_data(email="TEST@example.com", password=password)
+        }
+        response = self.post(
+            f"/{self.resource_name}/",
+            data=data,
+            asserted_status=status.HTTP_201_CREATED,
+            asserted_schema=self.schema.get_matcher(),
+        )
+        json = response.json()
+        # check the session belongs to the user
+        self.assertEqual(
+            json["data"]["relationships"]["user"]["data"]["id"], str(user.pk)
+        )
+
+    def test_anon_create_locked_out(self):
+        """Unauthenticated user is locked out after repeated failures."""
+        email = "test@example.com"
+        password = "hellopass123"
+        factories.UserFactory(email=email, password=password)
+        path = f"/{self.resource_name}/"
+        data = {"data": self.schema.get_data(email=email, password="wrong")}
+        task = tasks.email_admins_on_user_locked_out
+        with mock.patch.object(task, "apply_async") as apply_async:
+            for _ in range(settings.AXES_FAILURE_LIMIT):
+                self.post(path, data=data, asserted_status=status.HTTP_400_BAD_REQUEST)
+            # check the admins are notified on lockout
+            apply_async.assert_called_once()
+            # check the correct password is rejected while locked out
+            data = {"data": self.schema.get_data(email=email, password=password)}
+            self.post(path, data=data, asserted_status=status.HTTP_400_BAD_REQUEST)
+
+    def test_anon_create_throttled(self):
+        """Unauthenticated user is throttled after a burst of attempts."""
+        data = {"data": self.schema.get_data(email="test@example.com", password="p")}
+        path = f"/{self.resource_name}/"
+        rates = {"login": "100/m", "login_ip": "2/m"}
+        with mock.patch.object(TokenBucketThrottle, "THROTTLE_RATES", rates):
+            for _ in range(2):
+                self.post(path, data=data, asserted_status=status.HTTP_400_BAD_REQUEST)
+            response = self.post(
+                path, data=data, asserted_status=status.HTTP_429_TOO_MANY_REQUESTS
+            )
+        # check the client is told when a token is available again
+        self.assertEqual(response["Retry-After"], "30")
+
+    def test_throttled_ip_keeps_global_tokens(self):
+        """Attempts refused per IP do not take tokens from the global bucket."""
+        data = {"data": self.schema.get_data(email="test@example.com", password="p")}
+        path = f"/{self.resource_name}/"
+        rates = {"login": "3/m", "login_ip": "1/m"}
+        with mock.patch.object(TokenBucketThrottle, "THROTTLE_RATES", rates):
+            self.post(path, data=data, asserted_status=status.HTTP_400_BAD_REQUEST)
+            for _ in range(5):
+                self.post(
+                    path, data=data, asserted_status=status.HTTP_429_TOO_MANY_REQUESTS
+                )
+            # other clients still get the two global tokens left
+            for index in range(2):
+                self.post(
+                    path,
+                    data=data,
+                    HTTP_X_FORWARDED_FOR=f"203.0.113.{index}",
+                    asserted_status=status.HTTP_400_BAD_REQUEST,
+                )
 
     def test_user_get_own(self):
         """User can get own session."""
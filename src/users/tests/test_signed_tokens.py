@@ -0,0 +1,101 @@
+"""Tests for stateless signed tokens."""
+from __future__ import annotations
+
+from django.conf import settings
+from django.test import override_settings
+from rest_framework import status
+
+from users.models import User
+from users.tests import factories, schemas
+from webapp.test.base import JsonApiTestCase
+
+
+@override_settings(SIGNED_TOKENS_ENABLED=True)
+class TestCase(JsonApiTestCase):
+    """Test login, refresh and revocation of signed tokens."""
+
+    schema = schemas.SessionsSchema
+
+    def login(self, email="user@example.com", password="pass"):
+        """Log in and return the session attributes."""
+        factories.UserFactory(email=email, password=password)
+        data = {"data": self.schema.get_data(email=email, password=password)}
+        response = self.post(
+            f"/{self.resource_name}/",
+            data=data,
+            asserted_status=status.HTTP_201_CREATED,
+        )
+        return response.json()["data"]["attributes"]
+
+    def use_access(self, access: str):
+        """Authenticate the client with the access token."""
+        self.client.credentials(  # pylint: disable=no-member
+            HTTP_AUTHORIZATION=f"Bearer {access}"
+        )
+
+    def refresh(self, refresh: str, asserted_status=status.HTTP_201_CREATED):
+        """Exchange the refresh token for new tokens."""
+        data = {"data": {"type": "token-refreshes", "attributes": {"refresh": refresh}}}
+        return self.post(
+            "/token-refreshes/", data=data, asserted_status=asserted_status
+        )
+
+    def test_access_without_queries(self):
+        """Access tokens authenticate without database queries."""
+        attributes = self.login()
+        self.use_access(attributes["access"])
+        with self.assertNumQueries(0):
+            self.get(f"/{self.resource_name}/", asserted_status=status.HTTP_200_OK)
+
+    def test_invalid_access(self):
+        """Tampered access tokens are rejected."""
+        attributes = self.login()
+        self.use_access(f"{attributes['access']}x")
+        self.get(
+            f"/{self.resource_name}/", asserted_status=status.HTTP_401_UNAUTHORIZED
+        )
+
+    def test_refresh_rotates(self):
+        """Refresh tokens can only be used once."""
+        attributes = self.login()
+        response = self.refresh(attributes["refresh"])
+        self.use_access(response.json()["data"]["attributes"]["access"])
+        self.get(f"/{self.resource_name}/", asserted_status=status.HTTP_200_OK)
+        # check the used refresh token is rejected
+        self.refresh(attributes["refresh"], status.HTTP_400_BAD_REQUEST)
+
+    def test_logout_revokes(self):
+        """Logging out revokes the refresh token of the session."""
+        attributes = self.login()
+        self.use_access(attributes["access"])
+        self.delete(
+            f"/{self.resource_name}/", asserted_status=status.HTTP_204_NO_CONTENT
+        )
+        self.refresh(attributes["refresh"], status.HTTP_400_BAD_REQUEST)
+
+    def test_key_rotation(self):
+        """Tokens signed with an old key are accepted."""
+        attributes = self.login()
+        with self.settings(SIGNED_TOKEN_KEYS=["new-key"]):
+            self.refresh(attributes["refresh"], status.HTTP_400_BAD_REQUEST)
+        with self.settings(SIGNED_TOKEN_KEYS=["new-key", *settings.SIGNED_TOKEN_KEYS]):
+            self.refresh(attributes["refresh"])
+
+    def test_deleted_user(self):
+        """Access tokens of deleted users are rejected when the user is loaded."""
+        attributes = self.login()
+        self.use_access(attributes["access"])
+        User.objects.get(email="user@example.com").delete()
+        self.get("/users/", asserted_status=status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user(self):
+        """Deactivating a user rejects its access and revokes its refresh tokens."""
+        attributes = self.login()
+        self.use_access(attributes["access"])
+        user = User.objects.get(email="user@example.com")
+        user.is_active = False
+        user.save()
+        self.get("/users/", asserted_status=status.HTTP_401_UNAUTHORIZED)
+        user.is_active = True
+        user.save()
+        self.refresh(attributes["refresh"], status.HTTP_400_BAD_REQUEST)
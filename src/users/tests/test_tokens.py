@@ -0,0 +1,77 @@
+"""Tests for expiring auth tokens."""
+from __future__ import annotations
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import status
+
+from users import tasks
+from users.models import Token
+from users.tests import factories, schemas
+from webapp.test.base import JsonApiTestCase
+
+
+class TestCase(JsonApiTestCase):
+    """Test the expiry of auth tokens."""
+
+    schema = schemas.SessionsSchema
+
+    def get_with_token(self, token: Token, asserted_status: int):
+        """Get the session using the token."""
+        self.client.credentials(  # pylint: disable=no-member
+            HTTP_AUTHORIZATION=f"Token {token.key}"
+        )
+        return self.get(f"/{self.resource_name}/", asserted_status=asserted_status)
+
+    def test_login_creates_token(self):
+        """Each login creates a new token."""
+        email = "user@example.com"
+        password = "pass"
+        user = factories.UserFactory(email=email, password=password)
+        data = {"data": self.schema.get_data(email=email, password=password)}
+        for _ in range(2):
+            self.post(
+                f"/{self.resource_name}/",
+                data=data,
+                asserted_status=status.HTTP_201_CREATED,
+            )
+        # check the user has a token per login
+        self.assertEqual(user.auth_tokens.count(), 2)
+
+    def test_expired_token(self):
+        """Tokens unused for longer than the TTL are rejected."""
+        token = Token.objects.create(
+            user=factories.UserFactory(),
+            last_used=timezone.now() - settings.TOKEN_TTL,
+        )
+        self.get_with_token(token, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_coalesced(self):
+        """The last use is only written once per refresh interval."""
+        recent = timezone.now() - settings.TOKEN_REFRESH_INTERVAL / 2
+        stale = timezone.now() - settings.TOKEN_REFRESH_INTERVAL
+        user = factories.UserFactory()
+        recent_token = Token.objects.create(user=user, last_used=recent)
+        stale_token = Token.objects.create(user=user, last_used=stale)
+        self.get_with_token(recent_token, status.HTTP_200_OK)
+        self.get_with_token(stale_token, status.HTTP_200_OK)
+        recent_token.refresh_from_db()
+        stale_token.refresh_from_db()
+        # check only the stale token was refreshed
+        self.assertEqual(recent_token.last_used, recent)
+        self.assertGreater(stale_token.last_used, stale)
+
+    def test_purge_expired_tokens(self):
+        """Only expired tokens are purged."""
+        user = factories.UserFactory()
+        expired = timezone.now() - settings.TOKEN_TTL - timedelta(minutes=1)
+        for _ in range(3):
+            Token.objects.create(user=user, last_used=expired)
+        current = Token.objects.create(user=user)
+        with self.settings(TOKEN_PURGE_BATCH_SIZE=2):
+            deleted = tasks.purge_expired_tokens()
+        # check only the expired tokens were deleted
+        self.assertEqual(deleted, 3)
+        self.assertEqual(list(Token.objects.values_list("pk", flat=True)), [current.pk])
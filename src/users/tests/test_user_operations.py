@@ -0,0 +1,180 @@
+"""Tests for the users atomic operations endpoint."""
+from __future__ import annotations
+
+from rest_framework import status
+
+from users.models import User
+from users.tests import factories, schemas
+from webapp.test.base import JsonApiTestCase
+
+
+class TestCase(JsonApiTestCase):
+    """Test bulk creation and updates on the users operations endpoint."""
+
+    schema = schemas.UsersSchema
+
+    @property
+    def path(self):
+        """Return the path of the operations endpoint."""
+        return f"/{self.resource_name}/operations/"
+
+    def test_anon_operations(self):
+        """Unauthenticated users cannot run operations."""
+        data = {
+            "atomic:operations": [
+                {
+                    "op": "add",
+                    "data": self.schema.get_data(
+                        email="test@example.com", password="hellopass123"
+                    ),
+                }
+            ]
+        }
+        self.post(self.path, data=data, asserted_status=status.HTTP_401_UNAUTHORIZED)
+        # check no user was created
+        self.assertFalse(User.objects.filter(email="test@example.com").exists())
+
+    def test_user_add(self):
+        """User without perms cannot create users."""
+        user = factories.UserFactory()
+        self.auth(user)
+        data = {
+            "atomic:operations": [
+                {
+                    "op": "add",
+                    "data": self.schema.get_data(
+                        email="test@example.com", password="hellopass123"
+                    ),
+                }
+            ]
+        }
+        self.post(self.path, data=data, asserted_status=status.HTTP_403_FORBIDDEN)
+
+    def test_uwp_add(self):
+        """Users with perms can create many users."""
+        user = factories.UserFactory(permission_codes=["users.add_user"])
+        self.auth(user)
+        emails = ["one@example.com", "two@example.com"]
+        password = "hellopass123"
+        data = {
+            "atomic:operations": [
+                {"op": "add", "data": self.schema.get_data(email=e, password=password)}
+                for e in emails
+            ]
+        }
+        response = self.post(self.path, data=data, asserted_status=status.HTTP_200_OK)
+        results = response.json()["atomic:results"]
+        # check a result is returned for each operation in order
+        self.assertEqual(
+            [result["data"]["attributes"]["email"] for result in results], emails
+        )
+        for result in results:
+            self.assertThat(result, self.schema.get_matcher())
+            created = User.objects.get(pk=result["data"]["id"])
+            # check the password was correctly hashed and set
+            self.assertTrue(created.check_password(password))
+
+    def test_uwp_update(self):
+        """Users with perms can update many users."""
+        user = factories.UserFactory(permission_codes=["users.change_user"])
+        others = factories.UserFactory.create_batch(password="pass", size=2)
+        self.auth(user)
+        new_password = "hellopass123"
+        data = {
+            "atomic:operations": [
+                {
+                    "op": "update",
+                    "data": self.schema.get_data(
+                        id=other.pk, current_password="pass", password=new_password
+                    ),
+                }
+                for other in others
+            ]
+        }
+        self.post(self.path, data=data, asserted_status=status.HTTP_200_OK)
+        for other in others:
+            other.refresh_from_db()
+            # check the password was successfully updated
+            self.assertTrue(other.check_password(new_password))
+
+    def test_invalid_operation(self):
+        """No users are written when any operation is invalid."""
+        user = factories.UserFactory(permission_codes=["users.add_user"])
+        self.auth(user)
+        data = {
+            "atomic:operations": [
+                {
+                    "op": "add",
+                    "data": self.schema.get_data(
+                        email="one@example.com", password="hellopass123"
+                    ),
+                },
+                {
+                    "op": "add",
+                    "data": self.schema.get_data(email="two@example.com", password="1"),
+                },
+            ]
+        }
+        response = self.post(
+            self.path, data=data, asserted_status=status.HTTP_400_BAD_REQUEST
+        )
+        errors = response.json()["errors"]
+        # check the error points at the invalid operation
+        self.assertIn(
+            "/atomic:operations/1/data/attributes/password",
+            [error["source"]["pointer"] for error in errors],
+        )
+        # check the valid operation was not written
+        self.assertFalse(User.objects.filter(email="one@example.com").exists())
+
+    def test_duplicate_email(self):
+        """The same email cannot be added twice in one request."""
+        user = factories.UserFactory(permission_codes=["users.add_user"])
+        self.auth(user)
+        operation = {
+            "op": "add",
+            "data": self.schema.get_data(
+                email="one@example.com", password="hellopass123"
+            ),
+        }
+        response = self.post(
+            self.path,
+            data={"atomic:operations": [operation, operation]},
+            asserted_status=status.HTTP_400_BAD_REQUEST,
+        )
+        errors = response.json()["errors"]
+        self.assertEqual(
+            [error["source"]["pointer"] for error in errors],
+            ["/atomic:operations/1/data/attributes/email"],
+        )
+
+    def test_update_email_with_add(self):
+        """An update setting the email of an add in the same request is safe."""
+        user = factories.UserFactory(
+            permission_codes=["users.add_user", "users.change_user"]
+        )
+        other = factories.UserFactory(password="pass")
+        self.auth(user)
+        operations = [
+            {
+                "op": "add",
+                "data": self.schema.get_data(
+                    email="one@example.com", password="hellopass123"
+                ),
+            },
+            {
+                "op": "update",
+                "data": self.schema.get_data(
+                    id=other.pk, current_password="pass", email="ONE@example.com"
+                ),
+            },
+        ]
+        self.post(
+            self.path,
+            data={"atomic:operations": operations},
+            asserted_status=status.HTTP_200_OK,
+        )
+        # check the email of a user cannot be updated
+        self.assertEqual(
+            User.objects.filter(email__iexact="one@example.com").count(), 1
+        )
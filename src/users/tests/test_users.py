@@ -3,7 +3,7 @@ from __future__ import annotations
 
 from rest_framework import status
 
-from users.models import User
+from users.models import Token, User
 from users.tests import factories, schemas
 from webapp.test.base import JsonApiTestCase
 
@@ -33,6 +33,25 @@ class TestCase(JsonApiTestCase):
         # check the was correctly hashed and set
         self.assertTrue(user.check_password(password))
 
+    def test_anon_create_duplicate_case(self):
+        """Users cannot be created with an existing email in another case."""
+        factories.UserFactory(email="test@example.com")
+        data = {
+            "data": self.schema.get_data(
+                email="Test@Example.com", password="hellopass123"
+            )
+        }
+        response = self.post(
+            f"/{self.resource_name}/",
+            data=data,
+            asserted_status=status.HTTP_400_BAD_REQUEST,
+        )
+        json = response.json()
+        # check has correct error
+        self.assertHasError(
+            json, "email", "user with this email address already exists."
+        )
+
     def test_user_create(self):
         """User cannot create user."""
         user = factories.UserFactory()
@@ -82,6 +101,19 @@ class TestCase(JsonApiTestCase):
         self.assertEqual(json["data"]["id"], str(other_user.pk))
         self.assertEqual(json["data"]["attributes"]["email"], other_user.email)
 
+    def test_uwp_search(self):
+        """User with perms can search users by email."""
+        user = factories.UserFactory(permission_codes=["users.view_user"])
+        other_user = factories.UserFactory(email="needle@example.com")
+        self.auth(user)
+        response = self.get(
+            f"/{self.resource_name}/?filter[search]=NEEDLE",
+            asserted_status=status.HTTP_200_OK,
+        )
+        json = response.json()
+        # check only the matching user is found
+        self.assertEqual([item["id"] for item in json["data"]], [str(other_user.pk)])
+
     def test_user_patch_other(self):
         """User cannot update other users."""
         password = "pass"
@@ -122,6 +154,31 @@ class TestCase(JsonApiTestCase):
         user.refresh_from_db()
         self.assertTrue(user.check_password(new_password))
 
+    def test_user_patch_password_revokes_tokens(self):
+        """Changing the password revokes the user's other tokens."""
+        password = "pass"
+        user = factories.UserFactory(email="user@example.com", password=password)
+        current, _other = Token.objects.create(user=user), Token.objects.create(
+            user=user
+        )
+        unrelated = Token.objects.create(user=factories.UserFactory())
+        self.auth(user, current)
+        data = {
+            "data": self.schema.get_data(
+                id=user.id, current_password=password, password="hellopass123"
+            )
+        }
+        self.patch(
+            f"/{self.resource_name}/{user.pk}/",
+            data=data,
+            asserted_status=status.HTTP_200_OK,
+        )
+        # check only the token of the request and other users' tokens remain
+        self.assertEqual(
+            set(Token.objects.values_list("pk", flat=True)),
+            {current.pk, unrelated.pk},
+        )
+
     def test_current_password_required(self):
         """User cannot change own password without current password."""
         password = "pass"
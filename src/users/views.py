@@ -1,13 +1,18 @@
 """Views for the users app."""
-from typing import List, Type
+from typing import Any, Dict, List, Optional, Tuple, Type
 
 import dj_rest_auth.views
-from django.contrib.auth import logout
+from django.conf import settings
+from django.contrib.auth import logout, user_logged_in
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import connection, transaction
+from django.utils import timezone
 from django.utils.decorators import method_decorator
 from django.utils.translation import gettext_lazy as _
 from django.views.decorators.debug import sensitive_post_parameters
 from rest_framework import mixins, status
-from rest_framework.exceptions import NotAuthenticated
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotAuthenticated, NotFound
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet, ViewSetMixin
@@ -17,25 +22,58 @@ from rest_framework_json_api.views import (
     RelatedMixin,
 )
 
+from users.managers import make_passwords
 from users.models import User
-from users.serializers import SessionSerializer, UserSerializer
+from users.serializers import SessionSerializer, TokenRefreshSerializer, UserSerializer
+from webapp.mixins import CachedListMixin, ConditionalMixin, invalidate_list_cache
+from webapp.parsers import AtomicOperationsParser
+from webapp.renderers import AtomicOperationsRenderer
+from webapp.throttling import IPAndGlobalTokenBucketThrottle
 
 sensitive_post_parameters_m = method_decorator(
     sensitive_post_parameters("password", "current_password")
 )
 
 
+# The permission and denial message for each supported atomic operation
+OPERATION_PERMISSIONS = {
+    "add": ("users.add_user", _("You cannot create users.")),
+    "update": ("users.change_user", _("You cannot update users.")),
+}
+
+
+def _operation_error(
+    detail: str, index: Optional[int] = None, pointer: str = ""
+) -> Dict[str, Any]:
+    """Return a JSON:API error object for the operation at the given index."""
+    if index is not None:
+        pointer = f"/{index}{pointer}"
+    return {
+        "detail": str(detail),
+        "status": str(status.HTTP_400_BAD_REQUEST),
+        "source": {"pointer": f"/atomic:operations{pointer}"},
+    }
+
+
 class _Session:
     def __init__(self, request):
         self.user = request.user
         self.pk = request.user.pk  # pylint: disable=invalid-name
 
 
-class SessionView(ViewSetMixin, dj_rest_auth.views.LoginView):
+class SessionView(ConditionalMixin, ViewSetMixin, dj_rest_auth.views.LoginView):
     """ViewSet for sessions endpoint."""
 
     resource_name = "sessions"
     filter_backends: List[Type] = []
+    throttle_classes = [IPAndGlobalTokenBucketThrottle]
+    throttle_scope = "login"
+
+    def get_throttles(self):
+        """Only throttle login attempts."""
+        if self.request.method != "POST":
+            return []
+        return super().get_throttles()
 
     def check_authentication(self, request):
         """Raise NotAuthenticated exception if not authenticated."""
@@ -55,14 +93,19 @@ class SessionView(ViewSetMixin, dj_rest_auth.views.LoginView):
 
     # pylint: disable=unused-argument
     def list(self, request, *args, **kwargs):
-        """Return the session information."""
+        """Return the session information, or 304 if the user is unchanged."""
         self.check_authentication(request)
+        # the session only depends on the user
+        version = (None, f"{request.get_full_path()}:{request.user.pk}")
+        not_modified = self.conditional_response(request, version)
+        if not_modified is not None:
+            return not_modified
         serializer = SessionSerializer(
             context={"request": request, "view": self},
             instance=[_Session(request)],
             many=True,
         )
-        return Response(serializer.data)
+        return self.conditional_response(request, version, Response(serializer.data))
 
     def post(self, request, *args, **kwargs):
         """Replace the response status code with 201."""
@@ -70,8 +113,18 @@ class SessionView(ViewSetMixin, dj_rest_auth.views.LoginView):
         response.status_code = status.HTTP_201_CREATED
         return response
 
+    def login(self):
+        """Issue a token, without a session see `REST_SESSION_LOGIN`."""
+        super().login()
+        # updates last_login and resets the axes failures like django's login
+        user_logged_in.send(
+            sender=self.user.__class__, request=self.request, user=self.user
+        )
+
 
 class UserView(
+    CachedListMixin,
+    ConditionalMixin,
     AutoPrefetchMixin,
     PreloadIncludesMixin,
     RelatedMixin,
@@ -87,6 +140,9 @@ class UserView(
     serializer_class = UserSerializer
     permission_classes = [AllowAny]
     ordering = ["pk"]
+    search_fields = ["email"]
+    # The maximum number of atomic operations accepted in one request
+    max_operations = 1000
 
     @sensitive_post_parameters_m
     def dispatch(self, request, *args, **kwargs):
@@ -122,12 +178,210 @@ class UserView(
             self.permission_denied(request, message=_("You cannot create users."))
         return super().create(request, *args, **kwargs)
 
+    @action(
+        detail=False,
+        methods=["post"],
+        parser_classes=[AtomicOperationsParser],
+        renderer_classes=[AtomicOperationsRenderer],
+        filter_backends=[],
+        pagination_class=None,
+    )
+    def operations(self, request, *args, **kwargs):
+        """Create and update users in bulk using JSON:API atomic operations.
+
+        Every operation is validated with the UserSerializer before anything is
+        written. Passwords are then hashed concurrently and the users are
+        written with bulk queries in a single transaction.
+        """
+        if not request.user.is_authenticated:
+            raise NotAuthenticated()
+        operations = request.data.get("atomic:operations")
+        error = None
+        if not isinstance(operations, list) or not operations:
+            error = _operation_error(_("A non-empty list of operations is required."))
+        elif len(operations) > self.max_operations:
+            msg = _("No more than %d operations are allowed.") % self.max_operations
+            error = _operation_error(msg)
+        if error is not None:
+            return Response({"errors": [error]}, status=status.HTTP_400_BAD_REQUEST)
+        validated, errors = self._validate_operations(request, operations)
+        if errors:
+            return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+        changed = [
+            serializer.instance
+            for kind, serializer in validated
+            if kind == "update" and "password" in serializer.validated_data
+        ]
+        with transaction.atomic():
+            users = self._save_operations(validated)
+            if changed:
+                self.get_serializer().revoke_tokens(changed)
+        results = [{"data": self._get_resource_object(user)} for user in users]
+        return Response({"atomic:results": results})
+
+    def _validate_operations(
+        self, request, operations: List[Any]
+    ) -> Tuple[List[Tuple[str, UserSerializer]], List[Dict[str, Any]]]:
+        """Return the validated serializer for each operation and any errors."""
+        errors: List[Dict[str, Any]] = []
+        parsed: List[Tuple[int, str, Dict[str, Any]]] = []
+        for index, operation in enumerate(operations):
+            operation = operation if isinstance(operation, dict) else {}
+            kind = operation.get("op")
+            data = operation.get("data")
+            if kind not in OPERATION_PERMISSIONS:
+                errors.append(
+                    _operation_error(_('"op" must be "add" or "update".'), index, "/op")
+                )
+            elif not isinstance(data, dict):
+                errors.append(
+                    _operation_error(_("This field is required."), index, "/data")
+                )
+            elif data.get("type") != User.JSONAPIMeta.resource_name:
+                msg = _('"type" must be "%s".') % User.JSONAPIMeta.resource_name
+                errors.append(_operation_error(msg, index, "/data/type"))
+            else:
+                parsed.append((index, kind, data))
+        if errors:
+            return [], errors
+        for kind in {kind for _index, kind, _data in parsed}:
+            perm, message = OPERATION_PERMISSIONS[kind]
+            if not request.user.has_perm(perm):
+                self.permission_denied(request, message=message)
+        instances = self._get_instances(
+            [data.get("id") for _index, kind, data in parsed if kind == "update"]
+        )
+        validated: List[Tuple[str, UserSerializer]] = []
+        emails: Dict[str, int] = {}
+        for index, kind, data in parsed:
+            instance = None
+            if kind == "update":
+                instance = instances.get(str(data.get("id")))
+                if instance is None:
+                    errors.append(_operation_error(_("Not found."), index, "/data/id"))
+                    continue
+            serializer = self.get_serializer(
+                instance,
+                data=data.get("attributes") or {},
+                partial=instance is not None,
+            )
+            if not serializer.is_valid():
+                errors.extend(self._get_serializer_errors(index, serializer.errors))
+                continue
+            email = serializer.validated_data.get("email")
+            # the emails are unique regardless of their case, see migration 0002
+            if email is not None:
+                email = User.objects.normalize_email(email).casefold()
+                if email in emails:
+                    msg = _("This email is used by the operation at index %d.")
+                    errors.append(
+                        _operation_error(
+                            msg % emails[email], index, "/data/attributes/email"
+                        )
+                    )
+                    continue
+                emails[email] = index
+            validated.append((kind, serializer))
+        return validated, errors
+
+    def _get_instances(self, ids: List[Any]) -> Dict[str, User]:
+        """Return the users which can be updated, keyed by their string pk."""
+        pks = []
+        for pk in ids:  # pylint: disable=invalid-name
+            try:
+                pks.append(User._meta.pk.to_python(pk))
+            except DjangoValidationError:
+                continue
+        if not pks:
+            return {}
+        users = self.get_queryset().in_bulk(pks)
+        return {str(pk): user for pk, user in users.items()}
+
+    @staticmethod
+    def _get_serializer_errors(
+        index: int, serializer_errors: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        """Convert serializer errors into JSON:API errors for the operation."""
+        errors = []
+        for field, messages in serializer_errors.items():
+            pointer = (
+                "/data" if field == "non_field_errors" else f"/data/attributes/{field}"
+            )
+            if not isinstance(messages, list):
+                messages = [messages]
+            errors.extend(_operation_error(msg, index, pointer) for msg in messages)
+        return errors
+
+    @staticmethod
+    def _save_operations(validated: List[Tuple[str, UserSerializer]]) -> List[User]:
+        """Write the validated operations using bulk queries."""
+        passwords = [
+            serializer.validated_data.get("password") for _kind, serializer in validated
+        ]
+        hashed = iter(make_passwords([p for p in passwords if p is not None]))
+        users: List[User] = []
+        created: List[User] = []
+        updated: List[User] = []
+        update_fields = {"modified"}
+        modified = timezone.now()
+        for (kind, serializer), password in zip(validated, passwords):
+            data = serializer.validated_data
+            password_hash: Optional[str] = (
+                next(hashed) if password is not None else None
+            )
+            if kind == "add":
+                user = User(email=User.objects.normalize_email(data["email"]))
+                user.password = password_hash
+                created.append(user)
+            else:
+                user = serializer.instance
+                for key, value in data.items():
+                    if key == "email":
+                        value = User.objects.normalize_email(value)
+                    if key not in ["password", "current_password"]:
+                        setattr(user, key, value)
+                        update_fields.add(key)
+                if password_hash is not None:
+                    user.password = password_hash
+                    update_fields.add("password")
+                # bulk updates do not set auto_now fields
+                user.modified = modified
+                updated.append(user)
+            users.append(user)
+        with transaction.atomic():
+            if created:
+                User.objects.bulk_create(created)
+                if not connection.features.can_return_ids_from_bulk_insert:
+                    # only PostgreSQL sets the pks on bulk created instances
+                    by_email = {user.email: user for user in created}
+                    pks = User.objects.filter(email__in=by_email).values_list(
+                        "email", "pk"
+                    )
+                    for email, pk in pks:  # pylint: disable=invalid-name
+                        by_email[email].pk = pk
+            if updated:
+                User.objects.bulk_update(updated, sorted(update_fields))
+            # bulk queries do not send the signals invalidating the lists
+            invalidate_list_cache(User)
+        return users
+
+    def _get_resource_object(self, user: User) -> Dict[str, Any]:
+        """Return the JSON:API resource object for the user."""
+        return {
+            "type": User.JSONAPIMeta.resource_name,
+            "id": str(user.pk),
+            "attributes": dict(self.get_serializer(user).data),
+        }
+
 
 class PasswordResetView(
     mixins.CreateModelMixin, ViewSetMixin, dj_rest_auth.views.PasswordResetView
 ):
     """Request a password reset email."""
 
+    throttle_classes = [IPAndGlobalTokenBucketThrottle]
+    throttle_scope = "password_reset"
+
     def post(self, request, *args, **kwargs):
         """Use the serializer to get the response."""
         return super().create(*args, **kwargs)
@@ -143,3 +397,19 @@ class PasswordResetConfirmView(
     def post(self, request, *args, **kwargs):
         """Use the serializer to get the response."""
         return super().create(request, *args, **kwargs)
+
+
+class TokenRefreshView(mixins.CreateModelMixin, GenericViewSet):
+    """Exchange a signed refresh token for new signed tokens."""
+
+    resource_name = "token-refreshes"
+    serializer_class = TokenRefreshSerializer
+    permission_classes = [AllowAny]
+    authentication_classes: List[Type] = []
+    filter_backends: List[Type] = []
+
+    def initial(self, request, *args, **kwargs):
+        """Only allow refreshes when signed tokens are enabled."""
+        if not settings.SIGNED_TOKENS_ENABLED:
+            raise NotFound()
+        super().initial(request, *args, **kwargs)
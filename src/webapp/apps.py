@@ -8,6 +8,8 @@ class WebAppConfig(AppConfig):
     name = "webapp"
 
     def ready(self):
-        """Import signals."""
+        """Import signals and time the cache calls."""
         # noqa pylint: disable=unused-import,import-outside-toplevel
-        from webapp import signals
+        from webapp import logs, signals
+
+        logs.time_caches()
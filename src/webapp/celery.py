@@ -1,7 +1,96 @@
 """Bootstrap celery with Django's config."""
-from celery import Celery
+from typing import Dict
+
+from celery import Celery, Task
+from celery.backends.redis import RedisBackend
 from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from kombu import Queue
+
+RESULT_POLICIES = ["ignore", "redis", "db"]
+# Workers consuming several queues consume them in this order
+QUEUE_CLASSES = ["critical", "default", "bulk"]
+
+# Redis result backends are created lazily and shared per url in each process
+_redis_backends: Dict[str, RedisBackend] = {}
+
+
+def get_redis_result_backend(celery_app: Celery) -> RedisBackend:
+    """Return the redis result backend, results expire after `result_expires`."""
+    url = settings.CELERY_REDIS_RESULT_BACKEND_URL
+    if url not in _redis_backends:
+        _redis_backends[url] = RedisBackend(app=celery_app, url=url)
+    return _redis_backends[url]
+
+
+def get_queue_name(queue_class: str) -> str:
+    """Return the name of the queue for the given class of tasks."""
+    if queue_class not in QUEUE_CLASSES:
+        raise ImproperlyConfigured(f"The queue class must be one of {QUEUE_CLASSES}")
+    if queue_class == "default":
+        return settings.CELERY_TASK_DEFAULT_QUEUE
+    return f"{settings.CELERY_TASK_DEFAULT_QUEUE}.{queue_class}"
+
+
+# pylint: disable=unused-argument
+def route_task(name, args, kwargs, options, task=None, **kw):
+    """Route the task to the queue of its `queue_class`.
+
+    The queue class is set with the task decorator, e.g.
+    `@shared_task(queue_class="critical")`, and defaults to "default". A queue
+    given when sending the task takes precedence.
+    """
+    if options.get("queue"):
+        return None
+    return {"queue": get_queue_name(getattr(task, "queue_class", "default"))}
+
+
+class ResultPolicyTask(Task):
+    """Store the task result according to the task's `result_policy`.
+
+    The policy is set with the task decorator, e.g.
+    `@shared_task(result_policy="ignore")`, and defaults to
+    `settings.CELERY_TASK_RESULT_POLICY`:
+
+    * "ignore" - the result is never stored
+    * "redis" - the result is stored in redis and expires after `result_expires`
+    * "db" - the result is stored in the default (django-db) result backend
+    """
+
+    result_policy: str = ""
+
+    @classmethod
+    def get_result_policy(cls) -> str:
+        """Return the result policy of the task."""
+        policy = cls.result_policy or settings.CELERY_TASK_RESULT_POLICY
+        if policy not in RESULT_POLICIES:
+            raise ImproperlyConfigured(
+                f"The result policy of {cls.name} must be one of {RESULT_POLICIES}"
+            )
+        return policy
+
+    @classmethod
+    def bind(cls, app):  # pylint: disable=redefined-outer-name
+        """Ignore the result of the task if required by the result policy."""
+        if cls.ignore_result is None:
+            cls.ignore_result = cls.get_result_policy() == "ignore"
+        return super().bind(app)
+
+    @property
+    def backend(self):
+        """Return the result backend for the task's result policy."""
+        if self._backend is None and self.get_result_policy() == "redis":
+            self._backend = get_redis_result_backend(self.app)
+        return super().backend
+
+    @backend.setter
+    def backend(self, value):
+        """Set the result backend for the task."""
+        self._backend = value
+
 
-app = Celery(settings.CELERY_APP_NAME)
+app = Celery(settings.CELERY_APP_NAME, task_cls=ResultPolicyTask)
 app.config_from_object("django.conf:settings", namespace="CELERY")
+app.conf.task_queues = [Queue(get_queue_name(name)) for name in QUEUE_CLASSES]
+app.conf.task_routes = [route_task]
 app.autodiscover_tasks()
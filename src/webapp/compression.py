@@ -0,0 +1,165 @@
+"""Negotiated brotli and gzip compression of the responses."""
+import gzip
+import re
+import zlib
+from functools import partial
+from hashlib import md5
+from time import thread_time
+from typing import Iterable, Iterator, List, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+from webapp import metrics
+
+try:
+    import brotli  # type: ignore
+except ImportError:  # pragma: no cover
+    brotli = None
+
+BROTLI = "br"
+GZIP = "gzip"
+
+# Responses compressed on each request use fast levels, the ones which are
+# compressed once and cached use the best levels
+FAST_LEVELS = {BROTLI: 4, GZIP: 6}
+BEST_LEVELS = {BROTLI: 11, GZIP: 9}
+
+ACCEPT_ENCODING_RE = re.compile(r"^\s*([^\s;]+)\s*(?:;\s*q=([0-9.]+))?\s*$")
+
+
+def get_encodings() -> List[str]:
+    """Return the supported encodings, in order of preference."""
+    return [BROTLI, GZIP] if brotli is not None else [GZIP]
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Return the best supported encoding accepted by the client, if any."""
+    qualities = {}
+    for coding in accept_encoding.split(","):
+        match = ACCEPT_ENCODING_RE.match(coding)
+        if not match:
+            continue
+        try:
+            qualities[match[1].lower()] = float(match[2] or 1)
+        except ValueError:
+            continue
+    encodings = [
+        (qualities.get(encoding, qualities.get("*", 0)), -index, encoding)
+        for index, encoding in enumerate(get_encodings())
+    ]
+    quality, _, encoding = max(encodings)
+    return encoding if quality > 0 else None
+
+
+def compress(content: bytes, encoding: str, level: int) -> bytes:
+    """Return the compressed content."""
+    if encoding == BROTLI:
+        return brotli.compress(content, quality=level)
+    return gzip.compress(content, compresslevel=level)
+
+
+def compress_stream(chunks: Iterable[bytes], encoding: str) -> Iterator[bytes]:
+    """Compress the chunks, flushing after each one so none are held back."""
+    level = FAST_LEVELS[encoding]
+    size = compressed_size = 0
+    elapsed = 0.0
+    if encoding == BROTLI:
+        compressor = brotli.Compressor(quality=level)
+        compress_chunk, finish = compressor.process, compressor.finish
+        flush = compressor.flush
+    else:
+        # 31 selects the gzip container with the largest window
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        compress_chunk, finish = compressor.compress, compressor.flush
+        flush = partial(compressor.flush, zlib.Z_SYNC_FLUSH)
+    for chunk in chunks:
+        started = thread_time()
+        data = compress_chunk(chunk) + flush()
+        elapsed += thread_time() - started
+        size += len(chunk)
+        compressed_size += len(data)
+        if data:
+            yield data
+    started = thread_time()
+    data = finish()
+    elapsed += thread_time() - started
+    compressed_size += len(data)
+    metrics.compression_finished(encoding, size, compressed_size, elapsed)
+    yield data
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Compress the responses with the best encoding accepted by the client.
+
+    Brotli is used when the `brotli` package can be imported, otherwise
+    gzip. Responses smaller than `COMPRESSION_MIN_SIZE` are sent as they are,
+    streaming responses are compressed chunk by chunk. Responses with an ETag,
+    e.g. cached lists and the schema, are compressed once at the best level
+    and cached in `COMPRESSION_CACHE` by the digest of their content, unless
+    it is a dummy cache.
+
+    NOTE: like django's GZipMiddleware this may expose the responses to the
+    BREACH attack, the CSRF tokens of the API are in cookies not in bodies.
+    """
+
+    def process_response(self, request, response):
+        """Compress the response if the client accepts it."""
+        if response.has_header("Content-Encoding"):
+            return response
+        if not response.streaming and len(response.content) < (
+            settings.COMPRESSION_MIN_SIZE
+        ):
+            return response
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = negotiate_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if encoding is None:
+            return response
+        if response.streaming:
+            response.streaming_content = compress_stream(
+                response.streaming_content, encoding
+            )
+            del response["Content-Length"]
+        else:
+            content = self.compress_content(response, encoding)
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response["Content-Length"] = str(len(content))
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = f"W/{etag}"
+        response["Content-Encoding"] = encoding
+        return response
+
+    def compress_content(self, response, encoding: str) -> bytes:
+        """Return the compressed content, from the cache if it is cacheable."""
+        cache = caches[settings.COMPRESSION_CACHE]
+        # without a cache the best levels would be paid on every request
+        if not response.has_header("ETag") or isinstance(cache, DummyCache):
+            return self.timed_compress(response.content, encoding, FAST_LEVELS)
+        digest = md5(response.content).hexdigest()
+        key = f"compressed:{encoding}:{digest}"
+        content = cache.get(key)
+        if content is not None:
+            metrics.COMPRESSION_CACHE_HITS.labels(encoding).inc()
+            return content
+        content = self.timed_compress(response.content, encoding, BEST_LEVELS)
+        cache.set(key, content, settings.COMPRESSION_CACHE_TIMEOUT)
+        return content
+
+    @staticmethod
+    def timed_compress(content: bytes, encoding: str, levels) -> bytes:
+        """Compress the content and record the compression metrics.
+
+        The CPU time of the thread is recorded, not the wall time which other
+        threads of the process would inflate.
+        """
+        started = thread_time()
+        compressed = compress(content, encoding, levels[encoding])
+        elapsed = thread_time() - started
+        metrics.compression_finished(encoding, len(content), len(compressed), elapsed)
+        return compressed
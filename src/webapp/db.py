@@ -0,0 +1,99 @@
+"""Project-wide database helpers."""
+import csv
+import io
+from typing import IO, Sequence
+
+from django.db import connections, transaction
+from django.db.models import AutoField, Model, QuerySet
+
+# NULL in the CSV written for COPY, so that empty strings are not NULL
+COPY_NULL = r"\N"
+
+
+def delete_in_batches(queryset: QuerySet, batch_size: int) -> int:
+    """Delete the rows matched by the queryset in batches of `batch_size`.
+
+    Each batch is deleted in its own short transaction so that purging a large
+    table never holds long locks. Return the number of deleted rows.
+    """
+    deleted = 0
+    model = queryset.model
+    pks = queryset.order_by().values_list("pk", flat=True)
+    while True:
+        with transaction.atomic(using=queryset.db):
+            batch = list(pks[:batch_size])
+            if not batch:
+                return deleted
+            manager = model._base_manager.db_manager(queryset.db)
+            deleted += manager.filter(pk__in=batch).delete()[0]
+
+
+def copy_columns(model, connection) -> str:
+    """Return the quoted table and columns of the model, without its pk."""
+    quote = connection.ops.quote_name
+    columns = [
+        quote(field.column)
+        for field in model._meta.concrete_fields
+        if not isinstance(field, AutoField)
+    ]
+    return f"{quote(model._meta.db_table)} ({', '.join(columns)})"
+
+
+def bulk_insert(objs: Sequence[Model], batch_size: int, using="default"):
+    """Insert the objects with COPY on PostgreSQL, bulk_create otherwise.
+
+    Unlike bulk_create, the pks of the objects are not set. The objects are
+    inserted in batches of `batch_size`, each in its own transaction.
+    """
+    connection = connections[using]
+    for start in range(0, len(objs), batch_size):
+        batch = objs[start : start + batch_size]
+        model = type(batch[0])
+        if connection.vendor != "postgresql":
+            model._base_manager.db_manager(using).bulk_create(batch)
+            continue
+        fields = [
+            field
+            for field in model._meta.concrete_fields
+            if not isinstance(field, AutoField)
+        ]
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for obj in batch:
+            values = [
+                field.get_db_prep_save(field.pre_save(obj, True), connection)
+                for field in fields
+            ]
+            writer.writerow([COPY_NULL if v is None else v for v in values])
+        buffer.seek(0)
+        copy_from(model, buffer, using=using)
+
+
+def copy_from(model, file: IO, using="default", header=False):
+    """Insert the rows of the CSV file into the model's table with COPY."""
+    connection = connections[using]
+    header_option = ", HEADER" if header else ""
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {copy_columns(model, connection)} FROM STDIN"
+            f" WITH (FORMAT csv, NULL '{COPY_NULL}'{header_option})",
+            file,
+        )
+
+
+def copy_to(queryset: QuerySet, file: IO):
+    """Write the rows of the queryset as CSV, with a header, with COPY."""
+    connection = connections[queryset.db]
+    model = queryset.model
+    fields = [
+        field.attname
+        for field in model._meta.concrete_fields
+        if not isinstance(field, AutoField)
+    ]
+    sql, params = queryset.order_by("pk").values(*fields).query.sql_with_params()
+    with connection.cursor() as cursor:
+        query = cursor.mogrify(sql, params).decode()
+        cursor.copy_expert(
+            f"COPY ({query}) TO STDOUT WITH (FORMAT csv, NULL '{COPY_NULL}', HEADER)",
+            file,
+        )
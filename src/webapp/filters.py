@@ -0,0 +1,62 @@
+"""Project wide filter backends."""
+from functools import reduce
+from operator import add
+from typing import Sequence
+
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connections
+from django.db.models import Case, FloatField, QuerySet, Value, When
+from rest_framework.filters import SearchFilter
+from rest_framework_json_api.filters import OrderingFilter
+
+SEARCH_RANK = "search_rank"
+
+
+def rank_search_results(
+    queryset: QuerySet, fields: Sequence[str], terms: Sequence[str]
+) -> QuerySet:
+    """Annotate the search rank of the results, best matches rank highest.
+
+    On PostgreSQL the rank is the trigram similarity of the fields to each
+    term, plus a point for each field starting with a term. Other databases
+    rank every result the same.
+    """
+    fields = [field.lstrip("^=@$") for field in fields]
+    if not terms or connections[queryset.db].vendor != "postgresql":
+        return queryset.annotate(**{SEARCH_RANK: Value(0.0, FloatField())})
+    ranks = [
+        rank
+        for field in fields
+        for term in terms
+        for rank in [
+            TrigramSimilarity(field, term),
+            Case(
+                When(**{f"{field}__istartswith": term}, then=Value(1.0)),
+                default=Value(0.0),
+                output_field=FloatField(),
+            ),
+        ]
+    ]
+    return queryset.annotate(**{SEARCH_RANK: reduce(add, ranks)})
+
+
+class RankedSearchFilter(SearchFilter):
+    """Search filter ordering the results by relevance.
+
+    The matching is unchanged, `icontains` compiles to
+    `UPPER(field::text) LIKE UPPER('%term%')` on PostgreSQL, which uses the
+    trigram indexes of the search fields (see users migration 0005). When no
+    sort is requested the results are ordered by their search rank.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        """Filter the results and order them by their search rank."""
+        queryset = super().filter_queryset(request, queryset, view)
+        fields = self.get_search_fields(view, request)
+        terms = self.get_search_terms(request)
+        if not fields or not terms:
+            return queryset
+        queryset = rank_search_results(queryset, fields, terms)
+        if request.query_params.get(OrderingFilter.ordering_param):
+            return queryset
+        return queryset.order_by(f"-{SEARCH_RANK}", *queryset.query.order_by)
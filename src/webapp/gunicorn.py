@@ -0,0 +1,20 @@
+"""Gunicorn server hooks serving the metrics of the web workers.
+
+Used with `gunicorn --config python:webapp.gunicorn`, the metrics of every
+worker are aggregated in the multiprocess directory and served by the master
+process on the port set by GUNICORN_METRICS_PORT.
+"""
+import os
+
+from webapp import metrics
+
+
+def when_ready(server):  # pylint: disable=unused-argument
+    """Serve the metrics of the workers."""
+    metrics.start_metrics_server(int(os.environ.get("GUNICORN_METRICS_PORT") or 0))
+
+
+def child_exit(server, worker):  # pylint: disable=unused-argument
+    """Remove the live metrics of the stopped worker."""
+    if os.environ.get(metrics.MULTIPROCESS_DIR_ENV):
+        metrics.multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,77 @@
+"""Handlers for django-axes."""
+from logging import getLogger
+
+from axes.conf import settings
+from axes.handlers.cache import AxesCacheHandler
+from axes.helpers import (
+    get_client_cache_key,
+    get_client_str,
+    get_client_username,
+    get_failure_limit,
+)
+from axes.signals import user_locked_out
+
+log = getLogger(settings.AXES_LOGGER)
+
+
+class AxesRedisHandler(AxesCacheHandler):
+    """Record failed logins with one atomic redis round-trip per attempt.
+
+    The failures are kept in the same keys as `AxesCacheHandler`, so both
+    handlers can be swapped without losing the current lockouts. Caches which
+    are not backed by django-redis fall back to the generic cache API.
+    """
+
+    def increment_failures(self, cache_key: str) -> int:
+        """Increment the failures and reset their expiry, return the failures."""
+        try:
+            client = self.cache.client.get_client(write=True)
+        except AttributeError:
+            self.cache.add(cache_key, 0, self.cache_timeout)
+            failures = self.cache.incr(cache_key)
+            self.cache.touch(cache_key, self.cache_timeout)
+            return failures
+        key = self.cache.make_key(cache_key)
+        pipeline = client.pipeline()
+        pipeline.incr(key)
+        if self.cache_timeout is not None:
+            pipeline.expire(key, self.cache_timeout)
+        failures, *_ = pipeline.execute()
+        return failures
+
+    def user_login_failed(self, sender, credentials: dict, request=None, **kwargs):
+        """Record the failed login and lock the user out if necessary."""
+        if request is None:
+            log.error("AXES: AxesRedisHandler.user_login_failed requires a request.")
+            return
+
+        username = get_client_username(request, credentials)
+        client_str = get_client_str(
+            username,
+            request.axes_ip_address,
+            request.axes_user_agent,
+            request.axes_path_info,
+        )
+        if self.is_whitelisted(request, credentials):
+            log.info("AXES: Login failed from whitelisted client %s.", client_str)
+            return
+
+        failures = self.increment_failures(get_client_cache_key(request, credentials))
+        failure_limit = get_failure_limit(request, credentials)
+        log.warning(
+            "AXES: Login failure by %s. Count = %d of %d.",
+            client_str,
+            failures,
+            failure_limit,
+        )
+        if settings.AXES_LOCK_OUT_AT_FAILURE and failures >= failure_limit:
+            log.warning(
+                "AXES: Locking out %s after repeated login failures.", client_str
+            )
+            request.axes_locked_out = True
+            user_locked_out.send(
+                "axes",
+                request=request,
+                username=username,
+                ip_address=request.axes_ip_address,
+            )
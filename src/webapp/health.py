@@ -0,0 +1,181 @@
+"""Liveness and readiness endpoints for load balancers and orchestrators."""
+import math
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from time import perf_counter
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.storage import default_storage
+from django.db import connections
+from django.http import JsonResponse
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_safe
+from django_redis.cache import RedisCache
+from django_redis.pool import get_connection_factory
+
+from webapp import metrics
+from webapp.celery import app
+from webapp.storage import MediaS3
+
+READY_CACHE_KEY = "health:ready"
+CHECK_CACHE_KEY = "health:check"
+
+# Checks which time out keep running, so the pool is shared by the requests
+# instead of waiting for them
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="health")
+# The last run of each check, a check still running is not run again
+_futures: Dict[str, Future] = {}
+_futures_lock = threading.Lock()
+
+
+def check_database(alias: str):
+    """Run a query on a new connection to the database.
+
+    On PostgreSQL the connection and the query time out after
+    `HEALTH_CHECK_TIMEOUT`, so a stuck database does not hold the thread.
+    """
+    connection = connections[alias]
+    is_postgresql = connection.vendor == "postgresql"
+    timeout = settings.HEALTH_CHECK_TIMEOUT
+    if is_postgresql:
+        settings_dict = connection.settings_dict
+        options = {**settings_dict["OPTIONS"], "connect_timeout": math.ceil(timeout)}
+        connection = connection.__class__({**settings_dict, "OPTIONS": options}, alias)
+    try:
+        with connection.cursor() as cursor:
+            if is_postgresql:
+                cursor.execute("SET statement_timeout = %s", [round(timeout * 1000)])
+            cursor.execute("SELECT 1")
+    finally:
+        connection.close()
+
+
+def check_broker():
+    """Connect to the celery broker."""
+    timeout = settings.HEALTH_CHECK_TIMEOUT
+    with app.connection_for_write(connect_timeout=timeout) as connection:
+        connection.ensure_connection(max_retries=1)
+
+
+def check_cache(alias: str):
+    """Read from the cache.
+
+    Redis is read with clients which time out after `HEALTH_CHECK_TIMEOUT`,
+    outside the connection pools of the process, which are shared by URL and
+    would keep their own timeouts.
+    """
+    if not isinstance(caches[alias], RedisCache):
+        caches[alias].get(CHECK_CACHE_KEY)
+        return
+    config = settings.CACHES[alias]
+    timeout = settings.HEALTH_CHECK_TIMEOUT
+    factory = get_connection_factory(
+        options={
+            **config.get("OPTIONS", {}),
+            "SOCKET_CONNECT_TIMEOUT": timeout,
+            "SOCKET_TIMEOUT": timeout,
+        }
+    )
+    locations = config["LOCATION"]
+    if isinstance(locations, str):
+        locations = locations.split(",")
+    for url in locations:
+        pool = factory.get_connection_pool(factory.make_connection_params(url))
+        try:
+            factory.redis_client_cls(connection_pool=pool).get(CHECK_CACHE_KEY)
+        finally:
+            pool.disconnect()
+
+
+def check_storage():
+    """Check the storage bucket exists."""
+    client = default_storage.connection.meta.client
+    client.head_bucket(Bucket=default_storage.bucket_name)
+
+
+def get_checks() -> Dict[str, Callable[[], Any]]:
+    """Return the checks of the dependencies by name."""
+    checks: Dict[str, Callable[[], Any]] = {
+        f"database:{alias}": lambda alias=alias: check_database(alias)
+        for alias in connections
+    }
+    checks["broker"] = check_broker
+    checks[f"cache:{settings.AXES_CACHE}"] = lambda: check_cache(settings.AXES_CACHE)
+    if isinstance(default_storage, MediaS3):
+        checks["storage"] = check_storage
+    return checks
+
+
+def _run(check: Callable[[], Any]) -> Tuple[float, Optional[str]]:
+    started = perf_counter()
+    try:
+        check()
+    except Exception as error:  # pylint: disable=broad-except
+        return perf_counter() - started, error.__class__.__name__
+    return perf_counter() - started, None
+
+
+def submit_checks() -> Dict[str, Future]:
+    """Run the checks, except the ones whose last run is still running."""
+    futures = {}
+    with _futures_lock:
+        for name, check in get_checks().items():
+            future = _futures.get(name)
+            if future is None or future.done():
+                future = _futures[name] = _executor.submit(_run, check)
+            futures[name] = future
+    return futures
+
+
+def run_checks() -> Dict[str, Dict[str, Any]]:
+    """Run the checks concurrently, each within `HEALTH_CHECK_TIMEOUT`.
+
+    A check which is still running since a previous probe is waited for
+    instead of being queued again, so stuck dependencies do not fill the pool.
+    """
+    timeout = settings.HEALTH_CHECK_TIMEOUT
+    started = perf_counter()
+    futures = submit_checks()
+    results = {}
+    for name, future in futures.items():
+        try:
+            seconds, error = future.result(
+                timeout=max(timeout - (perf_counter() - started), 0)
+            )
+        except FutureTimeoutError:
+            seconds, error = timeout, "timeout"
+        metrics.HEALTH_CHECK_SECONDS.labels(name).observe(seconds)
+        results[name] = {"ok": error is None, "latency_ms": round(seconds * 1000, 1)}
+        if error is not None:
+            results[name]["error"] = error
+    return results
+
+
+@never_cache
+@require_safe
+def live(request):  # pylint: disable=unused-argument
+    """Return 200 while the process can serve requests."""
+    return JsonResponse({"status": "ok"})
+
+
+@never_cache
+@require_safe
+def ready(request):
+    """Return 200 if all the dependencies are available, 503 otherwise.
+
+    The results are cached for `HEALTH_CHECK_CACHE_TIMEOUT` seconds, so that
+    frequent probes do not load the dependencies.
+    """
+    cache = caches["default"]
+    checks = cache.get(READY_CACHE_KEY)
+    if checks is None:
+        checks = run_checks()
+        cache.set(READY_CACHE_KEY, checks, settings.HEALTH_CHECK_CACHE_TIMEOUT)
+    is_ready = all(check["ok"] for check in checks.values())
+    return JsonResponse(
+        {"status": "ok" if is_ready else "error", "checks": checks},
+        status=200 if is_ready else 503,
+    )
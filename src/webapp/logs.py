@@ -0,0 +1,322 @@
+"""Structured logging with request ids and the time spent in each request."""
+import json
+import logging
+import os
+import random
+import re
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from functools import wraps
+from logging import getLogger, handlers
+from queue import SimpleQueue
+from threading import local
+from time import perf_counter
+from typing import Any, Dict, Optional
+from uuid import uuid4
+from weakref import WeakSet
+
+from django.conf import settings
+from django.core.cache.backends.base import BaseCache
+from django.db import connections
+from django.utils.module_loading import import_string
+
+request_log = getLogger("webapp.requests")
+task_log = getLogger("webapp.tasks")
+slow_query_log = getLogger("webapp.slow_queries")
+
+HEADER = "X-Request-ID"
+# Request ids given by the proxy are only trusted if they look like ids
+REQUEST_ID_RE = re.compile(r"^[\w.-]{1,128}$")
+# The cache methods which are timed, the others are built on them
+CACHE_METHODS = [
+    "add",
+    "get",
+    "set",
+    "touch",
+    "delete",
+    "get_many",
+    "set_many",
+    "delete_many",
+    "incr",
+    "decr",
+    "clear",
+]
+
+# The request id and timings of the request or task run by this thread
+_state = local()
+
+# The attributes of every log record, the others are given with `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class Timings:
+    """Time the database queries and cache calls, and sample slow queries."""
+
+    def __init__(self):
+        """Start from zero."""
+        self.started = perf_counter()
+        self.db_seconds = 0.0
+        self.db_queries = 0
+        self.cache_seconds = 0.0
+        self.cache_calls = 0
+        self.in_cache_call = False
+
+    def __call__(self, execute, sql, params, many, context):
+        """Time the query, and log it if it is slow and sampled.
+
+        The queries of a task run eagerly in a request are only counted in
+        the timings of the task, the innermost ones.
+        """
+        if get_timings() is not self:
+            return execute(sql, params, many, context)
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            seconds = perf_counter() - started
+            self.db_seconds += seconds
+            self.db_queries += 1
+            if (
+                seconds >= settings.LOGGING_SLOW_QUERY_SECONDS
+                and random.random() < settings.LOGGING_SLOW_QUERY_SAMPLE_RATE
+            ):
+                slow_query_log.warning(
+                    "Slow query",
+                    extra={
+                        "sql": sql,
+                        "database": context["connection"].alias,
+                        "duration_ms": round(seconds * 1000, 1),
+                    },
+                )
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the timings to log."""
+        return {
+            "db_ms": round(self.db_seconds * 1000, 1),
+            "db_queries": self.db_queries,
+            "cache_ms": round(self.cache_seconds * 1000, 1),
+            "cache_calls": self.cache_calls,
+        }
+
+
+def start(request_id: Optional[str]) -> Timings:
+    """Start logging the request or task with the request id.
+
+    The previous state is restored by `stop`, so that a task run eagerly in a
+    request does not stop the logging of the request.
+    """
+    if not hasattr(_state, "stack"):
+        _state.stack = []
+    _state.stack.append((get_request_id(), get_timings()))
+    _state.request_id = request_id
+    _state.timings = Timings()
+    return _state.timings
+
+
+def stop():
+    """Stop logging the request or task."""
+    _state.request_id, _state.timings = _state.stack.pop()
+
+
+def get_request_id() -> Optional[str]:
+    """Return the id of the request run by this thread, if any."""
+    return getattr(_state, "request_id", None)
+
+
+def get_timings() -> Optional[Timings]:
+    """Return the timings of the request or task run by this thread, if any."""
+    return getattr(_state, "timings", None)
+
+
+def _timed(method):
+    @wraps(method)
+    def timed(*args, **kwargs):
+        timings = get_timings()
+        if timings is None or timings.in_cache_call:
+            return method(*args, **kwargs)
+        timings.in_cache_call = True
+        started = perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            timings.cache_seconds += perf_counter() - started
+            timings.cache_calls += 1
+            timings.in_cache_call = False
+
+    timed.timed = True  # type: ignore
+    return timed
+
+
+def time_caches():
+    """Time the calls to the backends of the configured caches.
+
+    Django has no hooks into the caches, so the methods of their backends are
+    wrapped once. The calls nested in a timed call are not counted again.
+    """
+    for config in settings.CACHES.values():
+        backend = import_string(config["BACKEND"])
+        if not issubclass(backend, BaseCache):
+            continue
+        for name in CACHE_METHODS:
+            method = getattr(backend, name)
+            if not getattr(method, "timed", False):
+                setattr(backend, name, _timed(method))
+
+
+def task_started(request_id: Optional[str]):
+    """Start logging the task, sent by the request with the id if any."""
+    timings = start(request_id or get_request_id())
+    for connection in connections.all():
+        connection.execute_wrappers.append(timings)
+
+
+def task_finished(name: str, state: Optional[str]):
+    """Log the task and stop logging it."""
+    timings = get_timings()
+    if timings is None:
+        return
+    for connection in connections.all():
+        if timings in connection.execute_wrappers:
+            connection.execute_wrappers.remove(timings)
+    task_log.info(
+        "Task %s %s",
+        name,
+        state,
+        extra={"task": name, "state": state, **timings.as_dict()},
+    )
+    stop()
+
+
+def get_record_request_id(record: logging.LogRecord) -> Optional[str]:
+    """Return the request id of the record.
+
+    Django logs the failed requests once the middleware returned, with the
+    request in the record.
+    """
+    request_id = getattr(record, "request_id", None) or get_request_id()
+    if request_id is None:
+        request_id = getattr(getattr(record, "request", None), "request_id", None)
+    return request_id
+
+
+class JsonFormatter(logging.Formatter):
+    """Format the records as JSON lines, with the request id and extra fields."""
+
+    def format(self, record):
+        """Return the record as a JSON object."""
+        data = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": get_record_request_id(record),
+        }
+        data.update(
+            (key, value)
+            for key, value in vars(record).items()
+            if key not in _RECORD_ATTRIBUTES and key not in data
+        )
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str)
+
+
+class QueueHandler(handlers.QueueHandler):
+    """Format the records in the logging thread, write them from another one.
+
+    Writing to a slow stream never blocks the requests. The records are
+    formatted before being queued, so the request id is the one of the
+    logging thread.
+    """
+
+    def __init__(self, stream=None):
+        """Start writing the queued records to the stream."""
+        super().__init__(SimpleQueue())
+        self.stream = stream
+        self.listener: Optional[handlers.QueueListener] = None
+        self._start_listener()
+        _queue_handlers.add(self)
+
+    def _start_listener(self):
+        self.queue = SimpleQueue()
+        self.listener = handlers.QueueListener(
+            self.queue, logging.StreamHandler(self.stream)
+        )
+        self.listener.start()
+
+    def close(self):
+        """Write the queued records and stop."""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+        _queue_handlers.discard(self)
+        super().close()
+
+
+# The open queue handlers, whose listeners are restarted in forked processes
+_queue_handlers: "WeakSet[QueueHandler]" = WeakSet()
+
+
+def _restart_queue_listeners():
+    """Restart the listener threads, which are not copied to forked processes."""
+    for handler in list(_queue_handlers):
+        handler._start_listener()  # pylint: disable=protected-access
+
+
+os.register_at_fork(after_in_child=_restart_queue_listeners)
+
+
+class RequestLogMiddleware:
+    """Log each request with its status and time spent in the database and cache.
+
+    The request id is taken from the `X-Request-ID` header set by the proxy,
+    or generated, and returned in the same header. It is added to the logs of
+    the request and of the tasks it sends, see webapp.signals. The requests
+    under `LOGGING_SKIPPED_PATH_PREFIXES`, e.g. the probes, are not logged.
+    """
+
+    def __init__(self, get_response):
+        """Set the response handler."""
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """Log the request."""
+        request_id = request.META.get(f"HTTP_{HEADER.upper().replace('-', '_')}")
+        if request_id is None or not REQUEST_ID_RE.match(request_id):
+            request_id = uuid4().hex
+        request.request_id = request_id
+        timings = start(request_id)
+        started = perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timings))
+                response = self.get_response(request)
+            if not request.path.startswith(
+                tuple(settings.LOGGING_SKIPPED_PATH_PREFIXES)
+            ):
+                self.log(request, response, started, timings)
+        finally:
+            stop()
+        response[HEADER] = request_id
+        return response
+
+    @staticmethod
+    def log(request, response, started: float, timings: Timings):
+        """Log the request with its status and timings."""
+        match = getattr(request, "resolver_match", None)
+        request_log.info(
+            "%s %s %s",
+            request.method,
+            request.path,
+            response.status_code,
+            extra={
+                "request_id": request.request_id,
+                "method": request.method,
+                "path": request.path,
+                "route": match.route if match is not None else None,
+                "status": response.status_code,
+                "duration_ms": round((perf_counter() - started) * 1000, 1),
+                **timings.as_dict(),
+            },
+        )
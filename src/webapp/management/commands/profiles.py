@@ -0,0 +1,98 @@
+"""Management command to manage the profiles of requests."""
+import os
+from collections import Counter
+from fnmatch import fnmatch
+
+from django.core.management.base import BaseCommand, CommandError
+
+from webapp import profiling
+
+
+class Command(BaseCommand):
+    """Management command to manage the profiles of requests."""
+
+    help = (
+        "List, download or aggregate the profiles of requests into stacks for "
+        "flamegraph.pl or speedscope, or sign a header to profile a request."
+    )
+
+    def add_arguments(self, parser):
+        """Add the action, the names and the output arguments."""
+        parser.add_argument("action", choices=["list", "download", "aggregate", "sign"])
+        parser.add_argument(
+            "names",
+            nargs="*",
+            metavar="NAME",
+            help="Profile names or shell patterns, all profiles when omitted. "
+            "The profiler when signing.",
+        )
+        parser.add_argument(
+            "--output",
+            metavar="PATH",
+            help="The directory to download to, or the file to aggregate to.",
+        )
+
+    def handle(self, *args, **options):
+        """Run the action."""
+        # pylint: disable=attribute-defined-outside-init
+        self.verbosity = options["verbosity"]
+        action = options["action"]
+        if action == "sign":
+            profiler = (options["names"] or [profiling.PROFILERS[0]])[0]
+            if profiler not in profiling.PROFILERS:
+                raise CommandError(f"Unknown profiler {profiler}.")
+            self.stdout.write(f"{profiling.HEADER}: {profiling.sign(profiler)}")
+            return
+        names = self.get_names(options["names"])
+        if action == "list":
+            for name in names:
+                self.stdout.write(name)
+        elif action == "download":
+            self.download(names, options["output"] or ".")
+        else:
+            self.aggregate(names, options["output"])
+
+    @staticmethod
+    def get_names(patterns):
+        """Return the names of the stored profiles matching the patterns."""
+        try:
+            _, names = profiling.get_storage().listdir(profiling.PREFIX)
+        except FileNotFoundError:
+            return []
+        return sorted(
+            name
+            for name in names
+            if not patterns or any(fnmatch(name, pattern) for pattern in patterns)
+        )
+
+    def download(self, names, directory):
+        """Download the profiles to the directory, folding the cProfile stats."""
+        storage = profiling.get_storage()
+        os.makedirs(directory, exist_ok=True)
+        for name in names:
+            with storage.open(f"{profiling.PREFIX}{name}") as source:
+                content = source.read()
+            with open(os.path.join(directory, name), "wb") as target:
+                target.write(content)
+            if name.endswith(".prof"):
+                stacks = profiling.read_stacks(name, content)
+                folded = f"{os.path.splitext(name)[0]}.folded"
+                with open(os.path.join(directory, folded), "w") as target:
+                    target.write(profiling.format_stacks(stacks))
+            if self.verbosity:
+                self.stdout.write(f"Downloaded {name}")
+
+    def aggregate(self, names, path):
+        """Write the sum of the stacks of the profiles."""
+        storage = profiling.get_storage()
+        stacks: Counter = Counter()
+        for name in names:
+            if name.endswith((".folded", ".prof")):
+                with storage.open(f"{profiling.PREFIX}{name}") as file:
+                    stacks += profiling.read_stacks(name, file.read())
+        content = profiling.format_stacks(stacks)
+        if path is None:
+            self.stdout.write(content, ending="")
+            return
+        with open(path, "w") as file:
+            file.write(content)
@@ -1,18 +1,27 @@
 """Management Command to setup initial data."""
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
+from hashlib import md5
+from time import monotonic
+from typing import List, Optional
 from urllib.parse import urlparse
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.sites.models import Site
+from django.core.cache import caches
 from django.core.files.storage import default_storage
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
 from django.db.utils import IntegrityError
+from storages.backends.s3boto3 import ClientError
 
 from webapp.storage import MediaS3
 
+BUCKET_STATE_KEY = "setup_skeletons:bucket_state"
 
-def get_admin():
+
+def get_admin(using: str = DEFAULT_DB_ALIAS):
     """Return the default admin, creating it if not present."""
     admin = settings.ADMIN_USER
     model = get_user_model()
@@ -25,21 +34,21 @@ def get_admin():
     defaults.update(env_vals)
     try:
         values = {username: admin[username], "defaults": defaults}
-        user, new = model.objects.get_or_create(**values)
+        user, new = model.objects.db_manager(using).get_or_create(**values)
     except IntegrityError as error:
         raise AttributeError("Admin user not found or able to be created.") from error
     if new:
         user.set_password(admin["password"])
-        user.save()
+        user.save(using=using)
     return user
 
 
-def get_site():
+def get_site(using: str = DEFAULT_DB_ALIAS):
     """Return the default site, creating it if not present."""
     url = urlparse(settings.SITE_URL)
     defaults = {"name": settings.PROJECT_NAME, "domain": url.hostname}
     kwargs = {"pk": settings.SITE_ID, "defaults": defaults}
-    return Site.objects.get_or_create(**kwargs)[0]
+    return Site.objects.db_manager(using).get_or_create(**kwargs)[0]
 
 
 def configure_bucket(policy_path: str):
@@ -50,6 +59,76 @@ def configure_bucket(policy_path: str):
     create_bucket_policy(default_storage, policy_path)
 
 
+def get_bucket_state(policy_path: str) -> str:
+    """Return a hash of the desired state of the storage bucket."""
+    with open(policy_path) as fyl:
+        policy = fyl.read()
+    endpoint = getattr(settings, "AWS_S3_ENDPOINT_URL", "")
+    state = f"{endpoint}:{default_storage.bucket_name}:{policy}"
+    return md5(state.encode()).hexdigest()
+
+
+def configure_bucket_once(policy_path: str) -> bool:
+    """Configure the storage bucket unless it is in the desired state.
+
+    The hash of the desired state is kept in `SKELETONS_CACHE` once the bucket
+    is configured. Return whether the bucket was configured.
+    """
+    if is_bucket_ready(policy_path):
+        return False
+    configure_bucket(policy_path)
+    cache = caches[settings.SKELETONS_CACHE]
+    cache.set(BUCKET_STATE_KEY, get_bucket_state(policy_path), None)
+    return True
+
+
+def is_admin_ready(using: str = DEFAULT_DB_ALIAS) -> bool:
+    """Return whether the default admin exists."""
+    model = get_user_model()
+    username = model.USERNAME_FIELD
+    admins = model.objects.using(using)
+    return admins.filter(**{username: settings.ADMIN_USER[username]}).exists()
+
+
+def is_site_ready(using: str = DEFAULT_DB_ALIAS) -> bool:
+    """Return whether the default site exists."""
+    return Site.objects.using(using).filter(pk=settings.SITE_ID).exists()
+
+
+def bucket_exists() -> bool:
+    """Return whether the storage bucket exists, if it is one."""
+    if not isinstance(default_storage, MediaS3):
+        return True
+    try:
+        default_storage.connection.meta.client.head_bucket(
+            Bucket=default_storage.bucket_name
+        )
+    except ClientError:
+        return False
+    return True
+
+
+def is_bucket_ready(policy_path: str) -> bool:
+    """Return whether the storage bucket is in the desired state.
+
+    The cached state is only trusted while the bucket exists, it is lost when
+    e.g. MinIO is reset.
+    """
+    cache = caches[settings.SKELETONS_CACHE]
+    if cache.get(BUCKET_STATE_KEY) != get_bucket_state(policy_path):
+        return False
+    return bucket_exists()
+
+
+def get_bucket_skip_reason() -> Optional[str]:
+    """Return why the bucket is not configured here, if it is not."""
+    if not settings.DEBUG:
+        return "settings.DEBUG is False"
+    if "minio" not in getattr(settings, "AWS_S3_ENDPOINT_URL", ""):
+        return 'settings.AWS_S3_ENDPOINT_URL does not contain "minio"'
+    return None
+
+
 def ensure_bucket_exists(storage: MediaS3):
     """Ensure the bucket exists."""
     storage.create_bucket()
@@ -111,7 +190,7 @@ class Command(BaseCommand):
             self.stdout.write(output)
 
     def add_arguments(self, parser):
-        """Add bucket-policy argument."""
+        """Add bucket-policy, check and database arguments."""
         default_path = "/var/www/conf/docker/bucket_policy.json"
         parser.add_argument(
             "--bucket-policy",
@@ -122,25 +201,64 @@ class Command(BaseCommand):
                 f"is True and using minio.) Default: {default_path}"
             ),
         )
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help=(
+                "Only check the initial data is set up, exit with an error if "
+                "not, e.g. for readiness probes."
+            ),
+        )
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help=f'The database to set up. Default: "{DEFAULT_DB_ALIAS}"',
+        )
 
     def handle(self, *args, **options):
         """Run the management command."""
         self.verbosity = Verbosity(options["verbosity"])
-        self._log(f"Running setup for {settings.PROJECT_NAME}", style=self.style.NOTICE)
         bucket_policy = options["bucket_policy"]
-        get_admin()
-        get_site()
-        is_minio = "minio" in getattr(settings, "AWS_S3_ENDPOINT_URL", "")
-        if settings.DEBUG and is_minio:
-            configure_bucket(bucket_policy)
-        elif not settings.DEBUG:
-            self._log(
-                "Skipping creating bucket policy since settings.DEBUG is False",
-                style=self.style.NOTICE,
-            )
-        elif not is_minio:
-            self._log(
-                "Skipping creating bucket policy since "
-                'settings.AWS_S3_ENDPOINT_URL does not contain "minio"',
-                style=self.style.NOTICE,
-            )
+        database = options["database"]
+        if options["check"]:
+            self.check_ready(bucket_policy, database)
+            return
+        self._log(f"Running setup for {settings.PROJECT_NAME}", style=self.style.NOTICE)
+        # The bucket is configured by another thread while the database is
+        # set up, which is done on this thread's connection (e.g. in tests)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            bucket = None
+            skip_reason = get_bucket_skip_reason()
+            if skip_reason is None:
+                bucket = executor.submit(
+                    self._timed, "bucket", configure_bucket_once, bucket_policy
+                )
+            else:
+                self._log(
+                    f"Skipping creating bucket policy since {skip_reason}",
+                    style=self.style.NOTICE,
+                )
+            self._timed("admin", get_admin, database)
+            self._timed("site", get_site, database)
+            if bucket is not None and not bucket.result():
+                self._log("Skipping the bucket, it is already configured")
+
+    def check_ready(self, bucket_policy: str, database: str = DEFAULT_DB_ALIAS):
+        """Raise CommandError unless the initial data is set up."""
+        missing: List[str] = []
+        if not is_admin_ready(database):
+            missing.append("admin")
+        if not is_site_ready(database):
+            missing.append("site")
+        if get_bucket_skip_reason() is None and not is_bucket_ready(bucket_policy):
+            missing.append("bucket")
+        if missing:
+            raise CommandError(f"Not set up: {', '.join(missing)}")
+        self._log("Ready", style=self.style.SUCCESS)
+
+    def _timed(self, step: str, func, *args):
+        started = monotonic()
+        result = func(*args)
+        elapsed = (monotonic() - started) * 1000
+        self._log(f"{step} took {elapsed:.0f}ms", level=Verbosity.VERBOSE)
+        return result
@@ -0,0 +1,100 @@
+"""Prometheus metrics for the project."""
+import os
+from time import time
+from typing import Optional
+
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    multiprocess,
+    start_http_server,
+)
+
+# NOTE: prefork celery workers must set this env variable to a directory which
+# is emptied before the worker starts, so that the metrics of all the pool
+# processes are aggregated.
+MULTIPROCESS_DIR_ENV = "prometheus_multiproc_dir"
+
+BEAT_TICK_SECONDS = Histogram(
+    "celery_beat_tick_seconds", "Time spent running one celery beat scheduler tick."
+)
+BEAT_SCHEDULE_RELOADS = Counter(
+    "celery_beat_schedule_reloads_total",
+    "Number of times celery beat reloaded the schedule from the database.",
+)
+TASK_RUNTIME_SECONDS = Histogram(
+    "celery_task_runtime_seconds", "Time spent running the task.", ["task"]
+)
+TASK_QUEUE_WAIT_SECONDS = Histogram(
+    "celery_task_queue_wait_seconds",
+    "Time between publishing the task and the task starting.",
+    ["task"],
+)
+TASK_DB_QUERIES = Histogram(
+    "celery_task_db_queries",
+    "Number of database queries run by the task.",
+    ["task"],
+    buckets=(0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, float("inf")),
+)
+TASK_FAILURES = Counter("celery_task_failures_total", "Failed tasks.", ["task"])
+TASK_RETRIES = Counter("celery_task_retries_total", "Retried tasks.", ["task"])
+HTTP_COMPRESSION_RATIO = Histogram(
+    "http_response_compression_ratio",
+    "Compressed size of the response over its uncompressed size.",
+    ["encoding"],
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0, float("inf")),
+)
+HTTP_COMPRESSION_SECONDS = Histogram(
+    "http_response_compression_seconds",
+    "CPU time spent compressing the response, by the thread compressing it.",
+    ["encoding"],
+)
+COMPRESSION_CACHE_HITS = Counter(
+    "http_response_compression_cache_hits_total",
+    "Responses served compressed from the compression cache.",
+    ["encoding"],
+)
+HEALTH_CHECK_SECONDS = Histogram(
+    "health_check_seconds",
+    "Time spent checking a dependency for the readiness endpoint.",
+    ["dependency"],
+)
+
+_started_ports = set()
+
+
+def start_metrics_server(port: int):
+    """Serve the metrics of this process on the given port, once per process.
+
+    When the multiprocess directory is set, the metrics of every process
+    writing to that directory are served instead.
+    """
+    if not port or port in _started_ports:
+        return
+    registry = REGISTRY
+    if os.environ.get(MULTIPROCESS_DIR_ENV):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    start_http_server(port, registry=registry)
+    _started_ports.add(port)
+
+
+def task_started(name: str, published_at: Optional[float]):
+    """Record the queue wait of the task run."""
+    if published_at is not None:
+        TASK_QUEUE_WAIT_SECONDS.labels(name).observe(max(time() - published_at, 0))
+
+
+def task_finished(name: str, seconds: float, db_queries: int):
+    """Record the runtime and database queries of the task run."""
+    TASK_RUNTIME_SECONDS.labels(name).observe(seconds)
+    TASK_DB_QUERIES.labels(name).observe(db_queries)
+
+
+def compression_finished(encoding: str, size: int, compressed: int, seconds: float):
+    """Record the compression ratio and time of a response."""
+    if size:
+        HTTP_COMPRESSION_RATIO.labels(encoding).observe(compressed / size)
+    HTTP_COMPRESSION_SECONDS.labels(encoding).observe(seconds)
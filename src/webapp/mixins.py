@@ -0,0 +1,260 @@
+"""Project wide viewset mixins."""
+from datetime import datetime
+from hashlib import md5
+from typing import Optional, Set, Tuple, Type
+from urllib.parse import urlencode
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import models, transaction
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, parse_etags
+from django.utils.http import http_date
+from django.utils.translation import gettext_lazy as _
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.generics import get_object_or_404
+from rest_framework.response import Response
+
+# The last modification time, if known, and a string identifying the version
+Version = Tuple[Optional[datetime], str]
+
+# Models listed by viewsets with CachedListMixin, see invalidate_list_cache
+cached_list_models: Set[Type[models.Model]] = set()
+
+
+class PreconditionFailed(APIException):
+    """The resource was changed since the version given in If-Match."""
+
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = _("The resource has been modified.")
+    default_code = "precondition_failed"
+
+
+def get_etag(version: str) -> str:
+    """Return a weak ETag for the version."""
+    return f'W/"{md5(version.encode()).hexdigest()}"'
+
+
+def strip_weak(etag: str) -> str:
+    """Return the ETag without its weak indicator, to compare it weakly."""
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def get_list_cache():
+    """Return the cache of the rendered lists."""
+    return caches[settings.LIST_CACHE]
+
+
+def _get_list_version_key(model: Type[models.Model]) -> str:
+    return f"list_cache:{model._meta.label_lower}:version"
+
+
+def invalidate_all_list_caches():
+    """Invalidate the cached lists of every model, e.g. on permission changes."""
+    for model in list(cached_list_models):
+        invalidate_list_cache(model)
+
+
+def invalidate_list_cache(model: Type[models.Model]):
+    """Invalidate the cached lists of the model.
+
+    The lists are invalidated again once the transaction commits, since lists
+    cached in between may not include the changes.
+    """
+    if model not in cached_list_models:
+        return
+    key = _get_list_version_key(model)
+    get_list_cache().set(key, uuid4().hex, None)
+    transaction.on_commit(lambda: get_list_cache().set(key, uuid4().hex, None))
+
+
+class ConditionalMixin:
+    """Answer conditional requests without running the serializers.
+
+    Objects are versioned by their `version_field`, and lists by the latest
+    `version_field` and the number of objects, for the requesting user. GET
+    requests matching If-None-Match or If-Modified-Since get a 304 response,
+    and updates not matching If-Match get a 412 response.
+
+    NOTE: lists do not set Last-Modified since deletions do not change it.
+    """
+
+    version_field = "modified"
+
+    def get_list_version(self) -> Version:
+        """Return the version of the list with a single aggregate query."""
+        queryset = self.filter_queryset(self.get_queryset())
+        aggregate = queryset.aggregate(
+            last_modified=Max(self.version_field), count=Count("pk")
+        )
+        last_modified, count = aggregate["last_modified"], aggregate["count"]
+        path = self.request.get_full_path()
+        return None, f"{path}:{self.request.user.pk}:{last_modified}:{count}"
+
+    def get_object_version(self, instance) -> Version:
+        """Return the version of the object."""
+        last_modified = getattr(instance, self.version_field)
+        return last_modified, f"{instance._meta.label}:{instance.pk}:{last_modified}"
+
+    def conditional_response(self, request, version: Version, response=None):
+        """Return the not modified response if the client has the version.
+
+        When a response is given the validators are set on it instead.
+        """
+        last_modified, version_str = version
+        etag = get_etag(version_str)
+        # NOTE: If-Modified-Since has a one second precision
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        if response is None:
+            response = get_conditional_response(request, etag, timestamp)
+            if response is None:
+                return None
+        response["ETag"] = etag
+        if timestamp:
+            response["Last-Modified"] = http_date(timestamp)
+        return response
+
+    def check_if_match(self, request, instance):
+        """Raise PreconditionFailed unless the object matches If-Match.
+
+        The ETags are compared weakly: any representation of the current
+        version of the object matches.
+        """
+        etags = parse_etags(request.META.get("HTTP_IF_MATCH", ""))
+        if not etags or etags == ["*"]:
+            return
+        etag = get_etag(self.get_object_version(instance)[1])
+        if strip_weak(etag) not in [strip_weak(value) for value in etags]:
+            raise PreconditionFailed()
+
+    def list(self, request, *args, **kwargs):
+        """Return 304 when the list has not changed."""
+        version = self.get_list_version()
+        not_modified = self.conditional_response(request, version)
+        if not_modified is not None:
+            return not_modified
+        response = super().list(request, *args, **kwargs)
+        return self.conditional_response(request, version, response)
+
+    def retrieve(self, request, *args, **kwargs):
+        """Return 304 when the object has not changed."""
+        instance = self.get_object()
+        version = self.get_object_version(instance)
+        not_modified = self.conditional_response(request, version)
+        if not_modified is not None:
+            return not_modified
+        response = Response(self.get_serializer(instance).data)
+        return self.conditional_response(request, version, response)
+
+    def get_locked_object(self):
+        """Return the object, locked until the end of the transaction."""
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        instance = get_object_or_404(
+            queryset.select_for_update(of=("self",)),
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]},
+        )
+        self.check_object_permissions(self.request, instance)
+        return instance
+
+    def update(self, request, *args, **kwargs):
+        """Prevent lost updates with If-Match, set the validators.
+
+        The object is locked while it is checked and updated, so that
+        concurrent updates from the same version cannot both succeed.
+        """
+        with transaction.atomic():
+            if "HTTP_IF_MATCH" in request.META:
+                self.check_if_match(request, self.get_locked_object())
+            response = super().update(request, *args, **kwargs)
+        return self.conditional_response(request, self.updated_version, response)
+
+    def perform_update(self, serializer):
+        """Keep the version of the updated object."""
+        super().perform_update(serializer)
+        # pylint: disable=attribute-defined-outside-init
+        self.updated_version = self.get_object_version(serializer.instance)
+
+
+class CachedListMixin:
+    """Serve lists from the rendered responses cached in `LIST_CACHE`.
+
+    Responses are cached for `list_cache_timeout` seconds, keyed on the model's
+    version, the user's scope, the accepted format and the normalised query
+    string. Cache hits are served without any filtering, query nor rendering.
+    Saving or deleting an object of the model changes its version, see
+    webapp.signals. Bulk writes must call `invalidate_list_cache` themselves.
+
+    When combined with ConditionalMixin it must come first, so that the ETag
+    of the cached response is answered without a query.
+    """
+
+    list_cache_timeout = 60
+
+    def __init_subclass__(cls, **kwargs):
+        """Register the model of the viewset for invalidation."""
+        super().__init_subclass__(**kwargs)
+        queryset = getattr(cls, "queryset", None)
+        if queryset is not None:
+            cached_list_models.add(queryset.model)
+
+    def get_list_cache_scope(self) -> str:
+        """Return the scope of the users seeing the same lists.
+
+        Each user has their own scope since checking the permissions would
+        need queries. Override it for lists which are the same for everybody.
+        """
+        return f"user:{self.request.user.pk}"
+
+    def get_list_cache_key(self, request) -> Optional[str]:
+        """Return the key of the cached list, None if it cannot be cached."""
+        cache = get_list_cache()
+        # NOTE: get_queryset may check the permissions, which needs queries
+        version_key = _get_list_version_key(self.queryset.model)
+        version = cache.get(version_key)
+        if version is None:
+            cache.add(version_key, uuid4().hex, None)
+            version = cache.get(version_key)
+            if version is None:
+                return None
+        query = urlencode(sorted(request.query_params.lists()), doseq=True)
+        scope = self.get_list_cache_scope()
+        fmt = request.accepted_renderer.format
+        digest = md5(f"{scope}:{fmt}:{query}".encode()).hexdigest()
+        return f"list_cache:{version_key}:{version}:{digest}"
+
+    def list(self, request, *args, **kwargs):
+        """Return the cached list or cache the rendered list."""
+        key = self.get_list_cache_key(request)
+        cached = get_list_cache().get(key) if key else None
+        if cached is not None:
+            etag = cached["etag"]
+            if etag and etag in parse_etags(request.META.get("HTTP_IF_NONE_MATCH", "")):
+                response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                response = HttpResponse(
+                    cached["content"], content_type=cached["content_type"]
+                )
+            if etag:
+                response["ETag"] = etag
+            return response
+        response = super().list(request, *args, **kwargs)
+        if key and isinstance(response, Response):
+            response.add_post_render_callback(
+                lambda rendered: self.cache_rendered_list(key, rendered)
+            )
+        return response
+
+    def cache_rendered_list(self, key: str, response):
+        """Cache the rendered list if it was successful."""
+        if response.status_code != status.HTTP_200_OK:
+            return
+        cached = {
+            "content": response.content,
+            "content_type": response["Content-Type"],
+            "etag": response.get("ETag"),
+        }
+        get_list_cache().set(key, cached, self.list_cache_timeout)
@@ -0,0 +1,14 @@
+"""Project-wide parser classes."""
+
+from rest_framework import parsers
+
+
+class AtomicOperationsParser(parsers.JSONParser):
+    """Parse JSON:API atomic operations documents.
+
+    The JSON:API parser only understands documents with a top level `data`
+    member, whereas the atomic extension uses `atomic:operations`. This parser
+    accepts the JSON:API media type and leaves the document untouched.
+    """
+
+    media_type = "application/vnd.api+json"
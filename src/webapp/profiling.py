@@ -0,0 +1,244 @@
+"""Profile requests in production, see the profiles management command."""
+import cProfile
+import marshal
+import pstats
+import random
+import sys
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from logging import getLogger
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple
+from uuid import uuid4
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, Storage, default_storage
+from django.utils import timezone
+from django.utils.text import slugify
+
+log = getLogger(__name__)
+
+HEADER = "X-Profile"
+SALT = "webapp.profiling"
+PREFIX = "profiles/"
+PROFILERS = ("sampling", "cprofile")
+
+# The profiles are saved off the request path, one at a time
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="profiling")
+
+Function = Tuple[str, int, str]
+
+
+def get_storage() -> Storage:
+    """Return the storage of the profiles, the default one unless configured."""
+    if settings.PROFILING_DIRECTORY:
+        return FileSystemStorage(location=settings.PROFILING_DIRECTORY)
+    return default_storage
+
+
+def sign(profiler: str) -> str:
+    """Return a value of the header which requests a profile."""
+    return signing.dumps(profiler, salt=SALT)
+
+
+def get_profiler(request) -> Optional[str]:
+    """Return the profiler requested by the signed header or the sample rate."""
+    value = request.META.get(f"HTTP_{HEADER.upper().replace('-', '_')}")
+    if value is not None:
+        try:
+            profiler = signing.loads(
+                value, salt=SALT, max_age=settings.PROFILING_SIGNATURE_MAX_AGE
+            )
+        except signing.BadSignature:
+            return None
+        return profiler if profiler in PROFILERS else None
+    if random.random() < settings.PROFILING_SAMPLE_RATE:
+        return settings.PROFILING_PROFILER
+    return None
+
+
+def get_label(function: Function) -> str:
+    """Return the label of the function in the stacks."""
+    filename, lineno, name = function
+    label = name if filename == "~" else f"{name} ({filename}:{lineno})"
+    return label.replace(";", ",")
+
+
+class Sampler:
+    """Sample the stack of the current thread from another thread.
+
+    The stacks are counted in microseconds, `interval` for each sample, so
+    the overhead does not depend on the number of calls unlike cProfile.
+    """
+
+    def __init__(self, interval: float):
+        """Prepare to sample the current thread."""
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._thread_id = threading.get_ident()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        """Start sampling."""
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling."""
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        weight = round(self.interval * 1e6)
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(  # pylint: disable=protected-access
+                self._thread_id
+            )
+            labels = []
+            while frame is not None:
+                code = frame.f_code
+                labels.append(
+                    get_label((code.co_filename, code.co_firstlineno, code.co_name))
+                )
+                frame = frame.f_back
+            if labels:
+                self.stacks[";".join(reversed(labels))] += weight
+
+
+def get_folded_stacks(stats: pstats.Stats) -> Counter:
+    """Return the stacks of the cProfile stats in microseconds.
+
+    cProfile only records the callers of each function, so the time of a
+    function called from several stacks is split between them in proportion
+    to the time of each call.
+    """
+    entries = stats.stats  # type: ignore
+    callees: Dict[Function, List[Function]] = defaultdict(list)
+    for function, entry in entries.items():
+        for caller in entry[4]:
+            callees[caller].append(function)
+    stacks: Counter = Counter()
+
+    def walk(
+        function: Function,
+        labels: Tuple[str, ...],
+        own: float,
+        total: float,
+        seen: FrozenSet[Function],
+    ):
+        labels += (get_label(function),)
+        stacks[";".join(labels)] += round(own * 1e6)
+        cumulative = entries[function][3]
+        if cumulative <= 0:
+            return
+        ratio = total / cumulative
+        for callee in callees[function]:
+            call = entries[callee][4][function]
+            # skip recursion and calls too short to show
+            if callee not in seen and call[3] * ratio >= 1e-6:
+                walk(callee, labels, call[2] * ratio, call[3] * ratio, seen | {callee})
+
+    for function, entry in entries.items():
+        if not entry[4]:
+            walk(function, (), entry[2], entry[3], frozenset([function]))
+    return stacks
+
+
+def format_stacks(stacks: Counter) -> str:
+    """Return the stacks in the folded format of flamegraph.pl and speedscope."""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.items() if count)
+
+
+def parse_stacks(content: str) -> Counter:
+    """Return the stacks of the folded format."""
+    stacks: Counter = Counter()
+    for line in content.splitlines():
+        stack, _, count = line.rpartition(" ")
+        if stack:
+            stacks[stack] += int(count)
+    return stacks
+
+
+def read_stacks(name: str, content: bytes) -> Counter:
+    """Return the stacks of the stored profile, folding the cProfile stats."""
+    if name.endswith(".prof"):
+        stats = pstats.Stats()
+        stats.stats = marshal.loads(content)  # type: ignore
+        return get_folded_stacks(stats)
+    return parse_stacks(content.decode())
+
+
+def get_profile_name(request, profiler: str) -> str:
+    """Return a unique name of the profile of the request."""
+    now = timezone.now().strftime("%Y%m%dT%H%M%S")
+    path = slugify(request.path.replace("/", "-"))[:100]
+    return f"{now}-{request.method.lower()}-{path}-{profiler}-{uuid4().hex[:8]}"
+
+
+def save_stacks(name: str, stacks: Counter):
+    """Save the stacks of the profile."""
+    content = format_stacks(stacks).encode()
+    get_storage().save(f"{PREFIX}{name}.folded", ContentFile(content))
+
+
+def save_cprofile(name: str, profile: cProfile.Profile):
+    """Save the stats of the profile for pstats.
+
+    Folding them into stacks takes longer than the request, it is left to
+    the profiles management command.
+    """
+    profile.create_stats()
+    stats = marshal.dumps(profile.stats)  # type: ignore
+    get_storage().save(f"{PREFIX}{name}.prof", ContentFile(stats))
+
+
+def _log_error(future: Future):
+    error = future.exception()
+    if error is not None:
+        log.error("Failed to save a profile", exc_info=error)
+
+
+def submit(save: Callable, *args) -> Future:
+    """Save the profile off the request path."""
+    future = _executor.submit(save, *args)
+    future.add_done_callback(_log_error)
+    return future
+
+
+class ProfilingMiddleware:
+    """Profile the requests with a signed header, or a sample of them.
+
+    The header, see `sign`, selects the profiler. `PROFILING_SAMPLE_RATE` of
+    the other requests are profiled with `PROFILING_PROFILER`. The name of
+    the profile is returned in the same header.
+    """
+
+    def __init__(self, get_response):
+        """Set the response handler, unless profiling is disabled."""
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """Profile the request if requested or sampled."""
+        profiler = get_profiler(request)
+        if profiler is None:
+            return self.get_response(request)
+        name = get_profile_name(request, profiler)
+        if profiler == "cprofile":
+            profile = cProfile.Profile()
+            response = profile.runcall(self.get_response, request)
+            submit(save_cprofile, name, profile)
+        else:
+            sampler = Sampler(settings.PROFILING_SAMPLING_INTERVAL)
+            sampler.start()
+            try:
+                response = self.get_response(request)
+            finally:
+                sampler.stop()
+            submit(save_stacks, name, sampler.stacks)
+        response[HEADER] = name
+        return response
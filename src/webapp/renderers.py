@@ -0,0 +1,10 @@
+"""Project-wide renderer classes."""
+
+from rest_framework import renderers
+
+
+class AtomicOperationsRenderer(renderers.JSONRenderer):
+    """Render JSON:API atomic results documents as they are."""
+
+    media_type = "application/vnd.api+json"
+    format = "vnd.api+json"
@@ -0,0 +1,156 @@
+"""Route the reads of safe requests and read-only tasks to read replicas."""
+import random
+from hashlib import md5
+from threading import local
+from time import monotonic
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+# Reads go to the primary unless a request or task opts in, see use_replicas
+_state = local()
+
+# The lag in seconds of each replica and when it was measured, per process
+_lags: Dict[str, Tuple[float, float]] = {}
+
+# Zero when the replica replayed all it received, so that an idle primary
+# doesn't look like lag; NULL on a primary
+LAG_SQL = """
+SELECT CASE
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+END
+"""
+
+
+def use_replicas(enabled: bool):
+    """Let the reads of this thread go to the replicas, until a write."""
+    _state.use_replicas = enabled
+    _state.written = False
+
+
+def has_written() -> bool:
+    """Return whether this thread wrote since use_replicas was called."""
+    return getattr(_state, "written", False)
+
+
+def get_replica_lag(alias: str) -> float:
+    """Return the replication lag of the replica in seconds, inf if down."""
+    connection = connections[alias]
+    if connection.vendor != "postgresql":
+        return 0
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(LAG_SQL)
+            lag = cursor.fetchone()[0]
+    except DatabaseError:
+        return float("inf")
+    return float(lag or 0)
+
+
+def get_available_replicas() -> List[str]:
+    """Return the replicas lagging less than `DATABASE_REPLICA_MAX_LAG`.
+
+    The lag of each replica is measured at most once per
+    `DATABASE_REPLICA_LAG_CHECK_INTERVAL` seconds in each process.
+    """
+    now = monotonic()
+    available = []
+    for alias in settings.DATABASE_REPLICAS:
+        lag, checked = _lags.get(alias, (0, -float("inf")))
+        if now - checked >= settings.DATABASE_REPLICA_LAG_CHECK_INTERVAL:
+            lag = get_replica_lag(alias)
+            _lags[alias] = (lag, now)
+        if lag <= settings.DATABASE_REPLICA_MAX_LAG:
+            available.append(alias)
+    return available
+
+
+class ReplicaRouter:
+    """Read from a replica when allowed, write to the primary.
+
+    The primary is used for reads until `use_replicas(True)` is called, and
+    again after any write, so a thread reads its own writes. The models in
+    `DATABASE_PRIMARY_MODELS` are always read from the primary.
+    """
+
+    # pylint: disable=unused-argument,no-self-use
+
+    def db_for_read(self, model, **hints):
+        """Return a replica if allowed and available, else the primary."""
+        if not getattr(_state, "use_replicas", False) or has_written():
+            return DEFAULT_DB_ALIAS
+        if model._meta.label in settings.DATABASE_PRIMARY_MODELS:
+            return DEFAULT_DB_ALIAS
+        replicas = get_available_replicas()
+        return random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        """Write to the primary, and read from it from now on."""
+        _state.written = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """Allow relations, the replicas have the same data."""
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        """Only migrate the primary."""
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaMiddleware:
+    """Read from the replicas in safe requests of clients which didn't write.
+
+    Clients read from the primary for `DATABASE_REPLICA_STICKY_SECONDS` after
+    a request which wrote to it, so they read their own writes. Browsers are
+    recognised with a cookie, API clients by their Authorization header.
+    """
+
+    cookie_name = "primary_db"
+
+    def __init__(self, get_response):
+        """Set the response handler, unless there are no replicas."""
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """Allow the replicas unless the client must read its writes."""
+        safe = request.method in ("GET", "HEAD", "OPTIONS")
+        use_replicas(safe and not self.is_sticky(request))
+        try:
+            response = self.get_response(request)
+            if has_written():
+                self.set_sticky(request, response)
+            return response
+        finally:
+            use_replicas(False)
+
+    @staticmethod
+    def get_sticky_key(request):
+        """Return the cache key of the API client, None without credentials."""
+        authorization = request.META.get("HTTP_AUTHORIZATION")
+        if not authorization:
+            return None
+        return f"primary_db:{md5(authorization.encode()).hexdigest()}"
+
+    def is_sticky(self, request) -> bool:
+        """Return whether the client wrote recently."""
+        if self.cookie_name in request.COOKIES:
+            return True
+        key = self.get_sticky_key(request)
+        return key is not None and bool(
+            caches[settings.DATABASE_REPLICA_STICKY_CACHE].get(key)
+        )
+
+    def set_sticky(self, request, response):
+        """Read from the primary in the client's next requests."""
+        seconds = settings.DATABASE_REPLICA_STICKY_SECONDS
+        response.set_cookie(self.cookie_name, "1", max_age=seconds, httponly=True)
+        key = self.get_sticky_key(request)
+        if key is not None:
+            caches[settings.DATABASE_REPLICA_STICKY_CACHE].set(key, True, seconds)
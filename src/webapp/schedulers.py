@@ -0,0 +1,149 @@
+"""Celery beat schedulers for the project."""
+import zlib
+from collections import Counter
+from time import monotonic
+from typing import Optional
+
+import redis
+from celery.utils.log import get_logger
+from django.conf import settings
+from django.db import transaction
+from django_celery_beat.schedulers import DatabaseScheduler, ModelEntry
+
+from webapp.metrics import (
+    BEAT_SCHEDULE_RELOADS,
+    BEAT_TICK_SECONDS,
+    start_metrics_server,
+)
+
+logger = get_logger(__name__)
+
+
+def get_jitter(name: str, max_jitter: float) -> float:
+    """Return a stable jitter, in seconds, for the named schedule entry."""
+    return (zlib.crc32(name.encode("utf-8")) % 1000) / 1000 * max_jitter
+
+
+def notify_schedule_changed():
+    """Tell running schedulers that the periodic tasks changed, once committed."""
+    if not settings.CELERY_BEAT_CHANGES_URL:
+        return
+
+    def publish():
+        try:
+            client = redis.Redis.from_url(settings.CELERY_BEAT_CHANGES_URL)
+            client.publish(settings.CELERY_BEAT_CHANGES_CHANNEL, "changed")
+        except redis.RedisError as error:
+            logger.warning("Could not publish the schedule change: %r", error)
+
+    transaction.on_commit(publish)
+
+
+class JitteredModelEntry(ModelEntry):
+    """Schedule entry dispatched with the jitter of its periodic task.
+
+    The jitter is kept on the model, as the entry is rebuilt from it each
+    time it is reserved.
+    """
+
+    def __init__(self, model, app=None):
+        """Add the jitter of the periodic task as a countdown."""
+        super().__init__(model, app=app)
+        jitter = getattr(model, "jitter", None)
+        if jitter:
+            self.options.setdefault("countdown", jitter)
+
+
+class CachedDatabaseScheduler(DatabaseScheduler):
+    """Database scheduler which keeps the schedule cached in memory.
+
+    DatabaseScheduler queries the change-version row (PeriodicTasks) every time
+    the schedule is accessed, which is several times per tick. This scheduler
+    only checks the row every `CELERY_BEAT_CHANGE_CHECK_INTERVAL` seconds, or
+    immediately when notified through redis pub/sub by
+    `notify_schedule_changed`.
+
+    Entries sharing a crontab are dispatched with a stable countdown of up to
+    `CELERY_BEAT_JITTER` seconds so they do not all start at once.
+    """
+
+    Entry = JitteredModelEntry
+
+    def __init__(self, *args, **kwargs):
+        """Initialise the change tracking state."""
+        self.change_check_interval = settings.CELERY_BEAT_CHANGE_CHECK_INTERVAL
+        self.max_jitter = settings.CELERY_BEAT_JITTER
+        self._last_change_check = monotonic()
+        self._pubsub: Optional[redis.client.PubSub] = None
+        self._last_subscribe_attempt: Optional[float] = None
+        super().__init__(*args, **kwargs)
+
+    def setup_schedule(self):
+        """Set up the schedule and serve the scheduler metrics."""
+        start_metrics_server(settings.CELERY_BEAT_METRICS_PORT)
+        super().setup_schedule()
+
+    def tick(self, *args, **kwargs):  # pylint: disable=arguments-differ
+        """Run a tick, recording how long it took."""
+        with BEAT_TICK_SECONDS.time():
+            return super().tick(*args, **kwargs)
+
+    def all_as_schedule(self):
+        """Return the schedule, adding jitter to entries sharing a crontab."""
+        BEAT_SCHEDULE_RELOADS.inc()
+        schedule = super().all_as_schedule()
+        if self.max_jitter:
+            crontabs = Counter(
+                entry.model.crontab_id
+                for entry in schedule.values()
+                if entry.model.crontab_id is not None
+            )
+            for name, entry in schedule.items():
+                if crontabs[entry.model.crontab_id] > 1:
+                    entry.model.jitter = get_jitter(name, self.max_jitter)
+                    schedule[name] = self.Entry(entry.model, app=self.app)
+        return schedule
+
+    def schedule_changed(self):
+        """Return whether the schedule changed, querying the database rarely."""
+        notified = self._received_notification()
+        elapsed = monotonic() - self._last_change_check
+        if not notified and elapsed < self.change_check_interval:
+            return False
+        self._last_change_check = monotonic()
+        return super().schedule_changed()
+
+    def _get_pubsub(self) -> Optional[redis.client.PubSub]:
+        """Return the subscription to schedule changes, if available."""
+        if self._pubsub is not None or not settings.CELERY_BEAT_CHANGES_URL:
+            return self._pubsub
+        now = monotonic()
+        last_attempt = self._last_subscribe_attempt
+        if last_attempt is not None and now - last_attempt < self.change_check_interval:
+            return None
+        self._last_subscribe_attempt = now
+        try:
+            client = redis.Redis.from_url(settings.CELERY_BEAT_CHANGES_URL)
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(settings.CELERY_BEAT_CHANGES_CHANNEL)
+        except redis.RedisError as error:
+            logger.warning("Could not subscribe to schedule changes: %r", error)
+            return None
+        self._pubsub = pubsub
+        return pubsub
+
+    def _received_notification(self) -> bool:
+        """Return whether a schedule change was published since the last call."""
+        pubsub = self._get_pubsub()
+        if pubsub is None:
+            return False
+        received = False
+        try:
+            while pubsub.get_message() is not None:
+                received = True
+        except redis.RedisError as error:
+            logger.warning("Lost the subscription to schedule changes: %r", error)
+            self._pubsub = None
+            # the change may have been missed, so check the database
+            return True
+        return received
@@ -0,0 +1,61 @@
+"""Session handling for token authenticated API requests."""
+from django.conf import settings
+from django.contrib.sessions.backends.base import SessionBase
+from django.contrib.sessions.middleware import SessionMiddleware
+
+
+class NullSessionStore(SessionBase):
+    """Session which is never loaded nor saved."""
+
+    def exists(self, session_key):
+        """Return False, no session is stored."""
+        return False
+
+    def create(self):
+        """Do not create a session."""
+        self._session_key = None
+        self.modified = True
+
+    def save(self, must_create=False):
+        """Do not save the session."""
+
+    def delete(self, session_key=None):
+        """Do not delete any session."""
+
+    def load(self):
+        """Return an empty session."""
+        return {}
+
+    @classmethod
+    def clear_expired(cls):
+        """Do not clear any session."""
+
+
+class APISessionMiddleware(SessionMiddleware):
+    """Skip sessions for API requests without a session cookie.
+
+    Token authenticated API requests never load, create nor flush a session,
+    so logging in or out via the API does not write to the session store.
+    Requests with a session cookie, e.g. from the browsable API, are handled
+    as usual.
+    """
+
+    def is_sessionless(self, request) -> bool:
+        """Return whether the request is a sessionless API request."""
+        return (
+            request.path_info.startswith(settings.SESSIONLESS_PATH_PREFIX)
+            and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        )
+
+    def process_request(self, request):
+        """Set a null session on sessionless API requests."""
+        if self.is_sessionless(request):
+            request.session = NullSessionStore()
+            return
+        super().process_request(request)
+
+    def process_response(self, request, response):
+        """Do not save null sessions."""
+        if isinstance(getattr(request, "session", None), NullSessionStore):
+            return response
+        return super().process_response(request, response)
@@ -5,7 +5,12 @@ from urllib.parse import urlparse
 
 import sentry_sdk
 from environ import Env
+from sentry_sdk.integrations.boto3 import Boto3Integration
+from sentry_sdk.integrations.celery import CeleryIntegration
 from sentry_sdk.integrations.django import DjangoIntegration
+from sentry_sdk.integrations.redis import RedisIntegration
+
+from webapp.tracing import traces_sampler
 
 env = Env()
 
@@ -19,6 +24,17 @@ scheme: Dict[str, Tuple[Type, Any]] = {
     "AXES_META_PRECEDENCE_ORDER": (tuple, ("HTTP_X_FORWARDED_FOR", "X_FORWARDED_FOR")),
     "SENTRY_ENABLED": (bool, True),
     "SENTRY_ENVIRONMENT": (str, "production"),
+    "SENTRY_TRACING_ENABLED": (bool, False),
+    "SENTRY_TRACES_SAMPLE_RATE": (float, 0.01),
+    "LOGGING_LEVEL": (str, "INFO"),
+    "PROFILING_ENABLED": (bool, False),
+    "PROFILING_SAMPLE_RATE": (float, 0),
+    "PROFILING_DIRECTORY": (str, ""),
+    "CELERY_TASK_RESULT_POLICY": (str, "db"),
+    "SESSION_ENGINE": (str, "django.contrib.sessions.backends.db"),
+    "SESSION_REDIS_URL": (str, ""),
+    "LIST_CACHE_URL": (str, "dummycache://"),
+    "DATABASE_REPLICA_URLS": (list, []),
 }
 
 if DEBUG:
@@ -36,6 +52,7 @@ if DEBUG:
             "CELERY_TASK_DEFAULT_QUEUE": (str, "celery"),
             "AXES_KEY_PREFIX": (str, "axes"),
             "AXES_REDIS_URL": (str, "rediscache://redis/1"),
+            "LIST_CACHE_URL": (str, "rediscache://redis/4"),
             "SECRET_KEY": (str, "super_secret_secret_key"),
             "SENTRY_ENABLED": (bool, False),
         },
@@ -44,12 +61,29 @@ if DEBUG:
 env = Env(**scheme)
 
 # Sentry
+# Performance tracing is opt-in, the transactions are sampled by
+# webapp.tracing.traces_sampler with these rates
+SENTRY_TRACING_ENABLED = env("SENTRY_TRACING_ENABLED")
+SENTRY_TRACES_SAMPLE_RATE = env("SENTRY_TRACES_SAMPLE_RATE")
+# Rates per path prefix of the requests, the first matching prefix is used
+SENTRY_TRACES_ROUTE_RATES: Dict[str, float] = {"/backend/health/": 0}
+# Rates per task name
+SENTRY_TRACES_TASK_RATES: Dict[str, float] = {}
+# Routes of requests slower than this are traced for SENTRY_TRACES_SLOW_WINDOW
+SENTRY_TRACES_SLOW_SECONDS = 1
+SENTRY_TRACES_SLOW_WINDOW = 5 * 60
 if env.bool("SENTRY_ENABLED"):
     sentry_sdk.init(
         dsn=env("SENTRY_DSN"),
-        integrations=[DjangoIntegration()],
+        integrations=[
+            DjangoIntegration(),
+            CeleryIntegration(),
+            RedisIntegration(),
+            Boto3Integration(),
+        ],
         environment=env("SENTRY_ENVIRONMENT"),
         send_default_pii=True,
+        traces_sampler=traces_sampler if SENTRY_TRACING_ENABLED else None,
     )
 
 # Core
@@ -77,6 +111,29 @@ CELERY_BROKER_URL = env("CELERY_BROKER_URL")
 # celery instances data is namespaced on the shared broker (probably redis)
 CELERY_TASK_DEFAULT_QUEUE = env.str("CELERY_TASK_DEFAULT_QUEUE")
 DATABASES = {"default": env.db_url(default=default_databse_url)}
+# Read replicas of the default database, see webapp.routers
+DATABASE_REPLICAS: List[str] = []
+# The lag of the replicas is checked on the request path, so connecting to a
+# replica which is down must fail fast
+DATABASE_REPLICA_CONNECT_TIMEOUT = 2
+for index, replica_url in enumerate(env("DATABASE_REPLICA_URLS")):
+    replica = Env.db_url_config(replica_url)
+    if replica["ENGINE"].endswith(("postgresql", "postgis")):
+        replica["OPTIONS"] = {
+            "connect_timeout": DATABASE_REPLICA_CONNECT_TIMEOUT,
+            **replica.get("OPTIONS", {}),
+        }
+    DATABASES[f"replica_{index}"] = {**replica, "TEST": {"MIRROR": "default"}}
+    DATABASE_REPLICAS.append(f"replica_{index}")
+DATABASE_ROUTERS = ["webapp.routers.ReplicaRouter"]
+# Replicas lagging more than this, in seconds, are not read from
+DATABASE_REPLICA_MAX_LAG = 5
+DATABASE_REPLICA_LAG_CHECK_INTERVAL = 5
+# Clients read from the primary for this many seconds after a write
+DATABASE_REPLICA_STICKY_SECONDS = 10
+# Credentials are read from the primary, so new tokens and sessions are found
+# and revoked ones are not
+DATABASE_PRIMARY_MODELS = ["users.Token", "sessions.Session"]
 
 # Storage
 DEFAULT_FILE_STORAGE = "webapp.storage.MediaS3"
@@ -108,7 +165,12 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
-    "django.contrib.sessions.middleware.SessionMiddleware",
+    "webapp.logs.RequestLogMiddleware",
+    "webapp.profiling.ProfilingMiddleware",
+    "webapp.tracing.SlowRouteMiddleware",
+    "webapp.compression.CompressionMiddleware",
+    "webapp.routers.ReplicaMiddleware",
+    "webapp.sessions.APISessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -118,6 +180,40 @@ MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
 ]
 
+# Logging, JSON lines written to stdout by a thread, see webapp.logs. Each
+# request is logged with its status and time spent in the database and cache
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {"json": {"()": "webapp.logs.JsonFormatter"}},
+    "handlers": {
+        "queue": {
+            "class": "webapp.logs.QueueHandler",
+            "formatter": "json",
+            "stream": "ext://sys.stdout",
+        }
+    },
+    "root": {"handlers": ["queue"], "level": env("LOGGING_LEVEL")},
+}
+# A sample of the queries slower than this is logged
+LOGGING_SLOW_QUERY_SECONDS = 0.5
+LOGGING_SLOW_QUERY_SAMPLE_RATE = 0.1
+# The requests which are not logged, e.g. the probes hitting every few seconds
+LOGGING_SKIPPED_PATH_PREFIXES = ["/backend/health/"]
+
+# Profiling, see webapp.profiling and the profiles management command. The
+# requests with a signed header and a sample of the others are profiled, and
+# the profiles are stored in PROFILING_DIRECTORY or else the default storage
+PROFILING_ENABLED = env("PROFILING_ENABLED")
+PROFILING_SAMPLE_RATE = env("PROFILING_SAMPLE_RATE")
+PROFILING_PROFILER = "sampling"
+PROFILING_SAMPLING_INTERVAL = 0.005
+PROFILING_SIGNATURE_MAX_AGE = 60 * 60
+PROFILING_DIRECTORY = env("PROFILING_DIRECTORY")
+
+# Creates the initial data once per test run, see webapp.test.runner
+TEST_RUNNER = "webapp.test.runner.TestRunner"
+
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
@@ -168,6 +264,12 @@ AUTH_PASSWORD_VALIDATORS = [
 INTERNAL_IPS = ["127.0.0.1"]
 SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
 SESSION_COOKIE_SECURE = True
+# Token authenticated requests under this path do not use sessions
+SESSIONLESS_PATH_PREFIX = "/backend/api/"
+# NOTE: set to "django.contrib.sessions.backends.cached_db" with a redis
+# SESSION_REDIS_URL to read the admin and browser sessions from redis
+SESSION_ENGINE = env("SESSION_ENGINE")
+SESSION_PURGE_BATCH_SIZE = 1000
 CSRF_COOKIE_SECURE = True
 AWS_AUTO_CREATE_BUCKET = False
 AWS_DEFAULT_ACL = "private"
@@ -178,12 +280,53 @@ MEDIA_URL = "/assets/media/"
 STATIC_URL = "/assets/static/"
 
 # Celery
-CELERY_BROKER_TRANSPORT_OPTIONS = {"visibility_timeout": 3600}  # 1 hour.
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    "visibility_timeout": 3600,  # 1 hour.
+    # Consume the queues in the order of webapp.celery.QUEUE_CLASSES so that
+    # critical tasks are taken first by workers consuming several queues, and
+    # support `apply_async(priority=...)` within a queue (0 is the highest).
+    "queue_order_strategy": "priority",
+    "priority_steps": list(range(10)),
+}
+CELERY_TASK_DEFAULT_PRIORITY = 5
 CELERY_RESULT_BACKEND = "django-db"
+# NOTE: Tasks can override this with `@shared_task(result_policy=...)`, one of
+# "ignore", "redis" or "db". See webapp.celery.ResultPolicyTask
+CELERY_TASK_RESULT_POLICY = env("CELERY_TASK_RESULT_POLICY")
+CELERY_REDIS_RESULT_BACKEND_URL = env(
+    "CELERY_REDIS_RESULT_BACKEND_URL", default=CELERY_BROKER_URL
+)
+CELERY_RESULT_EXPIRES = timedelta(days=1)
+CELERY_RESULT_PURGE_BATCH_SIZE = 1000
+CELERY_BEAT_SCHEDULE = {
+    "purge-task-results": {
+        "task": "webapp.tasks.purge_task_results",
+        "schedule": timedelta(hours=1),
+    },
+    "purge-expired-sessions": {
+        "task": "webapp.tasks.purge_expired_sessions",
+        "schedule": timedelta(hours=1),
+    },
+    "purge-expired-tokens": {
+        "task": "users.tasks.purge_expired_tokens",
+        "schedule": timedelta(hours=1),
+    },
+}
 CELERY_TIMEZONE = "UTC"
 CELERY_ENABLE_UTC = True
-CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
+CELERY_BEAT_SCHEDULER = "webapp.schedulers:CachedDatabaseScheduler"
+# The scheduler checks the database for schedule changes at this interval
+# (seconds), or as soon as a change is published to the channel below.
+CELERY_BEAT_CHANGE_CHECK_INTERVAL = 60
+CELERY_BEAT_CHANGES_URL = CELERY_BROKER_URL
+CELERY_BEAT_CHANGES_CHANNEL = f"{CELERY_TASK_DEFAULT_QUEUE}:beat-changes"
+# Maximum countdown (seconds) added to periodic tasks sharing a crontab
+CELERY_BEAT_JITTER = 30
+CELERY_BEAT_METRICS_PORT = env.int("CELERY_BEAT_METRICS_PORT", default=0)
+CELERY_WORKER_METRICS_PORT = env.int("CELERY_WORKER_METRICS_PORT", default=0)
 CELERY_APP_NAME = PROJECT_NAME
+# The workers log with LOGGING too
+CELERY_WORKER_HIJACK_ROOT_LOGGER = False
 
 # Email
 EMAIL_SUBJECT_PREFIX = f"[Django - {PROJECT_NAME}] "
@@ -197,11 +340,17 @@ MAILGUN_API_KEY = env("MAILGUN_API_KEY")
 FRONTEND_URL = SITE_URL
 
 # Django-axes
-AXES_HANDLER = "axes.handlers.cache.AxesCacheHandler"
+AXES_HANDLER = "webapp.handlers.AxesRedisHandler"
 AXES_CACHE = "axes"
 AXES_ENABLE_ADMIN = False
 AXES_FAILURE_LIMIT = 10
 AXES_COOLOFF_TIME = timedelta(hours=1)
+# The token buckets of webapp.throttling share the redis cache of django-axes
+THROTTLE_CACHE = AXES_CACHE
+# The configured state of the storage bucket, see setup_skeletons
+SKELETONS_CACHE = AXES_CACHE
+# The clients reading from the primary, see webapp.routers.ReplicaMiddleware
+DATABASE_REPLICA_STICKY_CACHE = AXES_CACHE
 # NOTE: This value should be set in the env to use HTTP_X_FORWARDED_FOR in most
 # cases since most projects will be behind a reverse proxy.
 # WARNING: *DO NOT* put HTTP_X_FORWARDED_FOR in the variable if this project is
@@ -227,12 +376,28 @@ CACHES = {
     "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
     AXES_CACHE: axes_cache_config,
 }
+# The rendered lists of webapp.mixins.CachedListMixin, disabled by default
+LIST_CACHE = "lists"
+CACHES[LIST_CACHE] = env.cache_url("LIST_CACHE_URL")
+# Responses with an ETag are compressed once, see webapp.compression, unless
+# the cache is a dummy one
+COMPRESSION_CACHE = LIST_CACHE
+COMPRESSION_CACHE_TIMEOUT = 60 * 60
+# Smaller responses fit in a packet or two, compressing them saves nothing
+COMPRESSION_MIN_SIZE = 1024
+# The readiness checks of webapp.health, in seconds
+HEALTH_CHECK_TIMEOUT = 2
+HEALTH_CHECK_CACHE_TIMEOUT = 5
+if env("SESSION_REDIS_URL"):
+    SESSION_CACHE_ALIAS = "sessions"
+    CACHES[SESSION_CACHE_ALIAS] = env.cache_url("SESSION_REDIS_URL")
 
 # DRF Core
 LOGIN_URL = "/backend/api/v1/login/"
 LOGIN_REDIRECT_URL = "/backend/api/v1/"
 INSTALLED_APPS += [
     "rest_framework",
+    # NOTE: only kept for the tables copied by users migration 0003
     "rest_framework.authtoken",
     "dj_rest_auth",
     "allauth",
@@ -243,7 +408,8 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.IsAuthenticatedOrReadOnly"
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "users.authentication.ExpiringTokenAuthentication",
+        "users.authentication.SignedTokenAuthentication",
         "rest_framework.authentication.BasicAuthentication",
         "rest_framework.authentication.SessionAuthentication",
     ],
@@ -259,8 +425,17 @@ REST_FRAMEWORK = {
         "rest_framework_json_api.filters.QueryParameterValidationFilter",
         "rest_framework_json_api.filters.OrderingFilter",
         "rest_framework_json_api.django_filters.DjangoFilterBackend",
-        "rest_framework.filters.SearchFilter",
+        "webapp.filters.RankedSearchFilter",
     ],
+    # NOTE: These are token buckets, see webapp.throttling. Login attempts are
+    # throttled before any password is hashed, globally so that a distributed
+    # attack cannot saturate the workers.
+    "DEFAULT_THROTTLE_RATES": {
+        "login": "600/m",
+        "login_ip": "20/m",
+        "password_reset": "120/m",
+        "password_reset_ip": "5/m",
+    },
     "SEARCH_PARAM": "filter[search]",
     "DEFAULT_PAGINATION_CLASS": "webapp.pagination.JsonApiPageNumberPagination",
     "PAGE_SIZE": 100,
@@ -285,6 +460,28 @@ REST_AUTH_SERIALIZERS = {
     "LOGIN_SERIALIZER": "users.serializers.LoginSerializer",
     "TOKEN_SERIALIZER": "users.serializers.TokenSerializer",
 }
+REST_AUTH_TOKEN_MODEL = "users.models.Token"
+REST_AUTH_TOKEN_CREATOR = "users.authentication.create_token"
+# API logins only issue tokens, they never create a session, see
+# webapp.sessions. Session authentication of the API needs a session created
+# elsewhere, e.g. by the admin login.
+REST_SESSION_LOGIN = False
+# Tokens expire when unused for TOKEN_TTL, their last use is written at most
+# once per TOKEN_REFRESH_INTERVAL
+TOKEN_TTL = timedelta(days=14)
+TOKEN_REFRESH_INTERVAL = timedelta(minutes=5)
+TOKEN_PURGE_BATCH_SIZE = 1000
+# Stateless signed tokens are issued on login alongside the token when enabled,
+# see users.signed_tokens. To rotate the SECRET_KEY without logging everybody
+# out, put the old key in SIGNED_TOKEN_OLD_KEYS until the tokens expire.
+SIGNED_TOKENS_ENABLED = env.bool("SIGNED_TOKENS_ENABLED", default=False)
+SIGNED_TOKEN_KEYS = [SECRET_KEY]
+SIGNED_TOKEN_KEYS += [
+    key for key in env.list("SIGNED_TOKEN_OLD_KEYS", default=[]) if key
+]
+SIGNED_TOKEN_ACCESS_TTL = timedelta(minutes=5)
+SIGNED_TOKEN_REFRESH_TTL = TOKEN_TTL
+SIGNED_TOKEN_DENYLIST_CACHE = AXES_CACHE
 
 if DEBUG:
     ALLOWED_HOSTS = ["*"]
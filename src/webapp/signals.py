@@ -1,10 +1,36 @@
 """Project wide signals."""
 # pylint: disable=unused-argument
+import os
+from time import perf_counter, time
+
 from axes.helpers import get_client_cache_key, get_credentials
 from axes.signals import user_locked_out
+from celery.signals import (
+    before_task_publish,
+    task_failure,
+    task_postrun,
+    task_prerun,
+    task_retry,
+    worker_process_shutdown,
+    worker_ready,
+)
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
+from django_celery_beat.models import PeriodicTasks
+
+from users import signed_tokens
+from webapp import logs, metrics, routers, tasks
+from webapp.mixins import invalidate_all_list_caches, invalidate_list_cache
+from webapp.schedulers import notify_schedule_changed
+
+User = get_user_model()
 
-from webapp import tasks
+# Saving only these fields does not invalidate the cached lists, e.g. the
+# last_login written on every login
+LIST_CACHE_IGNORED_FIELDS = {"last_login"}
 
 
 @receiver(user_locked_out)
@@ -13,3 +39,120 @@ def email_admins_on_user_locked_out(request, username, ip_address, **kwargs):
     tasks.email_admins_on_user_locked_out.apply_async(
         [get_client_cache_key(request, get_credentials(username)), ip_address]
     )
+
+
+@receiver(post_save, sender=PeriodicTasks)
+def notify_beat_on_schedule_changed(sender, **kwargs):
+    """Notify celery beat that the periodic tasks changed."""
+    notify_schedule_changed()
+
+
+@receiver([post_save, post_delete, m2m_changed])
+def invalidate_cached_lists(sender, instance, update_fields=None, **kwargs):
+    """Invalidate the cached lists of the changed object's model."""
+    if update_fields is not None and set(update_fields) <= LIST_CACHE_IGNORED_FIELDS:
+        return
+    invalidate_list_cache(type(instance))
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+@receiver(post_delete, sender=Group)
+def invalidate_cached_lists_on_permissions_changed(sender, action=None, **kwargs):
+    """Invalidate all the cached lists, they are scoped by user not permissions."""
+    if action is None or action.startswith("post_"):
+        invalidate_all_list_caches()
+
+
+@receiver(post_save, sender=User)
+def revoke_signed_tokens_on_user_deactivated(
+    sender, instance, update_fields=None, **kwargs
+):
+    """Revoke the signed tokens of a saved inactive user."""
+    if not settings.SIGNED_TOKENS_ENABLED or instance.is_active:
+        return
+    if update_fields is None or "is_active" in update_fields:
+        signed_tokens.revoke_users([instance])
+
+
+@receiver(post_delete, sender=User)
+def revoke_signed_tokens_on_user_deleted(sender, instance, **kwargs):
+    """Revoke the signed tokens of a deleted user."""
+    if settings.SIGNED_TOKENS_ENABLED:
+        signed_tokens.revoke_users([instance])
+
+
+@receiver(before_task_publish)
+def add_published_at_header(headers=None, **kwargs):
+    """Add the publish time to the task headers to measure the queue wait."""
+    if headers is not None:
+        headers.setdefault("published_at", time())
+
+
+@receiver(before_task_publish)
+def add_request_id_header(headers=None, **kwargs):
+    """Add the id of the request sending the task to the task headers."""
+    request_id = logs.get_request_id()
+    if headers is not None and request_id is not None:
+        headers.setdefault("request_id", request_id)
+
+
+@receiver(task_prerun)
+def start_task_log(task, **kwargs):
+    """Start logging the task with the id of the request which sent it."""
+    logs.task_started(getattr(task.request, "request_id", None))
+
+
+@receiver(task_postrun)
+def finish_task_log(task, state=None, **kwargs):
+    """Log the task and record its runtime and database queries."""
+    timings = logs.get_timings()
+    if timings is not None:
+        seconds = perf_counter() - timings.started
+        metrics.task_finished(task.name, seconds, timings.db_queries)
+    logs.task_finished(task.name, state)
+
+
+@receiver(task_prerun)
+def start_task_metrics(task, **kwargs):
+    """Record the queue wait of the task."""
+    published_at = getattr(task.request, "published_at", None)
+    metrics.task_started(task.name, published_at)
+
+
+@receiver(task_prerun)
+def use_replicas_for_read_only_task(task, **kwargs):
+    """Let read-only tasks read from the replicas, see webapp.routers."""
+    routers.use_replicas(getattr(task, "read_only", False))
+
+
+@receiver(task_postrun)
+def stop_using_replicas(task, **kwargs):
+    """Read from the primary again."""
+    routers.use_replicas(False)
+
+
+@receiver(task_failure)
+def count_task_failure(sender, **kwargs):
+    """Count the failed task."""
+    metrics.TASK_FAILURES.labels(sender.name).inc()
+
+
+@receiver(task_retry)
+def count_task_retry(sender, **kwargs):
+    """Count the retried task."""
+    metrics.TASK_RETRIES.labels(sender.name).inc()
+
+
+@receiver(worker_ready)
+def serve_worker_metrics(**kwargs):
+    """Serve the worker metrics."""
+    metrics.start_metrics_server(settings.CELERY_WORKER_METRICS_PORT)
+
+
+@receiver(worker_process_shutdown)
+def remove_worker_process_metrics(pid, **kwargs):
+    """Remove the live metrics of the stopped pool process."""
+    if os.environ.get(metrics.MULTIPROCESS_DIR_ENV):
+        metrics.multiprocess.mark_process_dead(pid)
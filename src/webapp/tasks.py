@@ -1,13 +1,18 @@
 """Project wide tasks."""
+from anymail.exceptions import AnymailRequestsAPIError
 from axes.helpers import get_cache, get_cache_timeout
 from celery import shared_task
 from django.conf import settings
-from django.core.mail import mail_admins
+from django.contrib.sessions.models import Session
+from django.core.mail import mail_admins, send_mail
 from django.template.loader import render_to_string
 from django.utils.timezone import now
+from django_celery_results.models import TaskResult
 
+from webapp.db import delete_in_batches
 
-@shared_task
+
+@shared_task(result_policy="ignore", queue_class="critical")
 def email_admins_on_user_locked_out(cache_key, ip_address):
     """Email admins on user locked out."""
     cache = get_cache()
@@ -27,3 +32,31 @@ def email_admins_on_user_locked_out(cache_key, ip_address):
                 "axes/lockout_admin_email.html", context=context
             ),
         )
+
+
+@shared_task(
+    result_policy="ignore",
+    queue_class="critical",
+    autoretry_for=(AnymailRequestsAPIError,),
+    retry_backoff=True,
+    max_retries=5,
+)
+def send_email(subject, message, from_email, recipient_list, html_message=None):
+    """Send an email rendered by a request, outside of the request."""
+    send_mail(subject, message, from_email, recipient_list, html_message=html_message)
+
+
+@shared_task(result_policy="ignore", queue_class="bulk")
+def purge_task_results():
+    """Delete task results older than `CELERY_RESULT_EXPIRES` in batches."""
+    expired = TaskResult.objects.filter(
+        date_done__lt=now() - settings.CELERY_RESULT_EXPIRES
+    )
+    return delete_in_batches(expired, settings.CELERY_RESULT_PURGE_BATCH_SIZE)
+
+
+@shared_task(result_policy="ignore", queue_class="bulk")
+def purge_expired_sessions():
+    """Delete expired database sessions in batches."""
+    expired = Session.objects.filter(expire_date__lt=now())
+    return delete_in_batches(expired, settings.SESSION_PURGE_BATCH_SIZE)
@@ -1,8 +1,9 @@
 """Project wide base test class."""
 from typing import Any, Dict, Optional, Tuple, Type
 
+from django.conf import settings
+from django.core.cache import caches
 from django.core.exceptions import ImproperlyConfigured
-from django.core.management import call_command
 from hamcrest import assert_that
 from hamcrest.core.base_matcher import BaseMatcher  # type: ignore
 from rest_framework import status, test
@@ -11,6 +12,19 @@ from users.models import User
 from webapp.test.schemas import JsonApiSchema
 
 
+def clear_cache(alias: str):
+    """Delete the keys of the cache, only the ones of this test worker in Redis.
+
+    The Redis databases are shared by the workers, their keys are prefixed by
+    webapp.test.runner.
+    """
+    cache = caches[alias]
+    if hasattr(cache, "delete_pattern"):
+        cache.delete_pattern("*")
+    else:
+        cache.clear()
+
+
 class APIClient(test.APIClient):
     """Auto set the base api path."""
 
@@ -34,11 +48,11 @@ class BaseTestCase(test.APITestCase):
         self.current_user = None
         self.current_token = None
 
-    @classmethod
-    def setUpClass(cls):
-        """Set up necessary data for tests."""
-        super().setUpClass()
-        call_command("setup_skeletons", verbosity=0)
+    def setUp(self):
+        """Start each test with empty throttles, lockouts and cached lists."""
+        super().setUp()
+        clear_cache(settings.THROTTLE_CACHE)
+        clear_cache(settings.LIST_CACHE)
 
     def auth(self, user: Optional[User], token: Optional[str] = None):
         """Authenticate as the given user."""
@@ -12,8 +12,8 @@ from hamcrest import (
     matches_regexp,
     only_contains,
 )
+from hamcrest.core.base_description import BaseDescription  # type: ignore
 from hamcrest.core.base_matcher import BaseMatcher  # type: ignore
-from hamcrest.core.string_description import StringDescription
 
 ISODATE_REGEX = r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d{6})?.*"
 UUID_REGEX = r"-?".join(
@@ -27,6 +27,20 @@ UUID_REGEX = r"-?".join(
 )
 
 
+class NullDescription(BaseDescription):
+    """Description discarding its text, for matches without a description.
+
+    Building the mismatch descriptions of the nested matchers is only needed
+    to report a failure, not to find one.
+    """
+
+    def append(self, string):
+        """Discard the text."""
+
+
+NULL_DESCRIPTION = NullDescription()
+
+
 def is_regex(regex: str, nullable=False) -> Callable[[Optional[str]], bool]:
     """Return a function to check whether an Optional[str] matches a regex."""
     good = all_of(instance_of(str), matches_regexp(r"^%s$" % regex))
@@ -57,7 +71,7 @@ class IsResourceIdentifierObject(BaseMatcher):
     def matches(self, item, mismatch_description=None):
         """Return whether the item is a resource identifier."""
         if mismatch_description is None:
-            mismatch_description = StringDescription()
+            mismatch_description = NULL_DESCRIPTION
         if not isinstance(item, dict):
             mismatch_description.append(
                 f"not a `dict`\n     got: `{item.__class__.__name__}`"
@@ -109,7 +123,7 @@ class IsResourceObject(IsResourceIdentifierObject):
     def matches(self, item, mismatch_description=None):
         """Return whether the item is a resource object."""
         if mismatch_description is None:
-            mismatch_description = StringDescription()
+            mismatch_description = NULL_DESCRIPTION
         match_result = super().matches(item, mismatch_description)
         if not match_result:
             return match_result
@@ -204,7 +218,7 @@ class IsToOne(IsResourceIdentifierObject):
     def matches(self, item, mismatch_description=None):
         """Return whether the item is a valid to-one relationship."""
         if mismatch_description is None:
-            mismatch_description = StringDescription()
+            mismatch_description = NULL_DESCRIPTION
         if "data" not in item:
             mismatch_description.append('missing key "data"')
             return False
@@ -232,7 +246,7 @@ class IsToMany(IsResourceIdentifierObject):
     def matches(self, item, mismatch_description=None):
         """Return whether the item is a valid to-many relationship."""
         if mismatch_description is None:
-            mismatch_description = StringDescription()
+            mismatch_description = NULL_DESCRIPTION
         if "data" not in item:
             mismatch_description.append('missing key "data"')
             return False
@@ -279,6 +293,7 @@ class IsDocument(BaseMatcher):
         super().__init__()
         self.resource_matcher = resource_matcher
         self.included_matchers = included_matchers
+        self.include_matcher = any_of(*included_matchers)
         self.optional = optional
         self.many = many
 
@@ -288,7 +303,7 @@ class IsDocument(BaseMatcher):
     def matches(self, item, mismatch_description=None):
         """Return whether the item is a json:api document."""
         if mismatch_description is None:
-            mismatch_description = StringDescription()
+            mismatch_description = NULL_DESCRIPTION
         if "data" not in item:
             mismatch_description.append('missing key "data"')
             return False
@@ -331,13 +346,14 @@ class IsDocument(BaseMatcher):
                     f'"included" is not a `list`\n     got: `{item.__class__.__name__}`'
                 )
                 return False
-            include_matcher = any_of(self.included_matchers)
             for index, include in enumerate(item["included"]):
-                if not include_matcher.matches(include):
+                if not self.include_matcher.matches(include):
                     mismatch_description.append(
                         f"include at index {index} does not match. Failed because: "
                     )
-                    include_matcher.describe_mismatch(include, mismatch_description)
+                    self.include_matcher.describe_mismatch(
+                        include, mismatch_description
+                    )
                     append_item(include, mismatch_description)
                     return False
         return True
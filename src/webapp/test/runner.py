@@ -0,0 +1,101 @@
+"""Project wide test runner."""
+import logging
+from functools import wraps
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models.signals import post_migrate
+from django.test import override_settings, runner
+
+# Hashing passwords with the production hashers dominates the factories' time
+FAST_PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+# Every request is logged, see webapp.logs
+TEST_LOGGING_LEVEL = logging.WARNING
+
+
+def create_skeletons(using: str = DEFAULT_DB_ALIAS):
+    """Create the initial data of the test database."""
+    call_command("setup_skeletons", database=using, verbosity=0)
+
+
+def create_skeletons_once_migrated(app_config, using=DEFAULT_DB_ALIAS, **kwargs):
+    """Create the initial data once post_migrate was sent for the last app.
+
+    The signal is sent for each app in order, the handlers of the earlier
+    apps (e.g. the default site and permissions) must have run.
+    """
+    migrated = [
+        config for config in apps.get_app_configs() if config.models_module is not None
+    ]
+    if app_config is migrated[-1]:
+        create_skeletons(using)
+
+
+def use_worker_caches(worker_id: str):
+    """Prefix the cache keys of the worker, the cache servers are shared."""
+    override_settings(
+        CACHES={
+            alias: {
+                **config,
+                "KEY_PREFIX": f"{config.get('KEY_PREFIX', '')}test_{worker_id}",
+            }
+            for alias, config in settings.CACHES.items()
+        }
+    ).enable()
+
+
+def _init_worker(counter):
+    """Switch to the databases and the cache keys dedicated to this worker."""
+    runner._init_worker(counter)  # pylint: disable=protected-access
+    use_worker_caches(str(runner._worker_id))  # pylint: disable=protected-access
+
+
+def _clone_fresh(clone):
+    """Return the clone_test_db method, recreating the existing clones."""
+
+    @wraps(clone)
+    def clone_test_db(*args, **kwargs):
+        kwargs["keepdb"] = False
+        return clone(*args, **kwargs)
+
+    return clone_test_db
+
+
+class ParallelTestSuite(runner.ParallelTestSuite):
+    """Run the tests with the databases and cache keys of each worker."""
+
+    init_worker = _init_worker
+
+
+class TestRunner(runner.DiscoverRunner):
+    """Set up the test databases once with the initial data.
+
+    The initial data is created once migrated, so with `--parallel` it is
+    part of the database each worker's database is cloned from (a template
+    database on PostgreSQL), instead of being created for each test class.
+    With `--keepdb` only the migrated database is kept, the clones are made
+    again so that they have its migrations and data.
+    """
+
+    parallel_test_suite = ParallelTestSuite
+
+    def setup_test_environment(self, **kwargs):
+        """Use a fast password hasher and only log the warnings."""
+        super().setup_test_environment(**kwargs)
+        settings.PASSWORD_HASHERS = FAST_PASSWORD_HASHERS
+        logging.getLogger().setLevel(TEST_LOGGING_LEVEL)
+
+    def setup_databases(self, **kwargs):
+        """Create the initial data before the databases are cloned."""
+        post_migrate.connect(create_skeletons_once_migrated)
+        for connection in connections.all():
+            creation = connection.creation
+            creation.clone_test_db = _clone_fresh(creation.clone_test_db)
+        try:
+            return super().setup_databases(**kwargs)
+        finally:
+            post_migrate.disconnect(create_skeletons_once_migrated)
+            for connection in connections.all():
+                del connection.creation.clone_test_db
@@ -1,7 +1,8 @@
 """Base schema definition."""
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional, Union
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, List, Optional, Union
 
 from django.core.exceptions import ImproperlyConfigured
 from django.utils.module_loading import import_string
@@ -33,8 +34,15 @@ class ApiSchema:
         """Return a matcher which matches a standard drf response.
 
         Any fields specified in `exclude` will not be added to the matcher.
+        The matchers are compiled once per schema and arguments.
         """
-        exclude = exclude or []
+        return cls._compile_matcher(frozenset(exclude or []), many, optional)
+
+    @classmethod
+    @lru_cache(maxsize=None)
+    def _compile_matcher(
+        cls, exclude: FrozenSet[str], many: Optional[bool], optional: Optional[bool]
+    ):
         matcher = has_entries(
             **{k: v for k, v in cls.fields.items() if k not in exclude}
         )
@@ -108,13 +116,26 @@ class JsonApiSchema(metaclass=SchemaBase):
         supplied as they are simply passed on to the IsDocument matcher.
         `many` defaults to False if `as_document is True.
         `optional` defaults to True if `as_dcument` is True.
+        The matchers are compiled once per schema and arguments.
         """
         assert as_document or (not as_document and many is None and optional is None), (
             "If `as_document` is False, then `many` and `optional`"
             " must not be supplied as they are simply passed on to"
             " the IsDocument matcher."
         )
-        exclude = exclude or []
+        return cls._compile_matcher(
+            frozenset(exclude or []), many, optional, as_document
+        )
+
+    @classmethod
+    @lru_cache(maxsize=None)
+    def _compile_matcher(
+        cls,
+        exclude: FrozenSet[str],
+        many: Optional[bool],
+        optional: Optional[bool],
+        as_document: bool,
+    ) -> Matcher:
         matcher = IsResourceObject(
             resource_name=cls.resource_name,
             attributes={k: v for k, v in cls.attributes.items() if k not in exclude},
@@ -150,7 +171,8 @@ class JsonApiSchema(metaclass=SchemaBase):
     @classmethod
     def get_resolved_included_matchers(cls):
         """Return the resolved list of included matchers."""
-        if not hasattr(cls, "_resolved_included_matchers"):
+        # NOTE: not hasattr, which would return the matchers of the parent class
+        if "_resolved_included_matchers" not in cls.__dict__:
             matchers = []
             for include in cls.includes:
                 exception_msg = (
@@ -0,0 +1,109 @@
+"""Ensure task results are stored according to the result policy."""
+from datetime import timedelta
+
+from celery.backends.redis import RedisBackend
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.test import TestCase as DjangoTestCase
+from django.utils.timezone import now
+from django_celery_results.models import TaskResult
+from prometheus_client import REGISTRY
+
+from webapp import tasks
+from webapp.celery import app
+
+
+class TestCase(DjangoTestCase):
+    """Ensure task results are stored according to the result policy."""
+
+    def test_notification_ignores_result(self):
+        """Notification tasks do not store their results."""
+        self.assertTrue(tasks.email_admins_on_user_locked_out.ignore_result)
+
+    def test_default_policy(self):
+        """Tasks without a result policy use the default backend."""
+
+        @app.task(name="test_default_policy", shared=False)
+        def task():
+            """Test task."""
+
+        self.assertFalse(task.ignore_result)
+        self.assertIs(task.backend, app.backend)
+
+    def test_redis_policy(self):
+        """Tasks with the redis policy store results in redis."""
+
+        @app.task(name="test_redis_policy", result_policy="redis", shared=False)
+        def task():
+            """Test task."""
+
+        self.assertFalse(task.ignore_result)
+        self.assertIsInstance(task.backend, RedisBackend)
+
+    def test_critical_queue(self):
+        """Critical tasks are routed to the critical queue."""
+        task = tasks.email_admins_on_user_locked_out
+        route = app.amqp.router.route({}, task.name, task_type=task)
+        self.assertEqual(
+            route["queue"].name, f"{settings.CELERY_TASK_DEFAULT_QUEUE}.critical"
+        )
+
+    def test_explicit_queue(self):
+        """A queue given when sending the task takes precedence."""
+        task = tasks.email_admins_on_user_locked_out
+        route = app.amqp.router.route({"queue": "other"}, task.name, task_type=task)
+        self.assertEqual(route["queue"].name, "other")
+
+    def test_task_metrics(self):
+        """Task runtime and database queries are recorded."""
+
+        @app.task(name="test_task_metrics", shared=False)
+        def task():
+            """Test task."""
+            return TaskResult.objects.count()
+
+        labels = {"task": "test_task_metrics"}
+        sample = "celery_task_db_queries_sum"
+        queries = REGISTRY.get_sample_value(sample, labels) or 0
+        task.apply()
+        # check the runtime and queries were recorded
+        self.assertEqual(
+            REGISTRY.get_sample_value("celery_task_runtime_seconds_count", labels), 1
+        )
+        self.assertEqual(REGISTRY.get_sample_value(sample, labels), queries + 1)
+
+    def test_purge_task_results(self):
+        """Only expired task results are purged."""
+        expired = now() - settings.CELERY_RESULT_EXPIRES - timedelta(minutes=1)
+        for index in range(5):
+            TaskResult.objects.create(task_id=f"expired-{index}")
+        TaskResult.objects.update(date_done=expired)
+        TaskResult.objects.create(task_id="current")
+        with self.settings(CELERY_RESULT_PURGE_BATCH_SIZE=2):
+            deleted = tasks.purge_task_results()
+        # check only the expired results were deleted
+        self.assertEqual(deleted, 5)
+        self.assertEqual(
+            list(TaskResult.objects.values_list("task_id", flat=True)), ["current"]
+        )
+
+    def test_purge_expired_sessions(self):
+        """Only expired sessions are purged."""
+        for index in range(3):
+            Session.objects.create(
+                session_key=f"expired-{index}",
+                session_data="",
+                expire_date=now() - timedelta(minutes=1),
+            )
+        Session.objects.create(
+            session_key="current",
+            session_data="",
+            expire_date=now() + timedelta(minutes=1),
+        )
+        with self.settings(SESSION_PURGE_BATCH_SIZE=2):
+            deleted = tasks.purge_expired_sessions()
+        # check only the expired sessions were deleted
+        self.assertEqual(deleted, 3)
+        self.assertEqual(
+            list(Session.objects.values_list("session_key", flat=True)), ["current"]
+        )
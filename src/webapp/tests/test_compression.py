@@ -0,0 +1,122 @@
+"""Ensure the responses are compressed with the negotiated encoding."""
+import gzip
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APISimpleTestCase
+
+from webapp import compression
+from webapp.test.base import APIClient
+
+CONTENT = b"compressible content " * 100
+
+
+@override_settings(COMPRESSION_CACHE="default")
+class TestCase(SimpleTestCase):
+    """Ensure the responses are compressed with the negotiated encoding."""
+
+    def setUp(self):
+        """Start with an empty compression cache."""
+        super().setUp()
+        caches["default"].clear()
+
+    def process(self, response, accept_encoding="gzip"):
+        """Return the response processed by the middleware."""
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING=accept_encoding)
+        middleware = compression.CompressionMiddleware(lambda request: response)
+        return middleware(request)
+
+    def test_negotiate_encoding(self):
+        """The best encoding accepted by the client is used."""
+        with mock.patch.object(compression, "brotli", mock.Mock()):
+            self.assertEqual(compression.negotiate_encoding("gzip, br"), "br")
+            self.assertEqual(compression.negotiate_encoding("gzip, br;q=0.5"), "gzip")
+            self.assertEqual(compression.negotiate_encoding("*"), "br")
+        with mock.patch.object(compression, "brotli", None):
+            self.assertEqual(compression.negotiate_encoding("gzip, br"), "gzip")
+        self.assertIsNone(compression.negotiate_encoding("identity"))
+        self.assertIsNone(compression.negotiate_encoding("gzip;q=0"))
+        self.assertIsNone(compression.negotiate_encoding(""))
+
+    def test_compressed(self):
+        """Large responses are compressed."""
+        response = self.process(HttpResponse(CONTENT))
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(gzip.decompress(response.content), CONTENT)
+
+    def test_small_not_compressed(self):
+        """Responses under the size threshold are not compressed."""
+        content = b"x" * (settings.COMPRESSION_MIN_SIZE - 1)
+        response = self.process(HttpResponse(content))
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(response.content, content)
+
+    def test_not_accepted(self):
+        """Responses are not compressed unless the client accepts it."""
+        response = self.process(HttpResponse(CONTENT), accept_encoding="identity")
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+
+    def test_streaming(self):
+        """Streaming responses are compressed chunk by chunk."""
+        chunks = [CONTENT, CONTENT]
+        response = self.process(StreamingHttpResponse(iter(chunks)))
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        compressed = list(response.streaming_content)
+        # each chunk is flushed as soon as it is compressed
+        self.assertGreaterEqual(len(compressed), len(chunks))
+        self.assertEqual(gzip.decompress(b"".join(compressed)), CONTENT * 2)
+
+    def test_cached(self):
+        """Responses with an ETag are compressed once."""
+        responses = [HttpResponse(CONTENT), HttpResponse(CONTENT)]
+        for response in responses:
+            response["ETag"] = '"etag"'
+        with mock.patch.object(
+            compression, "compress", wraps=compression.compress
+        ) as compress:
+            first, second = [self.process(response) for response in responses]
+        compress.assert_called_once()
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(second["ETag"], 'W/"etag"')
+        self.assertEqual(gzip.decompress(second.content), CONTENT)
+
+    @override_settings(
+        COMPRESSION_CACHE="dummy",
+        CACHES={
+            **settings.CACHES,
+            "dummy": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"},
+        },
+    )
+    def test_not_cached(self):
+        """Responses with an ETag use the fast level without a cache."""
+        response = HttpResponse(CONTENT)
+        response["ETag"] = '"etag"'
+        with mock.patch.object(
+            compression, "compress", wraps=compression.compress
+        ) as compress:
+            self.process(response)
+        compress.assert_called_once_with(
+            CONTENT, "gzip", compression.FAST_LEVELS["gzip"]
+        )
+
+
+class SchemaTestCase(APISimpleTestCase):
+    """Ensure the schema is served compressed."""
+
+    client_class = APIClient
+
+    def test_schema_compressed(self):
+        """The schema is compressed and can be revalidated."""
+        response = self.client.get("/schema/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        response = self.client.get(
+            "/schema/", HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
@@ -0,0 +1,91 @@
+"""Ensure the health endpoints report the dependencies."""
+import threading
+from time import sleep
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import TestCase as DjangoTestCase
+from django.test import override_settings
+from redis.exceptions import ConnectionError as RedisConnectionError
+from rest_framework import status
+
+from webapp import health
+
+
+@mock.patch.object(health, "check_broker", mock.Mock())
+@mock.patch.object(health, "check_storage", mock.Mock())
+class TestCase(DjangoTestCase):
+    """Ensure the health endpoints report the dependencies."""
+
+    def setUp(self):
+        """Start without cached or running checks."""
+        super().setUp()
+        caches["default"].delete(health.READY_CACHE_KEY)
+        health._futures.clear()  # pylint: disable=protected-access
+
+    def test_live(self):
+        """The process is live without checking the dependencies."""
+        with mock.patch.object(health, "run_checks") as run_checks:
+            response = self.client.get("/backend/health/live")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        run_checks.assert_not_called()
+
+    def test_ready(self):
+        """The latency of each dependency is reported."""
+        response = self.client.get("/backend/health/ready")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        checks = response.json()["checks"]
+        self.assertEqual(set(checks), set(health.get_checks()))
+        for check in checks.values():
+            self.assertTrue(check["ok"])
+            self.assertGreaterEqual(check["latency_ms"], 0)
+
+    def test_not_ready(self):
+        """A failing dependency is reported with a 503."""
+        with mock.patch.object(health, "check_broker", side_effect=ConnectionError):
+            response = self.client.get("/backend/health/ready")
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        broker = response.json()["checks"]["broker"]
+        self.assertEqual(broker["error"], "ConnectionError")
+
+    @override_settings(HEALTH_CHECK_TIMEOUT=0.05)
+    def test_timeout(self):
+        """Slow dependencies time out."""
+        with mock.patch.object(health, "check_broker", lambda: sleep(0.5)):
+            response = self.client.get("/backend/health/ready")
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response.json()["checks"]["broker"]["error"], "timeout")
+
+    def test_cached(self):
+        """The checks are cached between probes."""
+        with mock.patch.object(health, "run_checks", wraps=health.run_checks) as run:
+            for _ in range(2):
+                self.client.get("/backend/health/ready")
+        run.assert_called_once()
+
+    @override_settings(HEALTH_CHECK_TIMEOUT=0.05)
+    def test_running_not_queued(self):
+        """A check still running since the last probe is not run again."""
+        released = threading.Event()
+        self.addCleanup(released.set)
+        check = mock.Mock(side_effect=released.wait)
+        with mock.patch.object(health, "check_broker", check):
+            for _ in range(2):
+                checks = health.run_checks()
+                self.assertEqual(checks["broker"]["error"], "timeout")
+        check.assert_called_once()
+
+    @override_settings(
+        CACHES={
+            **settings.CACHES,
+            "health": {
+                "BACKEND": "django_redis.cache.RedisCache",
+                "LOCATION": "redis://127.0.0.1:1/0",
+            },
+        }
+    )
+    def test_redis_down(self):
+        """Redis is read with a client of its own, which fails when it is down."""
+        with self.assertRaises(RedisConnectionError):
+            health.check_cache("health")
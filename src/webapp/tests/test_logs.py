@@ -0,0 +1,144 @@
+"""Ensure the requests and tasks are logged with their request id and timings."""
+import json
+import logging
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from rest_framework import status
+
+from users.models import User
+from users.tests.factories import UserFactory
+from webapp import logs, signals
+
+
+class LogsTestCase(TestCase):
+    """Ensure the requests and tasks are logged with their request id and timings."""
+
+    def setUp(self):
+        """Log in as an admin."""
+        super().setUp()
+        self.client.force_login(UserFactory(is_staff=True, is_superuser=True))
+
+    def get(self, path="/backend/django-admin/", **headers):
+        """Return the response and the log record of the request."""
+        with self.assertLogs("webapp.requests") as logged:
+            response = self.client.get(path, **headers)
+        self.assertEqual(len(logged.records), 1)
+        return response, logged.records[0]
+
+    def test_request_logged(self):
+        """Requests are logged with their status and timings."""
+        response, record = self.get()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(record.status, status.HTTP_200_OK)
+        self.assertEqual(record.route, "backend/django-admin/")
+        self.assertEqual(record.request_id, response[logs.HEADER])
+        self.assertIsNone(logs.get_request_id())
+
+    def test_probes_not_logged(self):
+        """The health probes are not logged, but have a request id."""
+        with mock.patch.object(logs.request_log, "info") as info:
+            response = self.client.get("/backend/health/live")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.has_header(logs.HEADER))
+        info.assert_not_called()
+
+    def test_request_id(self):
+        """The request id set by the proxy is used if valid."""
+        response, _ = self.get(HTTP_X_REQUEST_ID="proxy-id.1")
+        self.assertEqual(response[logs.HEADER], "proxy-id.1")
+        response, _ = self.get(HTTP_X_REQUEST_ID="not an id\n")
+        self.assertNotEqual(response[logs.HEADER], "not an id\n")
+
+    def test_timings(self):
+        """The time spent in the database and cache is logged."""
+        _, record = self.get()
+        self.assertGreater(record.db_queries, 0)
+        logs.start("id")
+        try:
+            caches["default"].set("key", "value")
+            caches["default"].get("key")
+            timings = logs.get_timings()
+        finally:
+            logs.stop()
+        self.assertEqual(timings.cache_calls, 2)  # type: ignore
+        self.assertGreater(timings.cache_seconds, 0)  # type: ignore
+
+    @override_settings(LOGGING_SLOW_QUERY_SECONDS=0, LOGGING_SLOW_QUERY_SAMPLE_RATE=1)
+    def test_slow_queries(self):
+        """The slow queries are logged if sampled."""
+        with self.assertLogs("webapp.slow_queries", logging.WARNING) as logged:
+            self.client.get("/backend/django-admin/")
+        self.assertIn("SELECT", logged.records[0].sql)
+
+    def test_eager_task_timings(self):
+        """The queries of a task run in a request are only counted by the task."""
+        request_timings = logs.start("request-id")
+        try:
+            with connection.execute_wrapper(request_timings):
+                logs.task_started(None)
+                User.objects.count()
+                task_timings = logs.get_timings()
+                logs.task_finished("task", "SUCCESS")
+                User.objects.count()
+        finally:
+            logs.stop()
+        self.assertEqual(task_timings.db_queries, 1)  # type: ignore
+        self.assertEqual(request_timings.db_queries, 1)
+
+    def test_task_request_id(self):
+        """Tasks are logged with the id of the request which sent them."""
+        headers = {}
+        logs.start("request-id")
+        try:
+            signals.add_request_id_header(headers=headers)
+        finally:
+            logs.stop()
+        self.assertEqual(headers, {"request_id": "request-id"})
+        task = SimpleNamespace(name="task", request=SimpleNamespace(**headers))
+        signals.start_task_log(task=task)
+        self.assertEqual(logs.get_request_id(), "request-id")
+        with self.assertLogs("webapp.tasks") as logged:
+            signals.finish_task_log(task=task, state="SUCCESS")
+        self.assertEqual(logged.records[0].state, "SUCCESS")
+        self.assertIsNone(logs.get_request_id())
+
+    def test_json(self):
+        """The records are written as JSON lines from another thread."""
+        stream = StringIO()
+        handler = logs.QueueHandler(stream)
+        handler.setFormatter(logs.JsonFormatter())
+        logger = logging.getLogger("webapp.tests.json")
+        logger.addHandler(handler)
+        logger.propagate = False
+        logs.start("request-id")
+        try:
+            logger.warning("Hello %s", "world", extra={"status": 200})
+        finally:
+            logs.stop()
+            logger.removeHandler(handler)
+            logger.propagate = True
+            handler.close()
+        line = json.loads(stream.getvalue())
+        self.assertEqual(line["message"], "Hello world")
+        self.assertEqual(line["request_id"], "request-id")
+        self.assertEqual(line["status"], 200)
+        self.assertEqual(line["level"], "WARNING")
+
+    def test_closed_not_restarted(self):
+        """Only the listeners of the open handlers are restarted after a fork."""
+        handler = logs.QueueHandler(StringIO())
+        closed = logs.QueueHandler(StringIO())
+        closed.close()
+        listener = handler.listener
+        try:
+            logs._restart_queue_listeners()  # pylint: disable=protected-access
+            self.assertIsNot(handler.listener, listener)
+            self.assertIsNone(closed.listener)
+        finally:
+            listener.stop()
+            handler.close()
@@ -0,0 +1,70 @@
+"""Ensure the JSON:API schema matchers are compiled once and match quickly."""
+from timeit import repeat
+
+from django.test import SimpleTestCase
+from hamcrest.core.string_description import StringDescription
+
+from users.tests.schemas import SessionsSchema, UsersSchema
+
+DOCUMENT_SIZE = 10000
+BASELINE_SIZE = 100
+# matching is linear in the resources, this leaves room for noisy machines
+# while a quadratic matcher would be about 100 times slower
+MAX_SLOWDOWN = 5
+
+
+def get_document(size: int):
+    """Return a users list document with size resources."""
+    return {
+        "data": [
+            {"type": "users", "id": str(pk), "attributes": {"email": f"{pk}@a.com"}}
+            for pk in range(size)
+        ]
+    }
+
+
+class TestCase(SimpleTestCase):
+    """Ensure the JSON:API schema matchers are compiled once and match quickly."""
+
+    def test_compiled_once(self):
+        """The same arguments return the same matcher."""
+        self.assertIs(
+            UsersSchema.get_matcher(many=True, exclude=["email"]),
+            UsersSchema.get_matcher(many=True, exclude=["email"]),
+        )
+        self.assertIsNot(
+            UsersSchema.get_matcher(many=True), UsersSchema.get_matcher(many=False)
+        )
+        self.assertIsNot(UsersSchema.get_matcher(), SessionsSchema.get_matcher())
+
+    def test_large_document(self):
+        """Documents of many resources are matched in one pass."""
+        matcher = UsersSchema.get_matcher(many=True)
+        document = get_document(DOCUMENT_SIZE)
+        self.assertTrue(matcher.matches(document))
+
+    def test_large_document_linear(self):
+        """Matching a large document takes about as long as its resources.
+
+        Timed against a small document on the same machine rather than a wall
+        clock bound, compiling the matcher is not part of the timings.
+        """
+        matcher = UsersSchema.get_matcher(many=True)
+        document = get_document(DOCUMENT_SIZE)
+        baseline = get_document(BASELINE_SIZE)
+        seconds = min(repeat(lambda: matcher.matches(document), number=1, repeat=3))
+        baseline_seconds = min(
+            repeat(lambda: matcher.matches(baseline), number=10, repeat=3)
+        )
+        ratio = DOCUMENT_SIZE / BASELINE_SIZE
+        self.assertLess(seconds, baseline_seconds / 10 * ratio * MAX_SLOWDOWN)
+
+    def test_large_document_mismatch(self):
+        """The first mismatching resource is reported."""
+        matcher = UsersSchema.get_matcher(many=True)
+        document = get_document(DOCUMENT_SIZE)
+        document["data"][-1]["attributes"]["email"] = None
+        self.assertFalse(matcher.matches(document))
+        description = StringDescription()
+        matcher.describe_mismatch(document, description)
+        self.assertIn(f"index {DOCUMENT_SIZE - 1}", str(description))
@@ -0,0 +1,121 @@
+"""Ensure the requests are profiled when requested or sampled."""
+import cProfile
+import pstats
+import tempfile
+from collections import Counter
+from io import StringIO
+from pathlib import Path
+from time import sleep
+
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from webapp import profiling
+
+
+def slow_view(request):  # pylint: disable=unused-argument
+    """Take long enough to be sampled."""
+    sleep(0.05)
+    return HttpResponse()
+
+
+class TestCase(SimpleTestCase):
+    """Ensure the requests are profiled when requested or sampled."""
+
+    def setUp(self):
+        """Store the profiles in a temporary directory."""
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        settings = override_settings(
+            PROFILING_ENABLED=True,
+            PROFILING_SAMPLE_RATE=0,
+            PROFILING_SAMPLING_INTERVAL=0.001,
+            PROFILING_DIRECTORY=directory.name,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def process(self, **headers):
+        """Return the response of the middleware, once the profile is saved."""
+        request = RequestFactory().get("/backend/api/v1/users/", **headers)
+        response = profiling.ProfilingMiddleware(slow_view)(request)
+        profiling.submit(lambda: None).result()
+        return response
+
+    def get_profiles(self):
+        """Return the names of the saved profiles."""
+        return sorted(path.name for path in self.directory.glob("profiles/*"))
+
+    def test_not_profiled(self):
+        """Requests are not profiled without a valid signed header."""
+        self.assertFalse(self.process().has_header(profiling.HEADER))
+        self.assertFalse(
+            self.process(HTTP_X_PROFILE="sampling").has_header("X-Profile")
+        )
+        self.assertEqual(self.get_profiles(), [])
+
+    def test_sampling(self):
+        """The sampling profiler saves the stacks of the request."""
+        response = self.process(HTTP_X_PROFILE=profiling.sign("sampling"))
+        name = response[profiling.HEADER]
+        self.assertEqual(self.get_profiles(), [f"{name}.folded"])
+        stacks = profiling.parse_stacks(
+            (self.directory / "profiles" / f"{name}.folded").read_text()
+        )
+        self.assertTrue(any("slow_view" in stack for stack in stacks))
+
+    def test_cprofile(self):
+        """cProfile saves the stats of the request, the stacks are folded later."""
+        response = self.process(HTTP_X_PROFILE=profiling.sign("cprofile"))
+        name = response[profiling.HEADER]
+        self.assertEqual(self.get_profiles(), [f"{name}.prof"])
+        path = self.directory / "profiles" / f"{name}.prof"
+        stacks = profiling.read_stacks(path.name, path.read_bytes())
+        self.assertTrue(any("slow_view" in stack for stack in stacks))
+        self.assertEqual(stacks, profiling.get_folded_stacks(pstats.Stats(str(path))))
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_sample_rate(self):
+        """A sample of the requests is profiled."""
+        self.assertTrue(self.process().has_header(profiling.HEADER))
+
+    def test_folded_stacks(self):
+        """The stacks of cProfile add up to its total time."""
+        profile = cProfile.Profile()
+        profile.runcall(slow_view, None)
+        stats = pstats.Stats(profile)
+        stacks = profiling.get_folded_stacks(stats)
+        total = sum(stacks.values()) / 1e6
+        self.assertAlmostEqual(total, stats.total_tt, delta=0.01)  # type: ignore
+
+    def test_command(self):
+        """The profiles are listed, downloaded and aggregated."""
+        for profiler in ["sampling", "sampling", "cprofile"]:
+            self.process(HTTP_X_PROFILE=profiling.sign(profiler))
+        stdout = StringIO()
+        call_command("profiles", "list", stdout=stdout)
+        names = stdout.getvalue().split()
+        self.assertEqual(names, self.get_profiles())
+
+        output = self.directory / "download"
+        call_command("profiles", "download", output=str(output), verbosity=0)
+        downloaded = sorted(path.name for path in output.iterdir())
+        cprofile = next(name for name in names if name.endswith(".prof"))
+        folded = cprofile.replace(".prof", ".folded")
+        self.assertEqual(downloaded, sorted(names + [folded]))
+
+        stdout = StringIO()
+        call_command("profiles", "aggregate", stdout=stdout)
+        stacks = profiling.parse_stacks(stdout.getvalue())
+        expected = sum(
+            (
+                profiling.parse_stacks((output / name).read_text())
+                for name in downloaded
+                if name.endswith(".folded")
+            ),
+            Counter(),
+        )
+        self.assertEqual(stacks, expected)
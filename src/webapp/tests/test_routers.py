@@ -0,0 +1,107 @@
+"""Ensure reads are routed to the replicas only when safe."""
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from users.models import User
+from webapp import routers, signals
+
+
+@override_settings(DATABASE_REPLICAS=["replica_0"])
+@mock.patch.object(routers, "get_replica_lag", mock.Mock(return_value=0))
+class TestCase(SimpleTestCase):
+    """Ensure reads are routed to the replicas only when safe."""
+
+    def setUp(self):
+        """Start with unmeasured replicas, reading from the primary."""
+        super().setUp()
+        routers._lags.clear()  # pylint: disable=protected-access
+        routers.use_replicas(False)
+        self.router = routers.ReplicaRouter()
+
+    def request(self, method: str, write=False, **kwargs):
+        """Return the database read by the request, and the response."""
+        databases = []
+
+        def view(request):
+            if write:
+                self.router.db_for_write(User)
+            databases.append(self.router.db_for_read(User))
+            return HttpResponse()
+
+        request = getattr(RequestFactory(), method)("/", **kwargs)
+        response = routers.ReplicaMiddleware(view)(request)
+        return databases[0], response
+
+    def test_primary_by_default(self):
+        """Reads outside of requests and tasks use the primary."""
+        self.assertEqual(self.router.db_for_read(User), "default")
+
+    def test_safe_request(self):
+        """Safe requests read from the replicas."""
+        database, _ = self.request("get")
+        self.assertEqual(database, "replica_0")
+        # check the primary is used once the request is done
+        self.assertEqual(self.router.db_for_read(User), "default")
+
+    def test_unsafe_request(self):
+        """Unsafe requests read from the primary."""
+        database, _ = self.request("post")
+        self.assertEqual(database, "default")
+
+    def test_primary_models(self):
+        """Credentials are read from the primary."""
+        routers.use_replicas(True)
+        self.assertEqual(self.router.db_for_read(Session), "default")
+
+    def test_read_your_writes(self):
+        """Clients read from the primary after a write."""
+        database, response = self.request("get", write=True)
+        self.assertEqual(database, "default")
+        cookie = response.cookies[routers.ReplicaMiddleware.cookie_name]
+        self.assertEqual(cookie["max-age"], settings.DATABASE_REPLICA_STICKY_SECONDS)
+        database, _ = self.request("get", HTTP_COOKIE=f"{cookie.key}={cookie.value}")
+        self.assertEqual(database, "default")
+
+    def test_read_your_writes_token(self):
+        """API clients read from the primary after a write."""
+        authorization = {"HTTP_AUTHORIZATION": "Token 1234"}
+        self.request("post", write=True, **authorization)
+        database, _ = self.request("get", **authorization)
+        self.assertEqual(database, "default")
+        database, _ = self.request("get", HTTP_AUTHORIZATION="Token 5678")
+        self.assertEqual(database, "replica_0")
+
+    @override_settings(DATABASE_REPLICA_MAX_LAG=1)
+    def test_lagging_replica(self):
+        """Lagging replicas are not read from."""
+        routers.use_replicas(True)
+        with mock.patch.object(routers, "get_replica_lag", return_value=2) as lag:
+            self.assertEqual(self.router.db_for_read(User), "default")
+            self.assertEqual(self.router.db_for_read(User), "default")
+        # check the lag is measured once per interval
+        lag.assert_called_once_with("replica_0")
+
+    def test_read_only_task(self):
+        """Only read-only tasks read from the replicas."""
+        routers.use_replicas(False)
+        task = mock.Mock(read_only=True)
+        signals.use_replicas_for_read_only_task(task=task)
+        self.assertEqual(self.router.db_for_read(User), "replica_0")
+        signals.stop_using_replicas(task=task)
+        self.assertEqual(self.router.db_for_read(User), "default")
+
+
+@skipUnless(settings.DATABASE_REPLICAS, "no read replicas configured")
+class ReplicaTestCase(SimpleTestCase):
+    """Ensure the lag of the configured replicas is measured."""
+
+    databases = {"default", *settings.DATABASE_REPLICAS}
+
+    def test_replica_lag(self):
+        """The configured replicas are available."""
+        for alias in settings.DATABASE_REPLICAS:
+            self.assertLess(routers.get_replica_lag(alias), float("inf"))
@@ -0,0 +1,40 @@
+"""Ensure the test runner sets up the test databases."""
+from unittest import mock
+
+from django.apps import apps
+from django.db import connection
+from django.test import SimpleTestCase
+from django.test.runner import DiscoverRunner
+
+from webapp.test import runner
+
+
+class TestCase(SimpleTestCase):
+    """Ensure the test runner sets up the test databases."""
+
+    def test_created_once_migrated(self):
+        """The test runner sets up the migrated database once all apps are."""
+        with mock.patch.object(runner, "call_command") as command:
+            for app_config in apps.get_app_configs():
+                if app_config.models_module is not None:
+                    command.assert_not_called()
+                    runner.create_skeletons_once_migrated(app_config, using="other")
+        command.assert_called_once_with(
+            "setup_skeletons", database="other", verbosity=0
+        )
+
+    def test_fresh_clones(self):
+        """The clones of the kept database are made again."""
+        creation = connection.creation
+
+        def setup_databases(self, **kwargs):  # pylint: disable=unused-argument
+            creation.clone_test_db(suffix="1", keepdb=True)
+
+        with mock.patch.object(
+            type(creation), "clone_test_db"
+        ) as clone, mock.patch.object(
+            DiscoverRunner, "setup_databases", setup_databases
+        ):
+            runner.TestRunner(keepdb=True, parallel=2).setup_databases()
+        clone.assert_called_once_with(suffix="1", keepdb=False)
+        self.assertNotIn("clone_test_db", vars(creation))
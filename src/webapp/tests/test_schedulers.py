@@ -0,0 +1,59 @@
+"""Ensure the cached database scheduler limits database access."""
+from django.test import TestCase as DjangoTestCase
+from django.test import override_settings
+from django_celery_beat.models import CrontabSchedule, PeriodicTask, PeriodicTasks
+
+from webapp.celery import app
+from webapp.schedulers import CachedDatabaseScheduler, get_jitter
+
+
+@override_settings(CELERY_BEAT_CHANGES_URL="", CELERY_BEAT_JITTER=30)
+class TestCase(DjangoTestCase):
+    """Ensure the cached database scheduler limits database access."""
+
+    def get_scheduler(self):
+        """Return a scheduler which does not sync when the process exits."""
+        scheduler = CachedDatabaseScheduler(app=app, lazy=True)
+        self.addCleanup(scheduler._finalize.cancel)  # pylint: disable=protected-access
+        return scheduler
+
+    def test_schedule_cached(self):
+        """The schedule is not reloaded within the change check interval."""
+        scheduler = self.get_scheduler()
+        scheduler.schedule  # pylint: disable=pointless-statement
+        PeriodicTasks.update_changed()
+        with self.assertNumQueries(0):
+            for _index in range(10):
+                scheduler.schedule  # pylint: disable=pointless-statement
+
+    def test_schedule_change_check(self):
+        """The schedule is checked after the change check interval."""
+        scheduler = self.get_scheduler()
+        scheduler.change_check_interval = 0
+        PeriodicTasks.update_changed()
+        self.assertFalse(scheduler.schedule_changed())
+        PeriodicTask.objects.create(
+            name="added",
+            task="webapp.tasks.purge_task_results",
+            crontab=CrontabSchedule.objects.create(minute="0"),
+        )
+        self.assertTrue(scheduler.schedule_changed())
+
+    def test_shared_crontab_jitter(self):
+        """Only entries sharing a crontab are jittered."""
+        shared = CrontabSchedule.objects.create(minute="0")
+        single = CrontabSchedule.objects.create(minute="30")
+        task = "webapp.tasks.purge_task_results"
+        PeriodicTask.objects.create(name="first", task=task, crontab=shared)
+        PeriodicTask.objects.create(name="second", task=task, crontab=shared)
+        PeriodicTask.objects.create(name="single", task=task, crontab=single)
+        scheduler = self.get_scheduler()
+        schedule = scheduler.all_as_schedule()
+        for name in ["first", "second"]:
+            self.assertEqual(schedule[name].options["countdown"], get_jitter(name, 30))
+        self.assertNotIn("countdown", schedule["single"].options)
+        # the entries are rebuilt from their periodic task once dispatched
+        scheduler._schedule = schedule  # pylint: disable=protected-access
+        entry = scheduler.reserve(schedule["first"])
+        self.assertIsNot(entry, schedule["first"])
+        self.assertEqual(entry.options["countdown"], get_jitter("first", 30))
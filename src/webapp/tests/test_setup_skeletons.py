@@ -0,0 +1,76 @@
+"""Ensure setup_skeletons is idempotent and can check the setup."""
+import json
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.test import TestCase as DjangoTestCase
+from django.test import override_settings
+
+from users.models import User
+from webapp.management.commands import setup_skeletons
+
+
+class TestCase(DjangoTestCase):
+    """Ensure setup_skeletons is idempotent and can check the setup."""
+
+    def setUp(self):
+        """Start without a configured bucket."""
+        super().setUp()
+        caches[settings.SKELETONS_CACHE].delete(setup_skeletons.BUCKET_STATE_KEY)
+
+    def test_check(self):
+        """The check passes once set up and fails when data is missing."""
+        call_command("setup_skeletons", check=True, verbosity=0)
+        User.objects.filter(email=settings.ADMIN_USER["email"]).delete()
+        with self.assertRaisesMessage(CommandError, "admin"):
+            call_command("setup_skeletons", check=True, verbosity=0)
+        call_command("setup_skeletons", verbosity=0)
+        call_command("setup_skeletons", check=True, verbosity=0)
+
+    def test_check_output(self):
+        """The check only reports whether the data is set up."""
+        stdout = StringIO()
+        call_command("setup_skeletons", check=True, no_color=True, stdout=stdout)
+        self.assertEqual(stdout.getvalue(), "Ready\n")
+
+    def test_timings(self):
+        """Each step's time is reported when verbose."""
+        stdout = StringIO()
+        call_command("setup_skeletons", verbosity=2, stdout=stdout)
+        self.assertRegex(stdout.getvalue(), r"admin took \d+ms")
+        self.assertRegex(stdout.getvalue(), r"site took \d+ms")
+
+    @override_settings(DEBUG=True, AWS_S3_ENDPOINT_URL="http://minio:9000")
+    def test_bucket_configured_once(self):
+        """The bucket is only configured when its desired state changes."""
+        with tempfile.NamedTemporaryFile("w", suffix=".json") as policy:
+            json.dump({"Version": "2012-10-17"}, policy)
+            policy.flush()
+            with mock.patch.object(
+                setup_skeletons, "configure_bucket"
+            ) as configure, mock.patch.object(
+                setup_skeletons, "bucket_exists", return_value=True
+            ) as exists:
+                for _ in range(2):
+                    call_command(
+                        "setup_skeletons", bucket_policy=policy.name, verbosity=0
+                    )
+                configure.assert_called_once_with(policy.name)
+                call_command("setup_skeletons", bucket_policy=policy.name, check=True)
+                # check a new policy is applied
+                json.dump({"Statement": []}, policy)
+                policy.flush()
+                with self.assertRaisesMessage(CommandError, "bucket"):
+                    call_command(
+                        "setup_skeletons", bucket_policy=policy.name, check=True
+                    )
+                call_command("setup_skeletons", bucket_policy=policy.name, verbosity=0)
+                self.assertEqual(configure.call_count, 2)
+                # check a reset bucket is configured again
+                exists.return_value = False
+                call_command("setup_skeletons", bucket_policy=policy.name, verbosity=0)
+                self.assertEqual(configure.call_count, 3)
@@ -0,0 +1,123 @@
+"""Ensure the performance traces are sampled as configured."""
+from timeit import repeat
+from unittest import mock
+
+import sentry_sdk
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import resolve
+from sentry_sdk import Hub
+from sentry_sdk.transport import Transport
+
+from webapp import tracing
+
+
+# the sampler resolves the path at most once, this leaves room for noisy machines
+MAX_RESOLVE_SLOWDOWN = 3
+
+
+class CapturingTransport(Transport):
+    """Keep the envelopes instead of sending them."""
+
+    def __init__(self, options=None):
+        """Start without envelopes."""
+        super().__init__(options)
+        self.envelopes = []
+
+    def capture_event(self, event):
+        """Ignore the events, only transactions are sent as envelopes."""
+
+    def capture_envelope(self, envelope):
+        """Keep the envelope."""
+        self.envelopes.append(envelope)
+
+
+@override_settings(
+    SENTRY_TRACING_ENABLED=True,
+    SENTRY_TRACES_SAMPLE_RATE=0.5,
+    SENTRY_TRACES_ROUTE_RATES={"/backend/health/": 0},
+    SENTRY_TRACES_TASK_RATES={"webapp.tasks.send_email": 1},
+    SENTRY_TRACES_SLOW_SECONDS=0,
+)
+class TestCase(SimpleTestCase):
+    """Ensure the performance traces are sampled as configured."""
+
+    def setUp(self):
+        """Start without slow routes."""
+        super().setUp()
+        tracing._slow_routes.clear()  # pylint: disable=protected-access
+
+    @staticmethod
+    def request_context(path):
+        """Return the sampling context of a request to the path."""
+        return {"parent_sampled": None, "wsgi_environ": {"PATH_INFO": path}}
+
+    def test_rates(self):
+        """Requests and tasks are sampled at their configured rates."""
+        self.assertEqual(
+            tracing.traces_sampler(self.request_context("/backend/api/v1/users/")), 0.5
+        )
+        self.assertEqual(
+            tracing.traces_sampler(self.request_context("/backend/health/ready")), 0
+        )
+        self.assertEqual(
+            tracing.traces_sampler({"celery_job": {"task": "webapp.tasks.send_email"}}),
+            1,
+        )
+        self.assertEqual(tracing.traces_sampler({"celery_job": {"task": "other"}}), 0.5)
+        self.assertEqual(tracing.traces_sampler({"parent_sampled": False}), False)
+
+    def test_slow_route(self):
+        """Routes of slow requests are then always traced."""
+        request = RequestFactory().get("/backend/api/v1/users/1/")
+        request.resolver_match = resolve("/backend/api/v1/users/1/")
+        middleware = tracing.SlowRouteMiddleware(lambda request: HttpResponse())
+        middleware(request)
+        self.assertEqual(
+            tracing.traces_sampler(self.request_context("/backend/api/v1/users/2/")), 1
+        )
+        self.assertEqual(
+            tracing.traces_sampler(self.request_context("/backend/api/v1/users/")), 0.5
+        )
+
+    def test_transaction_sent(self):
+        """Sampled transactions are sent to Sentry."""
+        transport = CapturingTransport()
+        client = sentry_sdk.Client(
+            "http://public@127.0.0.1:1/1",
+            transport=transport,
+            default_integrations=False,
+            traces_sampler=tracing.traces_sampler,
+        )
+        hub = Hub(client)
+        for path in ("/backend/health/live", "/backend/api/v1/users/"):
+            with mock.patch("random.random", return_value=0.1):
+                with hub.start_transaction(
+                    name=path,
+                    op="http.server",
+                    custom_sampling_context={"wsgi_environ": {"PATH_INFO": path}},
+                ):
+                    pass
+        client.flush()
+        self.assertEqual(len(transport.envelopes), 1)
+        transaction = transport.envelopes[0].get_transaction_event()
+        self.assertEqual(transaction["transaction"], "/backend/api/v1/users/")
+
+    def test_sampler_overhead(self):
+        """The sampler costs about as much as resolving the path, at most.
+
+        Timed against resolve() on the same machine rather than a wall clock
+        bound, with a slow route recorded so that the path is resolved.
+        """
+        tracing._slow_routes["other/"] = 0  # pylint: disable=protected-access
+        path = "/backend/api/v1/users/1/"
+        context = self.request_context(path)
+        seconds = min(repeat(lambda: tracing.traces_sampler(context), number=1000))
+        resolve_seconds = min(repeat(lambda: resolve(path), number=1000))
+        self.assertLess(seconds, resolve_seconds * MAX_RESOLVE_SLOWDOWN)
+
+    def test_not_resolved(self):
+        """Paths are not resolved while no route was slow."""
+        with mock.patch("webapp.tracing.resolve") as resolve_mock:
+            tracing.traces_sampler(self.request_context("/backend/api/v1/users/"))
+        resolve_mock.assert_not_called()
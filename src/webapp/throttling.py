@@ -0,0 +1,146 @@
+"""Token bucket throttles for expensive unauthenticated endpoints."""
+from math import ceil
+from time import time
+from typing import List, Optional, Tuple
+
+from axes.helpers import get_client_ip_address
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import SimpleRateThrottle
+
+# Take one token from each bucket in KEYS and return the seconds to wait
+# before they all have one, "0" when the request is allowed. Tokens are only
+# taken when every bucket has one, so a request refused by one bucket does not
+# drain the others. Bucket i holds up to ARGV[2i] tokens and is refilled with
+# ARGV[2i + 1] tokens per second, ARGV[1] is the current time.
+TAKE_TOKENS_SCRIPT = """
+local now = tonumber(ARGV[1])
+local buckets = {}
+local wait = 0
+for index, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[index * 2])
+    local rate = tonumber(ARGV[index * 2 + 1])
+    local bucket = redis.call("HMGET", key, "tokens", "timestamp")
+    local tokens = tonumber(bucket[1]) or capacity
+    local timestamp = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - timestamp) * rate)
+    if tokens < 1 then
+        wait = math.max(wait, (1 - tokens) / rate)
+    end
+    buckets[index] = {tokens, math.ceil(capacity / rate)}
+end
+for index, key in ipairs(KEYS) do
+    local tokens = buckets[index][1]
+    if wait == 0 then
+        tokens = tokens - 1
+    end
+    redis.call("HMSET", key, "tokens", tokens, "timestamp", now)
+    redis.call("EXPIRE", key, buckets[index][2])
+end
+return tostring(wait)
+"""
+
+Bucket = Tuple[float, float]
+
+
+def take_tokens(
+    buckets: List[Optional[Bucket]], limits: List[Tuple[int, float]], now: float
+) -> Tuple[List[Bucket], float]:
+    """Take one token from each bucket if they all have one.
+
+    Return the new buckets and the seconds to wait before they all have one.
+    """
+    refilled = []
+    wait = 0.0
+    for bucket, (capacity, rate) in zip(buckets, limits):
+        tokens, timestamp = bucket or (capacity, now)
+        tokens = min(capacity, tokens + max(0, now - timestamp) * rate)
+        if tokens < 1:
+            wait = max(wait, (1 - tokens) / rate)
+        refilled.append(tokens)
+    taken = 0 if wait else 1
+    return [(tokens - taken, now) for tokens in refilled], wait
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """Throttle requests with token buckets in the throttle cache.
+
+    The bucket of "<num>/<period>" holds up to num tokens and is refilled at
+    num per period, so bursts are allowed while the sustained rate is capped.
+    A token is taken from one bucket per `scope_suffixes`, whose rates are set
+    in `DEFAULT_THROTTLE_RATES` for the view's `throttle_scope` suffixed by
+    the suffix. The request is allowed if all of the buckets have a token.
+    """
+
+    scope_suffixes: Tuple[str, ...] = ("",)
+
+    def __init__(self):
+        """Do not get the rate before the scope is known."""
+        # pylint: disable=super-init-not-called
+        self.wait_time: Optional[float] = None
+
+    @property
+    def cache(self):
+        """Return the throttle cache."""
+        return caches[settings.THROTTLE_CACHE]
+
+    def get_ident(self, request, scope_suffix: str) -> str:
+        """Return the identity of the bucket of the scope suffix.
+
+        This is the override point of the subclasses, e.g. returning the client
+        IP address, or a constant to share the bucket between all clients.
+        """
+        raise NotImplementedError(".get_ident() must be overridden")
+
+    def allow_request(self, request, view):
+        """Take a token from the buckets, allowing the request if they all have one."""
+        scope = getattr(view, "throttle_scope", None)
+        if not scope:
+            return True
+        keys = []
+        limits = []
+        for scope_suffix in self.scope_suffixes:
+            self.scope = f"{scope}{scope_suffix}"
+            num_requests, duration = self.parse_rate(self.get_rate())
+            ident = self.get_ident(request, scope_suffix)
+            keys.append(f"throttle_{self.scope}_{ident}")
+            limits.append((num_requests, num_requests / duration))
+        self.wait_time = self.take_tokens(keys, limits)
+        return not self.wait_time
+
+    def take_tokens(self, keys: List[str], limits: List[Tuple[int, float]]) -> float:
+        """Take a token from the buckets, return the seconds to wait for them."""
+        try:
+            client = self.cache.client.get_client(write=True)
+        except AttributeError:
+            # NOTE: this is not atomic, it's only used by caches which are not
+            # backed by django-redis, e.g. in development
+            buckets, wait = take_tokens(
+                [self.cache.get(key) for key in keys], limits, time()
+            )
+            for key, bucket, (capacity, rate) in zip(keys, buckets, limits):
+                self.cache.set(key, bucket, ceil(capacity / rate))
+            return wait
+        script = client.register_script(TAKE_TOKENS_SCRIPT)
+        args = [time()] + [value for limit in limits for value in limit]
+        return float(script(keys=[self.cache.make_key(key) for key in keys], args=args))
+
+    def wait(self):
+        """Return the seconds to wait for a token, rounded up."""
+        return ceil(self.wait_time) if self.wait_time else None
+
+
+class IPAndGlobalTokenBucketThrottle(TokenBucketThrottle):
+    """Throttle requests per client IP and globally.
+
+    The global token is only taken when the client has a token, so a client
+    refused by its own bucket cannot drain the global one.
+    """
+
+    scope_suffixes = ("_ip", "")
+
+    def get_ident(self, request, scope_suffix):
+        """Return the client IP address, or share the global bucket."""
+        if scope_suffix:
+            return get_client_ip_address(request)
+        return "global"
@@ -0,0 +1,75 @@
+"""Sampling of the Sentry performance traces."""
+from time import monotonic, perf_counter
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.urls import Resolver404, resolve
+
+# The routes which were slow, and until when they are always traced
+_slow_routes: Dict[str, float] = {}
+
+
+def get_route(path: str) -> Optional[str]:
+    """Return the url pattern matching the path, if any."""
+    try:
+        return resolve(path).route
+    except Resolver404:
+        return None
+
+
+def get_request_rate(path: str) -> float:
+    """Return the sample rate of the request.
+
+    The path is only resolved while some routes were slow.
+    """
+    if _slow_routes:
+        route = get_route(path)
+        if route is not None and _slow_routes.get(route, 0) > monotonic():
+            return 1.0
+    for prefix, rate in settings.SENTRY_TRACES_ROUTE_RATES.items():
+        if path.startswith(prefix):
+            return rate
+    return settings.SENTRY_TRACES_SAMPLE_RATE
+
+
+def traces_sampler(context: Dict[str, Any]) -> float:
+    """Return the sample rate of the transaction.
+
+    Requests are sampled at the rate of the first matching path prefix in
+    `SENTRY_TRACES_ROUTE_RATES` and tasks at their rate in
+    `SENTRY_TRACES_TASK_RATES`, defaulting to `SENTRY_TRACES_SAMPLE_RATE`.
+    Routes which took longer than `SENTRY_TRACES_SLOW_SECONDS` are always
+    traced for the next `SENTRY_TRACES_SLOW_WINDOW` seconds.
+    """
+    if context.get("parent_sampled") is not None:
+        return context["parent_sampled"]
+    if "wsgi_environ" in context:
+        return get_request_rate(context["wsgi_environ"].get("PATH_INFO", ""))
+    if "celery_job" in context:
+        task = context["celery_job"]["task"]
+        return settings.SENTRY_TRACES_TASK_RATES.get(
+            task, settings.SENTRY_TRACES_SAMPLE_RATE
+        )
+    return settings.SENTRY_TRACES_SAMPLE_RATE
+
+
+class SlowRouteMiddleware:
+    """Record the routes of slow requests, see traces_sampler."""
+
+    def __init__(self, get_response):
+        """Set the response handler, unless tracing is disabled."""
+        if not settings.SENTRY_TRACING_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """Trace the route of the request for a while if it is slow."""
+        started = perf_counter()
+        response = self.get_response(request)
+        if perf_counter() - started >= settings.SENTRY_TRACES_SLOW_SECONDS:
+            match = getattr(request, "resolver_match", None)
+            if match is not None:
+                until = monotonic() + settings.SENTRY_TRACES_SLOW_WINDOW
+                _slow_routes[match.route] = until
+        return response
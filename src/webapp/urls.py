@@ -9,6 +9,7 @@ from rest_framework.routers import DefaultRouter
 from rest_framework.viewsets import ViewSetMixin
 
 import users.views
+from webapp import health
 from webapp.views import schema_view
 
 # Add viewsets here. The first argument is the name and the URL regex
@@ -17,6 +18,7 @@ routes: List[Tuple[str, ViewSetMixin]] = [
     ("sessions", users.views.SessionView),
     ("password-resets", users.views.PasswordResetView),
     ("password-reset-confirmations", users.views.PasswordResetConfirmView),
+    ("token-refreshes", users.views.TokenRefreshView),
 ]
 
 v1_router = DefaultRouter()
@@ -42,6 +44,8 @@ urlpatterns = [
                     ),
                 ),
                 path("django-admin/", admin.site.urls),
+                path("health/live", health.live, name="health-live"),
+                path("health/ready", health.ready, name="health-ready"),
             ]
         ),
     )
@@ -1,6 +1,8 @@
 """View for openapi schema."""
 # pylint: disable=no-name-in-module
 
+from django.middleware.http import ConditionalGetMiddleware
+from django.utils.decorators import decorator_from_middleware
 from rest_framework import permissions
 from rest_framework.schemas import get_schema_view
 from rest_framework_json_api.schemas.openapi import (  # pylint: disable=syntax-error
@@ -9,10 +11,14 @@ from rest_framework_json_api.schemas.openapi import (  # pylint: disable=syntax-
 
 from webapp import settings
 
-schema_view = get_schema_view(
-    title=settings.PROJECT_NAME,
-    description=f"Schema of {settings.PROJECT_NAME}",
-    version="1.0.0",
-    generator_class=SchemaGenerator,
-    permission_classes=[permissions.AllowAny],
+# The ETag lets clients revalidate the schema, and the compressed schema be
+# cached by webapp.compression.CompressionMiddleware
+schema_view = decorator_from_middleware(ConditionalGetMiddleware)(
+    get_schema_view(
+        title=settings.PROJECT_NAME,
+        description=f"Schema of {settings.PROJECT_NAME}",
+        version="1.0.0",
+        generator_class=SchemaGenerator,
+        permission_classes=[permissions.AllowAny],
+    )
 )